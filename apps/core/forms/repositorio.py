@@ -1,6 +1,9 @@
 from django import forms
 from apps.repositorio.models import Projeto, Subprojeto, Autor, TipoDocumento, AreaTematica, Status
+from django.urls import reverse_lazy
 from datetime import datetime
+from apps.repositorio.forms.widgets import AutocompleteSelect
+from apps.repositorio.lookup_tables import definir_opcoes, tabelas_auxiliares
 
 
 class RepositorioFilterForm(forms.Form):
@@ -27,13 +30,19 @@ class RepositorioFilterForm(forms.Form):
         queryset=Subprojeto.objects.all(),
         required=False,
         empty_label="Subprojeto (Todos)",
-        widget=forms.Select(attrs={'class': 'form-select'})
+        # Opções carregadas sob demanda (apenas o valor selecionado vai no HTML)
+        widget=AutocompleteSelect(
+            reverse_lazy('core:autocomplete_subprojetos'),
+            attrs={'class': 'form-select'},
+            depende_de='projeto',
+            parametro='projeto_id',
+        )
     )
     autor = forms.ModelChoiceField(
         queryset=Autor.objects.all(),
         required=False,
         empty_label="Autor (Todos)",
-        widget=forms.Select(attrs={'class': 'form-select'})
+        widget=AutocompleteSelect(reverse_lazy('core:autocomplete_autores'), attrs={'class': 'form-select'})
     )
     tipo_documento = forms.ModelChoiceField(
         queryset=TipoDocumento.objects.all(),
@@ -76,7 +85,7 @@ class RepositorioFilterForm(forms.Form):
         widget=forms.Select(attrs={'class': 'form-select'})
     )
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, facetas=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         projeto_id = None
@@ -87,3 +96,41 @@ class RepositorioFilterForm(forms.Form):
 
         if projeto_id:
             self.fields['subprojeto'].queryset = Subprojeto.objects.filter(projeto_id=projeto_id)
+
+        # Opções das tabelas auxiliares vêm do registro em memória (sem consultas),
+        # com a quantidade de resultados de cada opção (contagens das facetas).
+        # Subprojeto e autor usam autocomplete: só os valores selecionados são listados.
+        facetas = facetas or {}
+        tabelas = tabelas_auxiliares()
+        subprojetos = set(self._selecionados('subprojeto'))
+        autores = self._selecionados('autor')
+        opcoes = {
+            'projeto': tabelas.projetos,
+            'subprojeto': [subprojeto for subprojeto in tabelas.subprojetos if subprojeto.pk in subprojetos],
+            'tipo_documento': tabelas.tipos_documento,
+            'area_tematica': tabelas.areas_tematicas,
+            'status': tabelas.status_publicos,
+            'autor': Autor.objects.filter(pk__in=autores) if autores else [],
+        }
+        for nome, objetos in opcoes.items():
+            rotulo = self._rotulo_com_contagem(facetas[nome]) if nome in facetas else None
+            definir_opcoes(self.fields[nome], objetos, rotulo)
+
+        if 'ano' in facetas:
+            self.fields['ano'].widget.attrs['list'] = 'anos-facetas'
+
+    def _selecionados(self, nome):
+        """Ids numéricos enviados para um filtro (aceita vários valores)."""
+        if not self.is_bound:
+            valores = [self.initial.get(nome)]
+        elif hasattr(self.data, 'getlist'):
+            valores = self.data.getlist(nome)
+        else:
+            valores = [self.data.get(nome)]
+        return [int(valor) for valor in valores if str(valor or '').isdigit()]
+
+    @staticmethod
+    def _rotulo_com_contagem(contagens):
+        def rotulo(obj):
+            return f"{obj} ({contagens.get(obj.pk, 0)})"
+        return rotulo
@@ -23,4 +23,12 @@ urlpatterns = [
 
     # Endpoint JSON para carregar subprojetos por projeto (filtro dinâmico)
     path('api/subprojetos/', subprojetos_por_projeto, name='subprojetos_por_projeto'),
+
+    # Endpoints JSON de autocomplete (filtros e seletores carregados sob demanda)
+    path('api/autocomplete/autores/', autocomplete_autores, name='autocomplete_autores'),
+    path('api/autocomplete/tags/', autocomplete_tags, name='autocomplete_tags'),
+    path('api/autocomplete/subprojetos/', autocomplete_subprojetos, name='autocomplete_subprojetos'),
+
+    # Endpoint JSON de estatísticas (tabelas agregadas, com ETag)
+    path('api/estatisticas/', estatisticas, name='estatisticas'),
 ]
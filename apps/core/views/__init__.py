@@ -3,10 +3,14 @@ from .website import (
     TCCEView,
     ContatoView,
     GaleriaView,
+    estatisticas,
 )
 from .repositorio import (
     RepositorioView,
     download_registro,
     view_file,
     subprojetos_por_projeto,
+    autocomplete_autores,
+    autocomplete_tags,
+    autocomplete_subprojetos,
 )
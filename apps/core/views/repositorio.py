@@ -1,202 +1,302 @@
 from django.views.generic import ListView, DetailView
 from django.db.models import Q
 from django.shortcuts import render
+from django.utils.functional import cached_property
 from datetime import datetime
-from apps.repositorio.models.repositorio import Registro, TipoDocumento
+from apps.repositorio.downloads import servir_arquivo
+from apps.repositorio.models.repositorio import Autor, Registro, RegistroDocumento, Tag
+from apps.repositorio.lookup_tables import tabelas_auxiliares
 from apps.core.forms import RepositorioFilterForm
+from apps.repositorio.search.autocomplete import resposta_autocomplete, sugerir_objetos, sugerir_queryset
+from apps.repositorio.search.bitmap import ResultadoIds, obter_indice
+from apps.repositorio.search.facets import FACETAS_DOCUMENTO, MotorFacetas
+from apps.repositorio.search.filters import filtrar_nome_tipo_documento
+from apps.repositorio.search.fulltext import aplicar_busca_textual, anotar_relevancia
+from apps.repositorio.search.highlight import anotar_trechos, destacar_resultados
+from apps.repositorio.search.pagination import KeysetPaginationMixin, ordem_nulos_por_ultimo
+from apps.repositorio.search.query_syntax import ConsultaInvalida, analisar, usa_sintaxe_avancada
+from apps.repositorio.search.result_cache import (
+    cache_habilitado,
+    chave_resultado,
+    guardar_resultado,
+    normalizar_parametros,
+    obter_resultado,
+)
+from apps.repositorio.search.versioning import versao_catalogo, versao_tabelas_auxiliares
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse, Http404, HttpResponseRedirect
-import os
-from apps.repositorio.models.repositorio import Subprojeto
 from django.http import JsonResponse
 
 
-class RepositorioView(ListView):
+class RepositorioView(KeysetPaginationMixin, ListView):
     """
     Lista todos os Registros (Documentos) e gerencia a pesquisa avançada e filtros.
+
+    Lê o modelo de leitura RegistroDocumento (uma linha por registro, com nomes,
+    autores e flags já achatados): listagem e facetas não fazem joins.
     """
-    model = Registro
+    model = RegistroDocumento
     template_name = 'website/repo_busca.html'
     context_object_name = 'registros'
     paginate_by = 10
 
+    # Mensagem de consulta inválida na sintaxe avançada (ver `consulta_avancada`)
+    erro_busca = None
+
+    # Ordenações aceitas em `ordenar_por` (o `id` de desempate é incluído pela paginação)
+    ORDENACOES = {
+        '-data_publicacao': ('-data_publicacao', 'titulo'),
+        'data_publicacao': ('data_publicacao', 'titulo'),
+        'titulo': ('titulo',),
+    }
+
     def get_queryset(self):
         """
         Retorna o queryset base (apenas documentos ativos e públicos) e aplica os filtros
         recebidos via GET.
         """
+        query = self.request.GET.get('q')
+        ordenar_por = self.request.GET.get('ordenar_por')
+
+        # Sem busca textual, filtros e ordenação podem vir do índice em memória:
+        # o banco só é consultado para as linhas da página exibida.
+        if self.indice_facetas is not None:
+            ids = self.indice_facetas.consultar(
+                self.motor_facetas.selecionadas,
+                self.ORDENACOES.get(ordenar_por, self.ORDENACOES['-data_publicacao']),
+            )
+            return ResultadoIds(ids, RegistroDocumento.objects.all())
+
+        # Resultado em cache (ids ordenados + facetas): só as linhas da página vão ao banco
+        if self.chave_cache is not None:
+            entrada = obter_resultado(self.chave_cache)
+            self.estado_cache = 'HIT' if entrada is not None else 'MISS'
+            if entrada is not None:
+                self._facetas = entrada['facetas']
+                return ResultadoIds(entrada['ids'], self._queryset_pagina())
+
+        # 1 e 2. Busca textual, filtros não-faceta e filtros de faceta (FKs, M2M e ano)
+        queryset = self.motor_facetas.filtrar(self._queryset_busca())
+
+        # 3. Ordenação (com busca textual e sem ordenação explícita, ordena por relevância),
+        # com NULLs por último em qualquer banco, como no índice de facetas
+        if ordenar_por in self.ORDENACOES:
+            ordenacao = self.ORDENACOES[ordenar_por]
+        elif query and 'rank' in queryset.query.annotations:
+            ordenacao = ('-rank', *self.ORDENACOES['-data_publicacao'])
+        else:
+            ordenacao = self.ORDENACOES['-data_publicacao']
+        queryset = queryset.order_by(*ordem_nulos_por_ultimo(ordenacao))
+
+        if self.chave_cache is not None:
+            # Falha no cache: os ids ordenados (uma consulta) substituem COUNT +
+            # página e são guardados junto com as facetas em get_context_data
+            self._ids_para_cache = list(queryset.values_list('pk', flat=True))
+            return ResultadoIds(self._ids_para_cache, self._queryset_pagina())
+
+        # Trechos destacados: calculados pelo banco só para as linhas da página
+        return anotar_trechos(queryset, self.termo_destaque, prefixo='registro__')
+
+    def _queryset_pagina(self):
+        """Queryset das linhas de uma página de ids já ordenados (com os trechos destacados)."""
+        return anotar_trechos(RegistroDocumento.objects.all(), self.termo_destaque, prefixo='registro__')
+
+    @cached_property
+    def consulta_avancada(self):
+        """
+        Consulta `q` analisada (search.query_syntax) quando usa operadores;
+        None para a busca simples. Consultas inválidas ficam em `erro_busca`.
+        """
+        query = self.request.GET.get('q')
+        if not query or not usa_sintaxe_avancada(query):
+            return None
+        try:
+            return analisar(query)
+        except ConsultaInvalida as e:
+            self.erro_busca = str(e)
+            return None
+
+    @property
+    def termo_destaque(self):
+        """Termos livres da busca (sem campos nem exclusões), usados na relevância e nos trechos."""
+        consulta = self.consulta_avancada
+        return consulta.texto_livre if consulta is not None else self.request.GET.get('q')
+
+    @cached_property
+    def chave_cache(self):
+        """Chave do cache de resultados (search.result_cache), se habilitado."""
+        if not cache_habilitado() or self.indice_facetas is not None:
+            return None
+        return chave_resultado(normalizar_parametros(self.request.GET, self.ORDENACOES))
+
+    @cached_property
+    def motor_facetas(self):
+        # Facetas aceitam vários valores (?autor=1&autor=2), combinados com OU
+        return MotorFacetas.from_querydict(self.request.GET, FACETAS_DOCUMENTO)
+
+    @cached_property
+    def facetas_exibidas(self):
+        """
+        Facetas cujas contagens aparecem no formulário. O autor usa autocomplete
+        de um só valor: só o autor selecionado é listado (com a contagem), então
+        sem seleção as contagens por autor não são calculadas.
+        """
+        return [
+            faceta.nome for faceta in FACETAS_DOCUMENTO
+            if faceta.nome != 'autor' or 'autor' in self.motor_facetas.selecionadas
+        ]
+
+    @cached_property
+    def indice_facetas(self):
+        """Índice de facetas (search.bitmap), quando habilitado e a consulta não tem filtros textuais."""
+        tipo_documento = self.request.GET.get('tipo_documento')
+        if self.request.GET.get('q') or self.request.GET.get('categoria'):
+            return None
+        if tipo_documento and not str(tipo_documento).isdigit():
+            return None
+        return obter_indice()
+
+    def _queryset_busca(self, anotar_rank=True):
+        """
+        Registros públicos filtrados pela busca textual e pelos filtros que não
+        são facetas (tipo de documento textual e categoria dos cards).
+        """
         # Filtro base: Apenas registros ativos e com status público
-        queryset = Registro.objects.filter(
-            ativo=True,
-            status__is_public=True
-        ).prefetch_related(
-            'autores', 'tags', 'subprojeto__projeto'  # Otimiza o carregamento de FKs e M2M
-        )
+        queryset = RegistroDocumento.objects.filter(publico=True)
 
         # Obtém os parâmetros de busca da URL
         query = self.request.GET.get('q')
-        projeto_id = self.request.GET.get('projeto')
-        subprojeto_id = self.request.GET.get('subprojeto')
-        autor_id = self.request.GET.get('autor')
-        tag_id = self.request.GET.get('tag')
-        tipo_documento_id = self.request.GET.get('tipo_documento')
+        tipo_documento = self.request.GET.get('tipo_documento')
         categoria = self.request.GET.get('categoria')
-        area_tematica_id = self.request.GET.get('area_tematica')
-        status_id = self.request.GET.get('status')
-        ano = self.request.GET.get('ano')
-        ordenar_por = self.request.GET.get('ordenar_por', '-data_publicacao')
-
-        # --- LÓGICA DE FILTRAGEM ---
-
-        # 1. Filtro Full-Text (Título, Resumo, Tags, etc.)
-        if query:
-            # Usando Q objects para construir uma cláusula OR (busca em múltiplos campos)
-            queryset = queryset.filter(
-                Q(titulo__icontains=query) |
-                Q(resumo__icontains=query) |
-                Q(autores__nome__icontains=query) |
-                Q(tags__nome__icontains=query)
-            ).distinct()  # Necessário devido à busca M2M (autores, tags)
-
-        # 2. Filtros de Seleção (FKs e M2M)
-        if projeto_id:
-            queryset = queryset.filter(subprojeto__projeto_id=projeto_id)
-        if subprojeto_id:
-            queryset = queryset.filter(subprojeto__id=subprojeto_id)
-        if autor_id:
-            queryset = queryset.filter(autores__id=autor_id)
-        if tag_id:
-            queryset = queryset.filter(tags__id=tag_id)
-        # Permite filtrar por tipo_documento usando id (padrão) ou por categoria textual
-        if tipo_documento_id:
-            # Se for um número (id) usa id, senão tenta por nome (icontains)
-            if str(tipo_documento_id).isdigit():
-                queryset = queryset.filter(tipo_documento__id=tipo_documento_id)
-            else:
-                queryset = queryset.filter(tipo_documento__nome__icontains=tipo_documento_id)
-
-        # Filtro por categoria via parâmetro 'categoria' (usado pelos cards)
-        if categoria:
-            # Normaliza removendo espaço e 's' final simples e acentos comuns, tenta match icontains
-            norm = categoria.strip()
-            # remove 's' final (plural simples)
-            if len(norm) > 1 and (norm.endswith('s') or norm.endswith('S')):
-                norm = norm[:-1]
-            # substituições simples para acentos comuns (ajuda em comparações básicas)
-            norm = norm.replace('í','i').replace('Í','I').replace('é','e').replace('É','E').replace('á','a').replace('Á','A').replace('ó','o').replace('Ó','O').replace('ú','u').replace('Ú','U').replace('ã','a').replace('Ã','A').replace('õ','o').replace('Õ','O')
-            # Busca por tipo_documento que contenha o termo normalizado
-            queryset = queryset.filter(tipo_documento__nome__icontains=norm)
-        if area_tematica_id:
-            queryset = queryset.filter(area_tematica__id=area_tematica_id)
-        if status_id:
-            queryset = queryset.filter(status__id=status_id)
-
-        # 3. Filtro por Ano
-        if ano:
-            try:
-                ano = int(ano)
-                # Filtra pela data_publicacao__year
-                queryset = queryset.filter(data_publicacao__year=ano)
-            except ValueError:
-                pass  # Ignora se o ano for inválido
-
-        # 4. Ordenação
-        if ordenar_por:
-            queryset = queryset.order_by(ordenar_por)
+
+        # Filtro Full-Text (Título, Resumo, Autores e Tags)
+        # Em PostgreSQL usa o search_vector (GIN) e anota o `rank` de relevância;
+        # M2M são consultados por subquery, sem joins duplicando linhas.
+        # Com operadores (autor:, ano:, aspas, -, OR), a consulta é compilada numa só condição
+        consulta = self.consulta_avancada
+        if self.erro_busca:
+            return queryset.none()
+        if consulta is not None:
+            queryset = queryset.filter(consulta.condicao(queryset.db, prefixo='registro__'))
+            if anotar_rank:
+                queryset = anotar_relevancia(queryset, consulta.texto_livre, prefixo='registro__')
+        elif query:
+            queryset = aplicar_busca_textual(queryset, query, anotar_rank=anotar_rank, prefixo='registro__')
+
+        # tipo_documento numérico é tratado pela faceta; textual e categoria (cards)
+        # filtram pelo nome, sem acentos (search.filters)
+        queryset = filtrar_nome_tipo_documento(queryset, tipo_documento, categoria)
 
         return queryset
 
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        if getattr(self, 'estado_cache', None):
+            response['X-Cache-Busca'] = self.estado_cache
+        return response
+
     def get_context_data(self, **kwargs):
         """
         Adiciona o formulário de filtro e os dados de contexto ao template.
         """
         context = super().get_context_data(**kwargs)
+        destacar_resultados(context['registros'], self.termo_destaque)
+
+        # Contagens por valor de cada faceta (uma consulta agrupada por faceta;
+        # cada faceta ignora o próprio filtro)
+        facetas = getattr(self, '_facetas', None)
+        if facetas is None and self.indice_facetas is not None:
+            facetas = self.motor_facetas.contar_no_indice(self.indice_facetas, nomes=self.facetas_exibidas)
+        elif facetas is None:
+            facetas = self.motor_facetas.contar(self._queryset_busca(anotar_rank=False), nomes=self.facetas_exibidas)
+            if getattr(self, '_ids_para_cache', None) is not None:
+                guardar_resultado(self.chave_cache, self._ids_para_cache, facetas)
+        context['facetas'] = facetas
+        context['facetas_ano'] = sorted(facetas.get('ano', {}).items(), reverse=True)
 
         # Instancia o formulário de filtro, preenchendo-o com os dados da requisição (GET)
-        context['form'] = RepositorioFilterForm(self.request.GET)
+        context['form'] = RepositorioFilterForm(self.request.GET, facetas=facetas)
 
         # Se for necessário passar o termo de busca para o campo de busca simples no Header
         context['search_term'] = self.request.GET.get('q', '')
+        context['erro_busca'] = self.erro_busca
 
-        # Carrega todos os TipoDocumento ativos para os cards de categoria
-        tipos_documento = TipoDocumento.objects.filter(ativo=True).order_by('nome')
-        context['tipos_documento'] = tipos_documento
+        # TipoDocumento ativos para os cards de categoria (registro em memória, sem consultas)
+        tabelas = tabelas_auxiliares()
+        context['tipos_documento'] = tabelas.tipos_documento_ativos
 
         # Mapeia categorias simples (nomes dos cards) para IDs de TipoDocumento
         # Esse mapeamento permite que os cards usem links simples e robustos
-        # Busca por correspondência parcial (icontains) para flexibilidade
+        # Busca por correspondência parcial (sem diferença de caixa) para flexibilidade
         category_mapping = {
-            'Livros': tipos_documento.filter(nome__icontains='LIVRO').first(),
-            'Artigos': tipos_documento.filter(nome__icontains='ARTIGO').first(),
-            'RelatórioTécnico': tipos_documento.filter(nome__icontains='RELATÓRIO').first(),
-            'Vídeos': tipos_documento.filter(nome__icontains='VÍDEO').first(),
-            'PublicacaoCientifica': tipos_documento.filter(nome__icontains='TRABALHOS ACADÊMICOS').first(),
+            'Livros': tabelas.tipo_documento_por_nome('LIVRO'),
+            'Artigos': tabelas.tipo_documento_por_nome('ARTIGO'),
+            'RelatórioTécnico': tabelas.tipo_documento_por_nome('RELATÓRIO'),
+            'Vídeos': tabelas.tipo_documento_por_nome('VÍDEO'),
+            'PublicacaoCientifica': tabelas.tipo_documento_por_nome('TRABALHOS ACADÊMICOS'),
         }
         # Manter apenas os tipos que existem no banco; converter para IDs
         context['category_mapping'] = {k: v.id for k, v in category_mapping.items() if v}
 
+        # Parâmetros da busca sem `page`, codificados (inclui facetas com vários valores)
+        query_params = self.request.GET.copy()
+        query_params.pop('page', None)
+        context['query_params'] = query_params.urlencode()
+
         return context
 
 
 def subprojetos_por_projeto(request):
     projeto_id = request.GET.get('projeto_id')
 
-    subprojetos = Subprojeto.objects.filter(ativo=True)
-    if projeto_id:
-        subprojetos = subprojetos.filter(projeto_id=projeto_id)
+    subprojetos = tabelas_auxiliares().subprojetos_do_projeto(projeto_id)
 
     data = [
         {'id': subprojeto.id, 'nome': subprojeto.nome}
-        for subprojeto in subprojetos.order_by('nome')
+        for subprojeto in sorted(subprojetos, key=lambda subprojeto: subprojeto.nome)
     ]
     return JsonResponse({'subprojetos': data})
 
+def autocomplete_autores(request):
+    """Sugestões de autores ativos por prefixo do nome (search.autocomplete)."""
+    return resposta_autocomplete(
+        request, 'autores', versao_catalogo(),
+        lambda termo, pagina: sugerir_queryset(Autor.objects.filter(ativo=True), termo, pagina),
+    )
+
+
+def autocomplete_tags(request):
+    """Sugestões de palavras-chave ativas por prefixo do nome (search.autocomplete)."""
+    return resposta_autocomplete(
+        request, 'tags', versao_catalogo(),
+        lambda termo, pagina: sugerir_queryset(Tag.objects.filter(ativo=True), termo, pagina),
+    )
+
+
+def autocomplete_subprojetos(request):
+    """Sugestões de subprojetos ativos, opcionalmente de um projeto (registro em memória)."""
+    projeto_id = request.GET.get('projeto_id') or ''
+    return resposta_autocomplete(
+        request, 'subprojetos', versao_tabelas_auxiliares(),
+        lambda termo, pagina: sugerir_objetos(
+            tabelas_auxiliares().subprojetos_do_projeto(projeto_id), termo, pagina
+        ),
+        projeto_id=projeto_id,
+    )
+
+
 # Função para Download (Mantida)
 def download_registro(request, pk):
     registro = get_object_or_404(Registro, pk=pk)
-# Função para Download (Mantida)
-def download_registro(request, pk):
-    registro = get_object_or_404(Registro, pk=pk)
-    
-    # Lógica de download (verifique o campo do seu modelo)
-    if not registro.arquivo:
-        raise Http404("Arquivo não encontrado.")
-
-    # Tenta usar o arquivo local primeiro
-    try:
-        filepath = registro.arquivo.path
-        filename = os.path.basename(filepath)
-
-        response = FileResponse(open(filepath, 'rb'), content_type='application/force-download')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
-    except (FileNotFoundError, AttributeError, ValueError):
-        # Se o arquivo local não existir ou não estiver disponível, redireciona para a URL
-        # (útil para S3 ou outros backends de armazenamento remoto)
-        if registro.arquivo.url:
-            return HttpResponseRedirect(registro.arquivo.url)
-        raise Http404("Arquivo físico não encontrado no servidor.")
+    # Validadores (304), Range (206) em storage local e redirecionamento no S3
+    return servir_arquivo(request, registro, como_anexo=True)
 
 
 # Função para Visualizar o arquivo
 def view_file(request, pk):
     """
     Abre o arquivo localmente para visualização em uma nova aba.
+
+    Leitores de PDF pedem intervalos do arquivo (Range) em vez do arquivo inteiro.
     """
     registro = get_object_or_404(Registro, pk=pk)
-    
-    if not registro.arquivo:
-        raise Http404("Arquivo não encontrado.")
-
-    # Tenta usar o arquivo local primeiro
-    try:
-        filepath = registro.arquivo.path
-        # Retorna o arquivo para visualização no navegador
-        response = FileResponse(open(filepath, 'rb'))
-        return response
-    except (FileNotFoundError, AttributeError, ValueError):
-        # Se o arquivo local não existir ou não estiver disponível, redireciona para a URL
-        # (útil para S3 ou outros backends de armazenamento remoto)
-        if registro.arquivo.url:
-            return HttpResponseRedirect(registro.arquivo.url)
-        raise Http404("Arquivo físico não encontrado no servidor.")
\ No newline at end of file
+    return servir_arquivo(request, registro)
\ No newline at end of file
@@ -1,7 +1,25 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
 from django.views.generic import TemplateView
-from django.db.models import Count, Q, Prefetch
 
-from apps.repositorio.models.repositorio import FotoGaleria, Projeto, Registro, Autor
+from apps.repositorio.lookup_tables import tabelas_auxiliares
+from apps.repositorio.models.repositorio import FotoGaleria
+from apps.repositorio.rollups import (
+    CAMPOS_ESTATISTICA,
+    estatisticas_projetos,
+    series_publicacoes,
+    total_publicacoes,
+)
+from apps.repositorio.search.versioning import versao_estatisticas, versao_tabelas_auxiliares
+
+# Tempo (s) do corpo da API de estatísticas no cache do servidor (a chave muda a cada versão)
+TIMEOUT_CACHE_ESTATISTICAS = 3600
 
 
 class HomeView(TemplateView):
@@ -9,110 +27,116 @@ class HomeView(TemplateView):
 
     def get_context_data(self, **kwargs):
         """
-        Adiciona contexto específico para a pagina (futuramente dados de contadores/métricas).
+        Adiciona contexto específico para a pagina: contadores lidos das
+        tabelas agregadas (apps.repositorio.rollups), sem contar os registros.
         """
         context = super().get_context_data(**kwargs)
+        context['contadores'] = {
+            'registros_publicos': total_publicacoes(),
+            'projetos': len(tabelas_auxiliares().projetos_ativos),
+        }
         return context
 
 
 class TCCEView(TemplateView):
     template_name = 'website/tcce.html'
 
+    # Abas da página por projeto: 1=TCCE 1/2018, 3=TCCE 2/2020, 4=TCCE 1/2022
+    ABAS_PROJETOS = {1: 'tcce1', 3: 'tcce2', 4: 'tcce3'}
+
     def get_context_data(self, **kwargs):
         """
         Adiciona contexto com estatísticas dinâmicas para cada TCCE.
-        Mensagens de tabulação para cada projeto TCCE com métricas calculadas do banco de dados.
+
+        Os contadores vêm da tabela agregada ProjetoEstatistica
+        (apps.repositorio.rollups), lida numa única consulta para todos os
+        projetos ativos; projetos sem aba ficam em `estatisticas_projetos`.
         """
         context = super().get_context_data(**kwargs)
-        
-        # IDs dos projetos: 1=TCCE 1/2018, 3=TCCE 2/2020, 4=TCCE 1/2022
-        projeto_ids = [1, 3, 4]
-        mapeamento_tabs = {1: 'tcce1', 3: 'tcce2', 4: 'tcce3'}
-        
-        # Dicionário para armazenar estatísticas de cada TCCE
-        tcces = {}
-        
-        for projeto_id in projeto_ids:
-            tab_key = mapeamento_tabs[projeto_id]
-            stats = self._calcular_estatisticas_tcce(projeto_id)
-            tcces[tab_key] = stats
-        
-        context['tcce1'] = tcces.get('tcce1', {})
-        context['tcce2'] = tcces.get('tcce2', {})
-        context['tcce3'] = tcces.get('tcce3', {})
-        
+
+        estatisticas = {
+            projeto_id: self._contadores(estatistica)
+            for projeto_id, estatistica in estatisticas_projetos().items()
+        }
+        for projeto_id, aba in self.ABAS_PROJETOS.items():
+            context[aba] = estatisticas.get(projeto_id, self._contadores(None))
+        context['estatisticas_projetos'] = estatisticas
+
         return context
-    
-    def _calcular_estatisticas_tcce(self, projeto_id):
+
+    @staticmethod
+    def _contadores(estatistica):
         """
-        Calcula as 6 estatísticas principais para um projeto TCCE específico.
-        
-        Args:
-            projeto_id: ID do projeto
-            
-        Returns:
-            Dict com as seguintes chaves:
-            - producoes_academicas: Total de registros ativos
-            - producoes_publicadas: Total de registros com status PUBLICADO
-            - artigos_cientificos: Total de artigos científicos
-            - autores_unicos: Total de autores únicos
-            - subprojetos_ativos: Total de subprojetos ativos
-            - relatorios_tecnicos: Total de relatórios técnicos
+        Dict com as estatísticas de um projeto (zeros se inativo/inexistente):
+        - producoes_academicas: Total de registros ativos
+        - producoes_publicadas: Total de registros com status PUBLICADO
+        - artigos_cientificos: Total de artigos científicos
+        - autores_unicos: Total de autores únicos
+        - subprojetos_ativos: Total de subprojetos ativos
+        - relatorios_tecnicos: Total de relatórios técnicos
         """
-        try:
-            projeto = Projeto.objects.get(id=projeto_id, ativo=True)
-        except Projeto.DoesNotExist:
-            # Retorna zeros se projeto não existe
-            return {
-                'producoes_academicas': 0,
-                'producoes_publicadas': 0,
-                'artigos_cientificos': 0,
-                'autores_unicos': 0,
-                'relatorios_tecnicos': 0,
-            }
-        
-        # Query base para todos os registros do projeto
-        registros_queryset = Registro.objects.filter(
-            subprojeto__projeto=projeto,
-            ativo=True
-        ).select_related(
-            'subprojeto',
-            'subprojeto__projeto',
-            'tipo_documento',
-            'status'
-        ).prefetch_related('autores', 'tags')
-        
-        # Total de produções acadêmicas (todos os registros ativos)
-        producoes_academicas = registros_queryset.count()
-        
-        # Produções publicadas (status = PUBLICADO)
-        producoes_publicadas = registros_queryset.filter(
-            status__nome='PUBLICADO'
-        ).count()
-        
-        # Artigos científicos (tipo_documento contém 'ARTIGO')
-        artigos_cientificos = registros_queryset.filter(
-            tipo_documento__nome__icontains='ARTIGO'
-        ).count()
-        
-        # Autores únicos
-        autores_unicos = Autor.objects.filter(
-            autores__subprojeto__projeto=projeto,
-            ativo=True
-        ).distinct().count()
-        
-        # Relatórios técnicos (tipo_documento contém 'RELATÓRIO')
-        relatorios_tecnicos = registros_queryset.filter(
-            tipo_documento__nome__icontains='RELATÓRIO TÉCNICO FINAL'
-        ).count()
-        
-        return {
-            'producoes_academicas': producoes_academicas,
-            'producoes_publicadas': producoes_publicadas,
-            'artigos_cientificos': artigos_cientificos,
-            'autores_unicos': autores_unicos,
-            'relatorios_tecnicos': relatorios_tecnicos,
-        }
+        return {campo: getattr(estatistica, campo, 0) for campo in CAMPOS_ESTATISTICA}
+
+
+def _ano(valor):
+    valor = str(valor or '').strip()
+    return int(valor) if valor.isdigit() else None
+
+
+def estatisticas(request):
+    """
+    Estatísticas em JSON para painéis e contadores: registros públicos (e
+    autores distintos) por ano × projeto × área temática × tipo de documento,
+    contadores por projeto e os nomes das dimensões. Tudo vem das tabelas
+    agregadas; aceita `projeto` (vários), `ano_inicio` e `ano_fim`.
+
+    O ETag deriva dos filtros e das versões das estatísticas e das tabelas
+    auxiliares: `If-None-Match` igual responde 304 sem ir ao banco.
+    """
+    filtros = {
+        'projeto': sorted({int(valor) for valor in request.GET.getlist('projeto') if valor.strip().isdigit()}),
+        'ano_inicio': _ano(request.GET.get('ano_inicio')),
+        'ano_fim': _ano(request.GET.get('ano_fim')),
+    }
+    assinatura = hashlib.sha1(json.dumps(
+        ['estatisticas', versao_estatisticas(), versao_tabelas_auxiliares(), filtros], sort_keys=True,
+    ).encode()).hexdigest()
+    etag = quote_etag(assinatura)
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        chave = f'repositorio:estatisticas:{assinatura}'
+        corpo = cache.get(chave)
+        if corpo is None:
+            corpo = json.dumps(_dados_estatisticas(**filtros))
+            cache.set(chave, corpo, timeout=TIMEOUT_CACHE_ESTATISTICAS)
+        response = HttpResponse(corpo, content_type='application/json')
+
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'REPOSITORIO_ESTATISTICAS_MAX_AGE', 300))
+    return response
+
+
+def _dados_estatisticas(projeto, ano_inicio, ano_fim):
+    series = series_publicacoes(projeto, ano_inicio, ano_fim)
+    projetos = [
+        dict({'id': projeto_id, 'nome': estatistica.projeto.nome}, **TCCEView._contadores(estatistica))
+        for projeto_id, estatistica in sorted(estatisticas_projetos().items())
+        if not projeto or projeto_id in projeto
+    ]
+    tabelas = tabelas_auxiliares()
+    return {
+        'filtros': {'projeto': projeto, 'ano_inicio': ano_inicio, 'ano_fim': ano_fim},
+        'totais': {'registros': sum(linha['registros'] for linha in series)},
+        'series': series,
+        'projetos': projetos,
+        'dimensoes': {
+            'projetos': {obj.pk: obj.nome for obj in tabelas.projetos},
+            'areas_tematicas': {obj.pk: obj.nome for obj in tabelas.areas_tematicas},
+            'tipos_documento': {obj.pk: obj.nome for obj in tabelas.tipos_documento},
+        },
+    }
 
 
 class ContatoView(TemplateView):
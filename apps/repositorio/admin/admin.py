@@ -5,6 +5,7 @@ from ..models.repositorio import (
     Projeto, Subprojeto, Autor, Tag, TipoDocumento,
     AreaTematica, Status, TipoPublicacao, Registro
 )
+from ..signals import auxiliares_atualizadas_em_lote
 
 
 # ====================================================================
@@ -19,12 +20,15 @@ class BaseMetadataAdmin(admin.ModelAdmin):
     ordering = ('nome',)
     actions = ['marcar_como_ativo', 'marcar_como_inativo']
 
+    # `update()` não dispara os sinais: os dados derivados são avisados em seguida
     def marcar_como_ativo(self, request, queryset):
         queryset.update(ativo=True)
+        auxiliares_atualizadas_em_lote()
     marcar_como_ativo.short_description = "Marcar selecionados como ativos"
 
     def marcar_como_inativo(self, request, queryset):
         queryset.update(ativo=False)
+        auxiliares_atualizadas_em_lote()
     marcar_como_inativo.short_description = "Marcar selecionados como inativos"
 
 # ====================================================================
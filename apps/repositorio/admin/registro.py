@@ -5,6 +5,7 @@ from django.forms import Textarea
 from django.db import models
 # Importação relativa para acessar os modelos do app repositorio
 from ..models.repositorio import Registro
+from ..downloads import assinar_urls, url_arquivo
 # Importação direta do modelo User customizado, que está na pasta 'models' do app 'accounts'
 from apps.accounts.models.user import User
 
@@ -23,7 +24,7 @@ class RegistroAdmin(admin.ModelAdmin):
 
     list_filter = (
         'status__is_public', 'ativo', 'data_publicacao',
-        'tipo_documento', 'area_tematica', 'status', 'subprojeto__projeto',
+        'tipo_documento', 'area_tematica', 'status', 'projeto',
     )
 
     search_fields = (
@@ -87,7 +88,6 @@ class RegistroAdmin(admin.ModelAdmin):
     # -----------------------------------------------------------
     # MÉTODOS CUSTOMIZADOS
     # -----------------------------------------------------------
-    # (Métodos subprojeto_link e visualizar_arquivo permanecem inalterados)
 
     def subprojeto_link(self, obj):
         """Cria um link para a edição do subprojeto no admin."""
@@ -96,10 +96,17 @@ class RegistroAdmin(admin.ModelAdmin):
 
     subprojeto_link.short_description = 'Subprojeto'
 
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        # URLs (assinadas) dos arquivos da página geradas em lote
+        assinar_urls(changelist.result_list)
+        return changelist
+
     def visualizar_arquivo(self, obj):
         """Cria um link direto para o arquivo (S3) ou link externo."""
-        if obj.arquivo and obj.arquivo.url:
-            return format_html('<a href="{}" target="_blank">Download (S3)</a>', obj.arquivo.url)
+        url = url_arquivo(obj)
+        if url:
+            return format_html('<a href="{}" target="_blank">Download (S3)</a>', url)
         if obj.link_externo:
             return format_html('<a href="{}" target="_blank">Link Externo</a>', obj.link_externo)
         return "-"
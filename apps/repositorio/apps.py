@@ -5,3 +5,8 @@ class RepositorioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.repositorio'
     verbose_name = 'Repositorio do TCCE'
+
+    def ready(self):
+        # Registra os lookups de busca (sem_acento/similar) e os handlers de sinais
+        from apps.repositorio.search import lookups  # noqa: F401
+        from apps.repositorio import signals  # noqa: F401
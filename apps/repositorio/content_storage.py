@@ -0,0 +1,165 @@
+"""
+Armazenamento dos arquivos dos registros endereçado pelo conteúdo.
+
+Com REPOSITORIO_ARMAZENAMENTO_POR_CONTEUDO, o caminho de um upload é
+derivado do SHA-256 calculado no pre_save (`item_file_path`). Se um objeto com
+o mesmo conteúdo já existe, o registro passa a apontar para ele e nada é
+enviado ao storage.
+
+Cada objeto tem uma `ArquivoConteudo` com o número de registros que o usam,
+ajustado pelos sinais de Registro na mesma transação da alteração. Objetos sem
+referências não são apagados na hora: `coletar_orfaos` os remove depois de
+um período de carência, conferindo antes (com a linha travada) que nenhum
+registro voltou a usá-los.
+
+Arquivos no layout antigo (por projeto/subprojeto) continuam funcionando; com
+o modo ativo, são removidos após o commit quando nenhum registro os referencia
+(antes isso ficava com o django_cleanup, que não sabia de arquivos
+compartilhados).
+"""
+import logging
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from apps.repositorio.models.repositorio import PREFIXO_CONTEUDO, ArquivoConteudo, Registro, caminho_por_conteudo
+
+logger = logging.getLogger(__name__)
+
+
+def eh_caminho_por_conteudo(nome):
+    return bool(nome) and nome.startswith(PREFIXO_CONTEUDO)
+
+
+def _storage():
+    return Registro._meta.get_field('arquivo').storage
+
+
+def reaproveitar_conteudo(registro):
+    """
+    Aponta um upload ainda não gravado para o objeto de mesmo conteúdo, se já
+    existir (o envio ao storage é evitado). Retorna True quando reaproveitou.
+    """
+    arquivo = registro.arquivo
+    blob = ArquivoConteudo.objects.filter(sha256=registro.arquivo_sha256).order_by('-referencias', 'pk').first()
+    existente = None
+    if blob is not None:
+        # Sem referências, a carência recomeça: a coleta não remove o objeto enquanto ele é reaproveitado
+        ArquivoConteudo.objects.filter(pk=blob.pk, referencias__lte=0).update(orfao_desde=timezone.now())
+        if ArquivoConteudo.objects.filter(pk=blob.pk).exists():
+            existente = blob.arquivo
+    if existente is None:
+        caminho = caminho_por_conteudo(registro.arquivo_sha256, arquivo.name)
+        # Objeto já no storage sem registro de contagem (ex.: coleta interrompida)
+        if not _storage().exists(caminho):
+            return False
+        existente = caminho
+
+    arquivo.name = existente
+    arquivo._committed = True
+    return True
+
+
+def _somar_referencia(nome, delta, tamanho=None, sha256=''):
+    if delta > 0:
+        blob, _ = ArquivoConteudo.objects.get_or_create(
+            arquivo=nome, defaults={'sha256': sha256, 'tamanho': tamanho},
+        )
+        ArquivoConteudo.objects.filter(pk=blob.pk).update(referencias=F('referencias') + delta, orfao_desde=None)
+        return
+    ArquivoConteudo.objects.filter(arquivo=nome).update(referencias=F('referencias') + delta)
+    ArquivoConteudo.objects.filter(arquivo=nome, referencias__lte=0, orfao_desde__isnull=True).update(
+        orfao_desde=timezone.now()
+    )
+
+
+def _remover_se_sem_uso(nome):
+    if not Registro.objects.filter(arquivo=nome).exists():
+        try:
+            _storage().delete(nome)
+        except Exception as e:
+            logger.error(f"Erro ao remover o arquivo {nome}: {e}")
+
+
+def arquivo_substituido(registro, anterior):
+    """Ajusta as referências quando o arquivo de um registro muda (ou é removido)."""
+    novo = registro.arquivo.name if registro.arquivo else ''
+    if novo == (anterior or ''):
+        return
+    if eh_caminho_por_conteudo(novo):
+        _somar_referencia(novo, 1, registro.arquivo_tamanho, registro.arquivo_sha256)
+    if eh_caminho_por_conteudo(anterior):
+        _somar_referencia(anterior, -1)
+    elif anterior:
+        transaction.on_commit(partial(_remover_se_sem_uso, anterior))
+
+
+def arquivo_liberado(nome):
+    """Registro excluído: uma referência a menos (ou remoção do arquivo antigo sem uso)."""
+    if eh_caminho_por_conteudo(nome):
+        _somar_referencia(nome, -1)
+    elif nome:
+        transaction.on_commit(partial(_remover_se_sem_uso, nome))
+
+
+def recontar_referencias():
+    """Recalcula as contagens a partir dos registros (corrige divergências)."""
+    usados = dict(
+        Registro.objects.filter(arquivo__startswith=PREFIXO_CONTEUDO)
+        .values_list('arquivo').annotate(total=Count('pk')).order_by()
+    )
+    atualizados = 0
+    for blob in ArquivoConteudo.objects.all().iterator():
+        total = usados.pop(blob.arquivo, 0)
+        if total != blob.referencias:
+            blob.referencias = total
+            blob.orfao_desde = None if total else (blob.orfao_desde or timezone.now())
+            blob.save(update_fields=['referencias', 'orfao_desde'])
+            atualizados += 1
+
+    # Objetos usados por registros mas sem contagem (ex.: carga por SQL)
+    for nome, total in usados.items():
+        registro = Registro.objects.filter(arquivo=nome).only('arquivo_sha256', 'arquivo_tamanho').first()
+        ArquivoConteudo.objects.create(
+            arquivo=nome, sha256=registro.arquivo_sha256, tamanho=registro.arquivo_tamanho, referencias=total,
+        )
+        atualizados += 1
+    return atualizados
+
+
+def coletar_orfaos(carencia=None):
+    """
+    Remove do storage os objetos sem referências há mais que a carência
+    (REPOSITORIO_ARQUIVOS_ORFAOS_CARENCIA_HORAS). Retorna quantos foram removidos.
+    """
+    if carencia is None:
+        carencia = timedelta(hours=getattr(settings, 'REPOSITORIO_ARQUIVOS_ORFAOS_CARENCIA_HORAS', 24))
+    limite = timezone.now() - carencia
+    candidatos = ArquivoConteudo.objects.filter(referencias__lte=0, orfao_desde__lt=limite).values_list('pk', flat=True)
+
+    removidos = 0
+    for pk in list(candidatos):
+        with transaction.atomic():
+            blob = ArquivoConteudo.objects.select_for_update().filter(
+                pk=pk, referencias__lte=0, orfao_desde__lt=limite,
+            ).first()
+            if blob is None:
+                continue
+            # Confere pelos próprios registros: a contagem pode ter divergido
+            em_uso = Registro.objects.filter(arquivo=blob.arquivo).count()
+            if em_uso:
+                ArquivoConteudo.objects.filter(pk=pk).update(referencias=em_uso, orfao_desde=None)
+                continue
+            try:
+                _storage().delete(blob.arquivo)
+            except Exception as e:
+                logger.error(f"Erro ao remover o arquivo órfão {blob.arquivo}: {e}")
+                continue
+            blob.delete()
+            removidos += 1
+    return removidos
+
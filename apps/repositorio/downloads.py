@@ -0,0 +1,294 @@
+"""
+Entrega dos arquivos dos registros (download e visualização).
+
+As respostas levam validadores (ETag e Last-Modified) derivados do tamanho e
+da data de modificação do arquivo e de `Registro.date_update`, de modo que
+revisitas respondem 304 sem reenviar o arquivo. Em storage local, pedidos com
+Range (leitores de PDF, downloads retomados) recebem 206 com um ou vários
+intervalos (multipart/byteranges).
+
+Em storages remotos (S3) o cliente é redirecionado para a URL do objeto: o
+redirecionamento carrega os mesmos validadores (e responde 304 sem consultar
+o storage) e o próprio S3 atende Range e requisições condicionais na URL final.
+Com URLs assinadas em cache por janela (MediaStorage), o redirecionamento
+pode ficar em cache no navegador até a troca da janela.
+
+Com REPOSITORIO_ENTREGA_ARQUIVOS = 'x-accel-redirect' (nginx) ou 'x-sendfile'
+(Apache/mod_xsendfile), o Django apenas localiza o arquivo e valida o pedido;
+os bytes (e os intervalos) são enviados pelo servidor web, sem ocupar um worker
+Python durante a transferência. O padrão 'django' envia o arquivo pelo worker.
+"""
+import mimetypes
+import os
+import secrets
+import zlib
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+# Tamanho dos blocos lidos ao enviar intervalos
+TAMANHO_BLOCO = 64 * 1024
+
+# Modos de entrega de arquivos locais (REPOSITORIO_ENTREGA_ARQUIVOS)
+ENTREGA_DJANGO = 'django'
+ENTREGA_X_ACCEL = 'x-accel-redirect'
+ENTREGA_X_SENDFILE = 'x-sendfile'
+MODOS_ENTREGA = (ENTREGA_DJANGO, ENTREGA_X_ACCEL, ENTREGA_X_SENDFILE)
+
+# Acima deste número de intervalos o cabeçalho Range é ignorado (resposta 200 completa)
+MAX_INTERVALOS = 20
+
+
+def _caminho_local(arquivo):
+    """Caminho no sistema de arquivos ou None para storages sem acesso local."""
+    try:
+        caminho = arquivo.path
+    except (AttributeError, NotImplementedError, ValueError):
+        return None
+    return caminho if os.path.isfile(caminho) else None
+
+
+def validadores(registro, tamanho=None, modificado_em=None):
+    """
+    (ETag, Last-Modified em segundos) do arquivo do registro. Com o SHA-256
+    gravado no upload, o ETag vem do conteúdo; sem ele, do tamanho/data do
+    arquivo local ou (storage remoto) apenas do nome.
+    """
+    atualizado_em = registro.date_update.timestamp() if registro.date_update else 0
+    # ETag em microssegundos: edições no mesmo segundo também o alteram
+    partes = [f'{int(atualizado_em * 1_000_000):x}']
+    if registro.arquivo_sha256:
+        partes.append(registro.arquivo_sha256[:32])
+        return quote_etag('-'.join(partes)), int(atualizado_em)
+
+    partes.append(f'{zlib.crc32(registro.arquivo.name.encode()):x}')
+    if tamanho is not None:
+        partes.append(f'{tamanho:x}')
+    if modificado_em is not None:
+        partes.append(f'{int(modificado_em * 1_000_000):x}')
+    ultima_modificacao = int(max(atualizado_em, modificado_em or 0))
+    return quote_etag('-'.join(partes)), ultima_modificacao
+
+
+def intervalos_solicitados(cabecalho, tamanho):
+    """
+    Intervalos (início, fim inclusivos) de um cabeçalho `Range: bytes=...`.
+
+    Retorna None quando o cabeçalho deve ser ignorado (ausente, malformado ou
+    com intervalos demais) e lista vazia quando nenhum intervalo é satisfazível.
+    """
+    if not cabecalho:
+        return None
+    unidade, _, especificacao = cabecalho.partition('=')
+    if unidade.strip().lower() != 'bytes' or not especificacao.strip():
+        return None
+    pedidos = [parte.strip() for parte in especificacao.split(',') if parte.strip()]
+    if not pedidos or len(pedidos) > MAX_INTERVALOS:
+        return None
+
+    intervalos = []
+    for pedido in pedidos:
+        inicio, separador, fim = pedido.partition('-')
+        if not separador:
+            return None
+        try:
+            if not inicio:
+                # Sufixo: os últimos N bytes
+                sufixo = int(fim)
+                if sufixo <= 0 or tamanho == 0:
+                    continue
+                intervalos.append((max(tamanho - sufixo, 0), tamanho - 1))
+                continue
+            inicio = int(inicio)
+            fim = int(fim) if fim else None
+        except ValueError:
+            return None
+        if fim is not None and inicio > fim:
+            return None
+        if inicio < tamanho:
+            intervalos.append((inicio, tamanho - 1 if fim is None else min(fim, tamanho - 1)))
+    return intervalos
+
+
+def _if_range_confere(request, etag, ultima_modificacao):
+    """Range só vale se o If-Range (quando enviado) ainda descreve o arquivo atual."""
+    condicao = request.headers.get('If-Range')
+    if not condicao:
+        return True
+    if condicao.startswith('"'):
+        return condicao == etag
+    return parse_http_date_safe(condicao) == ultima_modificacao
+
+
+def _ler_intervalo(caminho, inicio, fim, tamanho_bloco=TAMANHO_BLOCO):
+    with open(caminho, 'rb') as origem:
+        origem.seek(inicio)
+        restante = fim - inicio + 1
+        while restante > 0:
+            bloco = origem.read(min(tamanho_bloco, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+
+
+def _partes_multipart(caminho, intervalos, tamanho, content_type, separador):
+    cabecalhos = [
+        (
+            f'--{separador}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Range: bytes {inicio}-{fim}/{tamanho}\r\n\r\n'
+        ).encode()
+        for inicio, fim in intervalos
+    ]
+    fechamento = f'--{separador}--\r\n'.encode()
+    comprimento = (
+        sum(len(cabecalho) for cabecalho in cabecalhos)
+        + sum(fim - inicio + 1 + 2 for inicio, fim in intervalos)
+        + len(fechamento)
+    )
+
+    def gerar():
+        for cabecalho, (inicio, fim) in zip(cabecalhos, intervalos):
+            yield cabecalho
+            yield from _ler_intervalo(caminho, inicio, fim)
+            yield b'\r\n'
+        yield fechamento
+
+    return gerar(), comprimento
+
+
+def _resposta_parcial(caminho, intervalos, tamanho, content_type):
+    if len(intervalos) == 1:
+        inicio, fim = intervalos[0]
+        response = StreamingHttpResponse(_ler_intervalo(caminho, inicio, fim), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+        response['Content-Length'] = str(fim - inicio + 1)
+        return response
+
+    separador = secrets.token_hex(16)
+    corpo, comprimento = _partes_multipart(caminho, intervalos, tamanho, content_type, separador)
+    response = StreamingHttpResponse(corpo, status=206, content_type=f'multipart/byteranges; boundary={separador}')
+    response['Content-Length'] = str(comprimento)
+    return response
+
+
+def _aplicar_validadores(response, etag, ultima_modificacao):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(ultima_modificacao)
+    return response
+
+
+def url_arquivo(registro):
+    """URL do arquivo no storage, reaproveitando a assinada em lote por `assinar_urls`."""
+    if not registro.arquivo:
+        return None
+    url = getattr(registro, '_url_arquivo', None)
+    return url if url is not None else registro.arquivo.url
+
+
+def assinar_urls(registros):
+    """
+    Gera de uma vez as URLs dos arquivos de uma página de registros (storages
+    com `urls()` em lote, como o MediaStorage) e as guarda em cada registro
+    para `url_arquivo`. Em outros storages não faz nada.
+    """
+    registros = [registro for registro in registros if registro.arquivo]
+    if not registros:
+        return
+    storage = registros[0].arquivo.storage
+    if not hasattr(storage, 'urls'):
+        return
+    urls = storage.urls([registro.arquivo.name for registro in registros])
+    for registro in registros:
+        registro._url_arquivo = urls.get(registro.arquivo.name)
+
+
+def modo_entrega():
+    modo = getattr(settings, 'REPOSITORIO_ENTREGA_ARQUIVOS', ENTREGA_DJANGO) or ENTREGA_DJANGO
+    if modo not in MODOS_ENTREGA:
+        raise ImproperlyConfigured(
+            f"REPOSITORIO_ENTREGA_ARQUIVOS deve ser um de {', '.join(MODOS_ENTREGA)} (recebido: {modo!r})."
+        )
+    return modo
+
+
+def _resposta_delegada(modo, arquivo, caminho, nome, content_type, como_anexo):
+    """Resposta vazia com o cabeçalho que faz o servidor web enviar o arquivo."""
+    response = HttpResponse(content_type=content_type)
+    if modo == ENTREGA_X_ACCEL:
+        # Location `internal` do nginx apontando para o MEDIA_ROOT
+        prefixo = getattr(settings, 'REPOSITORIO_ENTREGA_PREFIXO_INTERNO', '/media-interna/')
+        response['X-Accel-Redirect'] = f"{prefixo.rstrip('/')}/{quote(arquivo.name.replace(os.sep, '/'))}"
+    else:
+        response['X-Sendfile'] = caminho
+    response['Content-Disposition'] = content_disposition_header(como_anexo, nome)
+    return response
+
+
+def servir_arquivo(request, registro, como_anexo=False):
+    """
+    Resposta para o arquivo do registro: 304 quando os validadores conferem,
+    206 para pedidos com Range satisfazível (416 quando nenhum é), 200 com o
+    arquivo completo ou redirecionamento para o storage remoto.
+    """
+    arquivo = registro.arquivo
+    if not arquivo:
+        raise Http404("Arquivo não encontrado.")
+
+    # Nome original do upload (no armazenamento por conteúdo o caminho é o hash)
+    nome = registro.arquivo_nome or os.path.basename(arquivo.name)
+    caminho = _caminho_local(arquivo)
+
+    if caminho is None:
+        # Storage remoto: o S3 atende Range/condicionais na URL de destino
+        etag, ultima_modificacao = validadores(registro)
+        condicional = get_conditional_response(request, etag=etag, last_modified=ultima_modificacao)
+        if condicional is not None:
+            return condicional
+        try:
+            url = url_arquivo(registro)
+        except Exception:
+            url = None
+        if not url:
+            raise Http404("Arquivo físico não encontrado no servidor.")
+        response = HttpResponseRedirect(url)
+        if hasattr(arquivo.storage, 'validade_url'):
+            # A URL não muda até o fim da janela de assinatura
+            response['Cache-Control'] = f'private, max-age={arquivo.storage.validade_url()}'
+        return _aplicar_validadores(response, etag, ultima_modificacao)
+
+    estatisticas = os.stat(caminho)
+    tamanho = estatisticas.st_size
+    etag, ultima_modificacao = validadores(registro, tamanho, estatisticas.st_mtime)
+    condicional = get_conditional_response(request, etag=etag, last_modified=ultima_modificacao)
+    if condicional is not None:
+        condicional['Accept-Ranges'] = 'bytes'
+        return condicional
+
+    content_type = registro.arquivo_mime or mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+    modo = modo_entrega()
+    if modo != ENTREGA_DJANGO:
+        # Range e If-Range ficam com o servidor web
+        response = _resposta_delegada(modo, arquivo, caminho, nome, content_type, como_anexo)
+        return _aplicar_validadores(response, etag, ultima_modificacao)
+
+    intervalos = None
+    if request.method in ('GET', 'HEAD') and _if_range_confere(request, etag, ultima_modificacao):
+        intervalos = intervalos_solicitados(request.headers.get('Range'), tamanho)
+
+    if intervalos == []:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{tamanho}'
+    elif intervalos:
+        response = _resposta_parcial(caminho, intervalos, tamanho, content_type)
+    else:
+        response = FileResponse(open(caminho, 'rb'), as_attachment=como_anexo, filename=nome, content_type=content_type)
+
+    if intervalos:
+        response['Content-Disposition'] = content_disposition_header(como_anexo, nome)
+    response['Accept-Ranges'] = 'bytes'
+    return _aplicar_validadores(response, etag, ultima_modificacao)
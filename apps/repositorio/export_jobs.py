@@ -0,0 +1,252 @@
+"""
+Exportações ZIP em segundo plano.
+
+O pedido de exportação grava uma `ExportacaoArquivos` identificada pela chave
+dos filtros normalizados + versão do catálogo e a enfileira; threads do
+próprio processo (REPOSITORIO_EXPORTACAO_WORKERS) geram o ZIP num arquivo
+temporário com `exports.gerar_zip` e o salvam no storage, atualizando o
+progresso. Com 0 workers os pedidos ficam pendentes para o comando
+`processar_exportacoes` (worker separado).
+
+Enquanto o catálogo não muda, o mesmo conjunto de filtros aponta para a mesma
+chave e o ZIP já gerado é servido imediatamente.
+
+O worker grava `date_update` ao assumir a exportação e a cada bloco de
+progresso. Uma exportação pendente ou em processamento sem sinal de vida há
+mais de REPOSITORIO_EXPORTACAO_ABANDONO_MINUTOS (processo reiniciado ou
+encerrado no meio do trabalho) é tratada como abandonada: volta para a fila
+no próximo pedido ou consulta de status e pode ser removida pela limpeza.
+"""
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.repositorio.exports import arquivos_dos_documentos, filtrar_documentos, gerar_zip
+from apps.repositorio.models.repositorio import ExportacaoArquivos, Registro
+from apps.repositorio.search.filters import PARAMETROS_GESTAO
+from apps.repositorio.search.versioning import versao_catalogo
+
+logger = logging.getLogger(__name__)
+
+# A cada quantos arquivos o progresso é gravado no banco
+INTERVALO_PROGRESSO = 10
+
+_executor = None
+_trava = threading.Lock()
+
+
+def normalizar_filtros(query_params):
+    """Filtros relevantes, sem valores vazios e com o termo de busca sem diferença de caixa/espaços."""
+    filtros = {}
+    # Parâmetros da listagem de gestão que alteram o conjunto exportado
+    for nome in PARAMETROS_GESTAO:
+        valor = ' '.join(str(query_params.get(nome) or '').split())
+        if valor:
+            filtros[nome] = valor.lower() if nome == 'q' else valor
+    return filtros
+
+
+def chave_exportacao(filtros, versao):
+    return hashlib.sha1(json.dumps({'filtros': filtros, 'versao': versao}, sort_keys=True).encode()).hexdigest()
+
+
+def arquivo_disponivel(exportacao):
+    """Indica se a exportação terminou e o ZIP ainda está no storage."""
+    return (
+        exportacao.status == ExportacaoArquivos.CONCLUIDA
+        and bool(exportacao.arquivo)
+        and exportacao.arquivo.storage.exists(exportacao.arquivo.name)
+    )
+
+
+def _limite_abandono():
+    minutos = getattr(settings, 'REPOSITORIO_EXPORTACAO_ABANDONO_MINUTOS', 15)
+    return timezone.now() - timedelta(minutes=minutos)
+
+
+def abandonada(exportacao):
+    """Indica se a exportação está pendente/em processamento sem sinal de vida do worker."""
+    return (
+        exportacao.status in (ExportacaoArquivos.PENDENTE, ExportacaoArquivos.PROCESSANDO)
+        and exportacao.date_update < _limite_abandono()
+    )
+
+
+def _reenfileirar(exportacao):
+    """
+    Volta a exportação para a fila. A condição sobre a situação e o
+    `date_update` lidos garante que só um pedido concorrente a reenfileire.
+    """
+    reenfileirada = ExportacaoArquivos.objects.filter(
+        pk=exportacao.pk, status=exportacao.status, date_update=exportacao.date_update,
+    ).update(
+        status=ExportacaoArquivos.PENDENTE, processados=0, mensagem_erro='', arquivo=None,
+        date_update=timezone.now(),
+    )
+    exportacao.refresh_from_db()
+    if reenfileirada:
+        enfileirar(exportacao.pk)
+    return bool(reenfileirada)
+
+
+def retomar_abandonada(exportacao):
+    """Reenfileira a exportação se ela tiver sido abandonada pelo worker. Retorna a exportação atualizada."""
+    if abandonada(exportacao):
+        logger.warning(f"Exportação {exportacao.chave} abandonada em '{exportacao.status}'; reenfileirada")
+        _reenfileirar(exportacao)
+    return exportacao
+
+
+def solicitar_exportacao(query_params, usuario=None):
+    """
+    Exportação correspondente aos filtros: a já existente para a versão atual
+    do catálogo (concluída ou em andamento) ou uma nova, enfileirada.
+    """
+    filtros = normalizar_filtros(query_params)
+    versao = versao_catalogo()
+    exportacao, criada = ExportacaoArquivos.objects.get_or_create(
+        chave=chave_exportacao(filtros, versao),
+        defaults={'parametros': filtros, 'versao_catalogo': versao, 'usuario': usuario},
+    )
+
+    if criada:
+        enfileirar(exportacao.pk)
+        return exportacao
+
+    refazer = (
+        exportacao.status == ExportacaoArquivos.ERRO
+        or (exportacao.status == ExportacaoArquivos.CONCLUIDA and not arquivo_disponivel(exportacao))
+    )
+    if refazer:
+        _reenfileirar(exportacao)
+    return retomar_abandonada(exportacao)
+
+
+def _obter_executor():
+    global _executor
+    workers = getattr(settings, 'REPOSITORIO_EXPORTACAO_WORKERS', 1)
+    if workers <= 0:
+        return None
+    with _trava:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='exportacao')
+        return _executor
+
+
+def enfileirar(exportacao_id):
+    """Agenda a geração após o commit (a thread precisa enxergar a exportação gravada)."""
+    executor = _obter_executor()
+    if executor is None:
+        return
+    transaction.on_commit(lambda: executor.submit(_processar_em_thread, exportacao_id))
+
+
+def _processar_em_thread(exportacao_id):
+    try:
+        processar_exportacao(exportacao_id)
+    except Exception:
+        logger.exception(f"Erro inesperado na exportação {exportacao_id}")
+    finally:
+        # Conexões abertas pela thread não são fechadas pelo ciclo de requisição
+        connections.close_all()
+
+
+def _contar_progresso(arquivos, exportacao_id):
+    processados = 0
+    for item in arquivos:
+        yield item
+        processados += 1
+        if processados % INTERVALO_PROGRESSO == 0:
+            # Também serve de sinal de vida do worker (ver `abandonada`)
+            ExportacaoArquivos.objects.filter(pk=exportacao_id).update(
+                processados=processados, date_update=timezone.now(),
+            )
+
+
+def processar_exportacao(exportacao_id):
+    """
+    Gera o ZIP de uma exportação pendente. Retorna a exportação atualizada ou
+    None se ela já tiver sido assumida por outro worker.
+    """
+    assumida = ExportacaoArquivos.objects.filter(
+        pk=exportacao_id, status=ExportacaoArquivos.PENDENTE,
+    ).update(status=ExportacaoArquivos.PROCESSANDO, processados=0, date_update=timezone.now())
+    if not assumida:
+        return None
+
+    exportacao = ExportacaoArquivos.objects.get(pk=exportacao_id)
+    queryset = filtrar_documentos(exportacao.parametros).exclude(arquivo='')
+    exportacao.total = queryset.count()
+    ExportacaoArquivos.objects.filter(pk=exportacao_id).update(total=exportacao.total, date_update=timezone.now())
+
+    storage = Registro._meta.get_field('arquivo').storage
+    try:
+        with tempfile.TemporaryFile() as temporario:
+            arquivos = _contar_progresso(arquivos_dos_documentos(queryset), exportacao_id)
+            for bloco in gerar_zip(arquivos, storage):
+                temporario.write(bloco)
+            exportacao.tamanho = temporario.tell()
+            temporario.seek(0)
+            exportacao.arquivo.save(f'{exportacao.chave}.zip', File(temporario), save=False)
+    except Exception as e:
+        logger.exception(f"Erro ao gerar a exportação {exportacao.chave}")
+        ExportacaoArquivos.objects.filter(pk=exportacao_id).update(
+            status=ExportacaoArquivos.ERRO, mensagem_erro=str(e), date_update=timezone.now(),
+        )
+        exportacao.refresh_from_db()
+        return exportacao
+
+    ExportacaoArquivos.objects.filter(pk=exportacao_id).update(
+        status=ExportacaoArquivos.CONCLUIDA,
+        arquivo=exportacao.arquivo.name,
+        tamanho=exportacao.tamanho,
+        processados=F('total'),
+        concluida_em=timezone.now(),
+        date_update=timezone.now(),
+    )
+    exportacao.refresh_from_db()
+    return exportacao
+
+
+def recuperar_abandonadas():
+    """Devolve à fila as exportações em processamento abandonadas. Retorna quantas foram recuperadas."""
+    return ExportacaoArquivos.objects.filter(
+        status=ExportacaoArquivos.PROCESSANDO, date_update__lt=_limite_abandono(),
+    ).update(status=ExportacaoArquivos.PENDENTE, processados=0, date_update=timezone.now())
+
+
+def processar_pendentes(limite=None):
+    """Processa as exportações pendentes (inclusive as abandonadas), das mais antigas para as mais novas."""
+    recuperar_abandonadas()
+    pendentes = ExportacaoArquivos.objects.filter(status=ExportacaoArquivos.PENDENTE).order_by('date_create')
+    ids = list(pendentes.values_list('pk', flat=True))
+    if limite:
+        ids = ids[:limite]
+    return [exportacao for exportacao in map(processar_exportacao, ids) if exportacao is not None]
+
+
+def limpar_exportacoes(dias=None):
+    """
+    Remove exportações (e seus ZIPs) mais antigas que a validade configurada,
+    exceto as que estão sendo processadas (com sinal de vida recente).
+    """
+    dias = getattr(settings, 'REPOSITORIO_EXPORTACAO_VALIDADE_DIAS', 7) if dias is None else dias
+    antigas = ExportacaoArquivos.objects.filter(date_create__lt=timezone.now() - timedelta(days=dias))
+    removidas = 0
+    em_andamento = {'status': ExportacaoArquivos.PROCESSANDO, 'date_update__gte': _limite_abandono()}
+    for exportacao in antigas.exclude(**em_andamento).iterator():
+        if exportacao.arquivo:
+            exportacao.arquivo.delete(save=False)
+        exportacao.delete()
+        removidas += 1
+    return removidas
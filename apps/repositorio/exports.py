@@ -0,0 +1,268 @@
+"""
+Exportação dos arquivos dos registros em ZIP.
+
+O ZIP é gerado em fluxo: o ZipFile escreve num destino não posicionável
+(`_SaidaStream`), que é esvaziado a cada bloco copiado, e cada arquivo é lido
+do storage em blocos de TAMANHO_BLOCO. O consumo de memória não depende do
+tamanho do arquivo nem do número de registros, e os primeiros bytes saem
+assim que o primeiro bloco é lido.
+
+Com storages remotos (S3) o tempo dominante é a latência de cada objeto. Por
+isso os próximos arquivos são abertos antecipadamente por um pool de threads
+(REPOSITORIO_EXPORTACAO_CONCORRENCIA), que já lê até
+TAMANHO_LEITURA_ANTECIPADA bytes de cada um. As leituras são consumidas na
+ordem de entrada (buffer de reordenação limitado ao tamanho do pool), então a
+ordem das entradas no ZIP não muda e a memória fica limitada a
+concorrência x TAMANHO_LEITURA_ANTECIPADA. O restante dos arquivos maiores é
+lido bloco a bloco numa thread auxiliar, com o mesmo tempo máximo
+(REPOSITORIO_EXPORTACAO_TIMEOUT_ARQUIVO) por bloco: um objeto que trava no
+meio da transferência não prende a exportação.
+
+Cada arquivo falha isoladamente: um erro de leitura no meio da cópia descarta
+a entrada (os bytes já enviados ficam fora do diretório central e são
+ignorados pelos leitores de ZIP) e a exportação segue com os próximos. Se
+nenhum arquivo puder ser aberto, `gerar_zip` levanta NenhumArquivoLido antes
+do primeiro bloco, o que permite à view responder com erro em vez de um ZIP
+vazio.
+"""
+import contextlib
+import logging
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.text import slugify
+
+from apps.repositorio.models.repositorio import RegistroDocumento
+from apps.repositorio.search.filters import FiltrosGestao
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos lidos do storage e enviados ao cliente
+TAMANHO_BLOCO = 64 * 1024
+
+# Linhas buscadas por vez ao percorrer o queryset da exportação
+TAMANHO_LOTE_CONSULTA = 500
+
+# Bytes de cada arquivo lidos antecipadamente pelo pool; o restante de
+# arquivos maiores é lido em blocos durante a compressão
+TAMANHO_LEITURA_ANTECIPADA = 4 * 1024 * 1024
+
+
+class NenhumArquivoLido(Exception):
+    """Nenhum dos arquivos da exportação pôde ser lido (mensagem exibível ao usuário)."""
+
+    def __init__(self, mensagem='Nenhum arquivo pôde ser lido com sucesso.'):
+        super().__init__(mensagem)
+
+
+class _SaidaStream:
+    """Destino não posicionável do ZipFile: acumula os bytes escritos até serem coletados."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def coletar(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def filtrar_documentos(query_params):
+    """
+    Mesmos filtros da listagem de gestão (search.filters) sobre o modelo de
+    leitura RegistroDocumento (ids e nomes já achatados), usado pelas exportações.
+    """
+    queryset = FiltrosGestao(query_params).aplicar(RegistroDocumento.objects.all(), prefixo='registro__')
+    return queryset.order_by('-date_create', '-registro_id')
+
+
+def caminho_no_zip(arquivo, projeto_nome, subprojeto_nome, arquivo_nome=''):
+    """Caminho da entrada no ZIP: projeto_slug/subprojeto_slug/arquivo (com o nome original do upload)."""
+    projeto_slug = slugify(projeto_nome or 'sem-projeto')
+    subprojeto_slug = slugify(subprojeto_nome or 'sem-subprojeto')
+    return f"{projeto_slug}/{subprojeto_slug}/{arquivo_nome or os.path.basename(arquivo)}"
+
+
+def arquivos_dos_documentos(queryset):
+    """Pares (caminho no ZIP, nome no storage) dos RegistroDocumento com arquivo, sem carregar tudo."""
+    linhas = (
+        queryset.exclude(arquivo='')
+        .values_list('arquivo', 'projeto_nome', 'subprojeto_nome', 'arquivo_nome')
+        .iterator(chunk_size=TAMANHO_LOTE_CONSULTA)
+    )
+    for arquivo, projeto_nome, subprojeto_nome, arquivo_nome in linhas:
+        yield caminho_no_zip(arquivo, projeto_nome, subprojeto_nome, arquivo_nome), arquivo
+
+
+def _abrir(storage, nome, limite):
+    """Abre o arquivo no storage e lê até `limite` bytes (executado no pool)."""
+    origem = storage.open(nome, 'rb')
+    try:
+        return origem, origem.read(limite)
+    except Exception:
+        origem.close()
+        raise
+
+
+def _fechar_resultado(futuro):
+    if not futuro.cancelled() and futuro.exception() is None:
+        futuro.result()[0].close()
+
+
+def _descartar(futuro):
+    """Cancela uma leitura não consumida ou fecha o arquivo quando ela terminar."""
+    if not futuro.cancel():
+        futuro.add_done_callback(_fechar_resultado)
+
+
+class _LeitorComTempo:
+    """
+    Lê blocos numa thread auxiliar com `timeout` segundos por leitura. Uma
+    leitura travada não pode ser interrompida: a thread é abandonada (o arquivo
+    é fechado por quem o abriu) e as próximas leituras usam uma nova.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._executor = None
+
+    def ler(self, origem, tamanho):
+        if not self.timeout:
+            return origem.read(tamanho)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='exportacao-bloco')
+        futuro = self._executor.submit(origem.read, tamanho)
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TimeoutError:
+            self.close()
+            raise TimeoutError(f"tempo esgotado na leitura de um bloco ({self.timeout}s)") from None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _abrir_em_ordem(arquivos, storage, concorrencia, timeout, limite=TAMANHO_LEITURA_ANTECIPADA):
+    """
+    Gera (caminho, nome, arquivo aberto, bytes iniciais) na ordem de `arquivos`,
+    mantendo até `concorrencia` aberturas em andamento. Arquivos que falham ou
+    excedem `timeout` segundos de espera são registrados no log e ignorados.
+    """
+    if concorrencia <= 1:
+        for caminho, nome in arquivos:
+            try:
+                origem, inicio = _abrir(storage, nome, limite)
+            except Exception as e:
+                logger.error(f"Erro ao adicionar arquivo {nome or 'unknown'}: {str(e)}")
+                continue
+            yield caminho, nome, origem, inicio
+        return
+
+    executor = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix='exportacao-leitura')
+    pendentes = deque()
+    restantes = iter(arquivos)
+    try:
+        while True:
+            # O queryset é percorrido nesta thread; o pool só acessa o storage
+            for caminho, nome in restantes:
+                pendentes.append((caminho, nome, executor.submit(_abrir, storage, nome, limite)))
+                if len(pendentes) >= concorrencia:
+                    break
+            if not pendentes:
+                break
+
+            caminho, nome, futuro = pendentes.popleft()
+            try:
+                origem, inicio = futuro.result(timeout=timeout)
+            except TimeoutError:
+                _descartar(futuro)
+                logger.error(f"Tempo esgotado ao ler o arquivo {nome or 'unknown'} ({timeout}s)")
+                continue
+            except Exception as e:
+                logger.error(f"Erro ao adicionar arquivo {nome or 'unknown'}: {str(e)}")
+                continue
+            yield caminho, nome, origem, inicio
+    finally:
+        # Cliente desconectado ou erro: nada de leituras órfãs com arquivos abertos
+        for _, _, futuro in pendentes:
+            _descartar(futuro)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _descartar_entrada(zip_file, entrada):
+    """Tira do diretório central uma entrada interrompida (os bytes já escritos passam a ser ignorados)."""
+    if entrada in zip_file.filelist:
+        zip_file.filelist.remove(entrada)
+    zip_file.NameToInfo.pop(entrada.filename, None)
+
+
+def gerar_zip(arquivos, storage, tamanho_bloco=TAMANHO_BLOCO, concorrencia=None, timeout=None):
+    """
+    Gera o ZIP em blocos de bytes a partir de pares (caminho no ZIP, nome no
+    storage). Arquivos que não puderem ser abertos ou que falharem durante a
+    leitura são registrados no log e ignorados; se nenhum puder ser aberto,
+    levanta NenhumArquivoLido antes de gerar qualquer bloco.
+
+    `concorrencia` e `timeout` (segundos de espera pela abertura de cada
+    arquivo e por cada bloco lido depois dela) assumem por padrão
+    REPOSITORIO_EXPORTACAO_CONCORRENCIA e REPOSITORIO_EXPORTACAO_TIMEOUT_ARQUIVO.
+    """
+    if concorrencia is None:
+        concorrencia = getattr(settings, 'REPOSITORIO_EXPORTACAO_CONCORRENCIA', 8)
+    if timeout is None:
+        timeout = getattr(settings, 'REPOSITORIO_EXPORTACAO_TIMEOUT_ARQUIVO', 60)
+
+    saida = _SaidaStream()
+    leitor = _LeitorComTempo(timeout)
+    abertos = 0
+    with contextlib.closing(leitor), zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for caminho, nome, origem, inicio in _abrir_em_ordem(arquivos, storage, concorrencia, timeout):
+            abertos += 1
+            entrada = zipfile.ZipInfo(caminho, date_time=time.localtime()[:6])
+            entrada.compress_type = zipfile.ZIP_DEFLATED
+            try:
+                # Tamanho desconhecido de antemão: zip64 permite entradas acima de 4 GB
+                with origem, zip_file.open(entrada, 'w', force_zip64=True) as destino:
+                    inicio = memoryview(inicio)
+                    blocos = (inicio[i:i + tamanho_bloco] for i in range(0, len(inicio), tamanho_bloco))
+                    for bloco in blocos:
+                        destino.write(bloco)
+                        dados = saida.coletar()
+                        if dados:
+                            yield dados
+                    while bloco := leitor.ler(origem, tamanho_bloco):
+                        destino.write(bloco)
+                        dados = saida.coletar()
+                        if dados:
+                            yield dados
+            except Exception as e:
+                _descartar_entrada(zip_file, entrada)
+                logger.error(f"Erro ao ler o arquivo {nome or 'unknown'}: {str(e)}")
+
+            dados = saida.coletar()
+            if dados:
+                yield dados
+
+        if not abertos:
+            raise NenhumArquivoLido()
+
+    # Diretório central, escrito ao fechar o ZipFile
+    yield saida.coletar()
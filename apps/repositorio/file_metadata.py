@@ -0,0 +1,138 @@
+"""
+Metadados dos arquivos dos registros: tamanho, tipo (MIME), SHA-256 e páginas.
+
+São calculados numa única leitura em blocos do upload, no `pre_save` do
+Registro (antes de o arquivo ir para o storage), e gravados no próprio
+registro. Listagens, exportações e os validadores HTTP dos downloads usam os
+campos gravados, sem consultar o storage (um HEAD por arquivo no S3).
+
+O número de páginas de PDFs usa o pypdf (opcional); sem ele fica vazio.
+Arquivos enviados antes desses campos são preenchidos pelo comando
+`preencher_metadados_arquivos`.
+"""
+import hashlib
+import logging
+import mimetypes
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - dependência opcional
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos lidos no cálculo do hash
+TAMANHO_BLOCO = 64 * 1024
+
+# Registros gravados por vez no preenchimento dos arquivos existentes
+TAMANHO_LOTE = 100
+
+# Assinaturas (bytes iniciais) dos tipos mais comuns no acervo
+ASSINATURAS = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+MetadadosArquivo = namedtuple('MetadadosArquivo', ['tamanho', 'mime', 'sha256', 'paginas'])
+
+CAMPOS_METADADOS = ['arquivo_tamanho', 'arquivo_mime', 'arquivo_sha256', 'arquivo_paginas']
+
+
+def identificar_mime(inicio, nome):
+    """Tipo pelo conteúdo (assinatura) e, se não reconhecido, pela extensão do nome."""
+    for assinatura, mime in ASSINATURAS:
+        if inicio.startswith(assinatura):
+            return mime
+    return mimetypes.guess_type(nome or '')[0] or 'application/octet-stream'
+
+
+def contar_paginas(arquivo):
+    """Páginas de um PDF (arquivo posicionável) ou None se o pypdf não estiver disponível/falhar."""
+    if PdfReader is None:
+        return None
+    try:
+        arquivo.seek(0)
+        return len(PdfReader(arquivo, strict=False).pages)
+    except Exception as e:
+        logger.warning(f"Não foi possível contar as páginas de {getattr(arquivo, 'name', '')}: {e}")
+        return None
+
+
+def extrair_metadados(arquivo, nome=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Metadados de um `File` (upload ou aberto do storage) numa leitura em blocos."""
+    nome = nome or getattr(arquivo, 'name', '')
+    sha256 = hashlib.sha256()
+    tamanho = 0
+    inicio = b''
+    for bloco in arquivo.chunks(tamanho_bloco):
+        if not inicio:
+            inicio = bloco[:16]
+        sha256.update(bloco)
+        tamanho += len(bloco)
+
+    mime = identificar_mime(inicio, nome)
+    paginas = contar_paginas(arquivo) if mime == 'application/pdf' else None
+    try:
+        arquivo.seek(0)
+    except (AttributeError, OSError):
+        pass
+    return MetadadosArquivo(tamanho, mime, sha256.hexdigest(), paginas)
+
+
+def aplicar_metadados(registro, metadados=None):
+    """Copia os metadados para os campos do registro (None limpa os campos)."""
+    registro.arquivo_tamanho = metadados.tamanho if metadados else None
+    registro.arquivo_mime = metadados.mime if metadados else ''
+    registro.arquivo_sha256 = metadados.sha256 if metadados else ''
+    registro.arquivo_paginas = metadados.paginas if metadados else None
+
+
+def _ler_metadados(storage, nome):
+    with storage.open(nome, 'rb') as arquivo:
+        return extrair_metadados(arquivo, nome)
+
+
+def preencher_metadados(queryset, concorrencia=8, tamanho_lote=TAMANHO_LOTE):
+    """
+    Calcula os metadados dos registros do queryset lendo os arquivos do storage
+    em paralelo (`concorrencia` leituras simultâneas). Retorna (preenchidos, falhas).
+    """
+    from apps.repositorio.models.repositorio import Registro
+    from apps.repositorio.search.documents import sincronizar_documentos
+
+    storage = Registro._meta.get_field('arquivo').storage
+    registros = queryset.exclude(arquivo='').exclude(arquivo__isnull=True).only('pk', 'arquivo').order_by('pk')
+    preenchidos = falhas = 0
+
+    with ThreadPoolExecutor(max_workers=max(concorrencia, 1), thread_name_prefix='metadados') as executor:
+        for registro_ids in _em_lotes(list(registros.values_list('pk', flat=True)), tamanho_lote):
+            # Só o storage é acessado nas threads; o banco fica na thread principal
+            pendentes = [
+                (registro, executor.submit(_ler_metadados, storage, registro.arquivo.name))
+                for registro in registros.filter(pk__in=registro_ids)
+            ]
+            lote = []
+            for registro, futuro in pendentes:
+                try:
+                    aplicar_metadados(registro, futuro.result())
+                except Exception as e:
+                    falhas += 1
+                    logger.error(f"Erro ao ler metadados de {registro.arquivo.name}: {e}")
+                    continue
+                lote.append(registro)
+            if lote:
+                # update em lote não dispara sinais: o documento de leitura é atualizado aqui
+                Registro.objects.bulk_update(lote, CAMPOS_METADADOS)
+                sincronizar_documentos([registro.pk for registro in lote])
+                preenchidos += len(lote)
+    return preenchidos, falhas
+
+
+def _em_lotes(itens, tamanho):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
@@ -1,11 +1,51 @@
 from django import forms
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import models, transaction
 from django.db.models.functions import Lower
+from django.urls import reverse_lazy
 from apps.repositorio.models.repositorio import (
     Registro, Projeto, Subprojeto, Autor, Tag, TipoDocumento,
-    AreaTematica, Status, TipoPublicacao
+    AreaTematica, Status, TipoPublicacao, armazenamento_por_conteudo
 )
+from apps.repositorio.forms.widgets import AutocompleteSelectMultiple
+from apps.repositorio.lookup_tables import definir_opcoes, tabelas_auxiliares
+from apps.repositorio.signals import sincronizacao_adiada
+
+
+def _ids_por_nome(model, chaves):
+    """Ids por nome em minúsculas (o menor id quando há nomes repetidos)."""
+    encontrados = {}
+    objetos = (
+        model.objects.annotate(nome_normalizado=Lower('nome'))
+        .filter(nome_normalizado__in=chaves)
+        .order_by('pk')
+        .values_list('pk', 'nome_normalizado')
+    )
+    for pk, nome in objetos:
+        encontrados.setdefault(nome, pk)
+    return encontrados
+
+
+def resolver_por_nome(model, nomes):
+    """
+    Ids de Autor/Tag para os nomes informados (já normalizados quanto a
+    espaços), sem diferenciar maiúsculas. Uma consulta busca os existentes e
+    os que faltam são criados com um único `bulk_create`; como ele não retorna
+    os ids em todos os bancos, os criados são buscados em seguida.
+    """
+    chaves = {}
+    for nome in nomes:
+        chaves.setdefault(nome.lower(), nome)
+    if not chaves:
+        return []
+
+    ids = _ids_por_nome(model, list(chaves))
+    faltantes = [nome for chave, nome in chaves.items() if chave not in ids]
+    if faltantes:
+        # ignore_conflicts: outro cadastro simultâneo pode ter criado o mesmo nome (Tag.nome é único)
+        model.objects.bulk_create([model(nome=nome, ativo=True) for nome in faltantes], ignore_conflicts=True)
+        ids.update(_ids_por_nome(model, [nome.lower() for nome in faltantes]))
+    return [ids[chave] for chave in chaves if chave in ids]
 
 
 class RegistroForm(forms.ModelForm):
@@ -57,8 +97,17 @@ class RegistroForm(forms.ModelForm):
                 'placeholder': 'Digite o título do documento'
             }),
             'subprojeto': forms.Select(attrs={'class': 'form-select'}),
-            'autores': forms.SelectMultiple(attrs={'class': 'form-select', 'size': 8}),
-            'tags': forms.SelectMultiple(attrs={'class': 'form-select', 'size': 8}),
+            # Opções carregadas sob demanda (apenas os selecionados vão no HTML)
+            'autores': AutocompleteSelectMultiple(
+                reverse_lazy('core:autocomplete_autores'),
+                attrs={'class': 'form-select', 'size': 8},
+                placeholder='Buscar autor...',
+            ),
+            'tags': AutocompleteSelectMultiple(
+                reverse_lazy('core:autocomplete_tags'),
+                attrs={'class': 'form-select', 'size': 8},
+                placeholder='Buscar palavra-chave...',
+            ),
             'tipo_documento': forms.Select(attrs={'class': 'form-select'}),
             'area_tematica': forms.Select(attrs={'class': 'form-select'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
@@ -121,6 +170,20 @@ class RegistroForm(forms.ModelForm):
         self.fields['status'].queryset = Status.objects.filter(ativo=True)
         self.fields['tipo_publicacao'].queryset = TipoPublicacao.objects.filter(ativo=True)
 
+        # Opções das tabelas auxiliares vêm do registro em memória (sem consultas
+        # ao renderizar); os querysets acima validam o valor enviado
+        tabelas = tabelas_auxiliares()
+        definir_opcoes(self.fields['novo_projeto_subprojeto'], tabelas.projetos_ativos)
+        definir_opcoes(self.fields['subprojeto'], tabelas.subprojetos_ativos)
+        definir_opcoes(self.fields['tipo_documento'], tabelas.tipos_documento_ativos)
+        definir_opcoes(self.fields['area_tematica'], tabelas.areas_tematicas_ativas)
+        definir_opcoes(self.fields['status'], tabelas.status_ativos)
+        definir_opcoes(self.fields['tipo_publicacao'], tabelas.tipos_publicacao_ativos)
+
+        # Autores e tags: o vocabulário completo vem do autocomplete
+        definir_opcoes(self.fields['autores'], self._selecionados('autores'))
+        definir_opcoes(self.fields['tags'], self._selecionados('tags'))
+
         self.fields['subprojeto'].required = False
         self.fields['tipo_documento'].required = True
         self.fields['area_tematica'].required = True
@@ -128,6 +191,24 @@ class RegistroForm(forms.ModelForm):
         self.fields['autores'].required = False
         self.fields['tags'].required = False
 
+    def _selecionados(self, campo):
+        """Objetos selecionados em um campo M2M (dados enviados ou do registro em edição)."""
+        if self.is_bound:
+            nome = self.add_prefix(campo)
+            valores = self.data.getlist(nome) if hasattr(self.data, 'getlist') else self.data.get(nome)
+        else:
+            valores = self.initial.get(campo)
+        if valores is None:
+            return []
+        if not isinstance(valores, (list, tuple)):
+            valores = [valores]
+
+        objetos = [valor for valor in valores if isinstance(valor, models.Model)]
+        ids = [valor for valor in valores if str(valor).isdigit()]
+        if ids:
+            objetos += list(self.fields[campo].queryset.filter(pk__in=ids))
+        return objetos
+
     @staticmethod
     def _normalize_text(value):
         if not value:
@@ -209,6 +290,24 @@ class RegistroForm(forms.ModelForm):
 
         return cleaned_data
 
+    @staticmethod
+    def _gravar_relacao(instance, campo, coluna, ids, criado):
+        """
+        Grava a tabela intermediária de autores/tags diretamente: uma exclusão
+        dos removidos e um único INSERT dos novos. Não dispara m2m_changed; a
+        sincronização fica a cargo de `sincronizacao_adiada` (o registro foi salvo).
+        """
+        through = getattr(Registro, campo).through
+        atuais = set()
+        if not criado:
+            atuais = set(through.objects.filter(registro_id=instance.pk).values_list(coluna, flat=True))
+            removidos = atuais - set(ids)
+            if removidos:
+                through.objects.filter(registro_id=instance.pk, **{f'{coluna}__in': removidos}).delete()
+        novos = [pk for pk in ids if pk not in atuais]
+        if novos:
+            through.objects.bulk_create([through(registro_id=instance.pk, **{coluna: pk}) for pk in novos])
+
     def save(self, commit=True):
         """Remove arquivo antigo do storage e processa autores/tags dinâmicos."""
         arquivo_anterior = None
@@ -216,65 +315,37 @@ class RegistroForm(forms.ModelForm):
         if self.instance.pk:
             arquivo_anterior = Registro.objects.filter(pk=self.instance.pk).values_list('arquivo', flat=True).first()
 
-        with transaction.atomic():
+        # Uma única sincronização do documento de busca/leitura ao final (sinais adiados)
+        with transaction.atomic(), sincronizacao_adiada():
             instance = super().save(commit=False)
             instance.subprojeto = self._resolve_subprojeto()
 
             if commit:
+                criado = instance.pk is None
                 instance.save()
 
-                # --- CORREÇÃO: Inicializa a lista de IDs de autores vindos do formulário ---
+                # Selecionados no formulário + novos nomes (existentes são reaproveitados)
                 autores_ids = [autor.id for autor in self.cleaned_data.get('autores', [])]
+                for autor_id in resolver_por_nome(Autor, self._parse_hidden_items('novos_autores')):
+                    if autor_id not in autores_ids:
+                        autores_ids.append(autor_id)
 
-                # Processamento de Novos Autores
-                novos_autores = self._parse_hidden_items('novos_autores')
-                if novos_autores:
-                    autores_existentes = Autor.objects.filter(nome__in=novos_autores)
-                    autores_por_nome = {autor.nome: autor for autor in autores_existentes}
-
-                    for nome_autor in novos_autores:
-                        autor = autores_por_nome.get(nome_autor)
-                        if not autor:
-                            autor = Autor.objects.create(nome=nome_autor, ativo=True)
-                            autores_por_nome[nome_autor] = autor
-                        
-                        if autor.id not in autores_ids:
-                            autores_ids.append(autor.id)
-
-                if autores_ids:
-                    instance.autores.set(autores_ids)
-
-                # Processamento de Tags (Versão otimizada com Lower case)
                 tags_ids = [tag.id for tag in self.cleaned_data.get('tags', [])]
-                novas_tags = self._parse_hidden_items('novas_tags')
-                
-                if novas_tags:
-                    tags_existentes = {
-                        tag.nome_normalizado: tag
-                        for tag in Tag.objects.annotate(nome_normalizado=Lower('nome')).filter(
-                            nome_normalizado__in=[nome.lower() for nome in novas_tags]
-                        )
-                    }
-
-                    for nome_tag in novas_tags:
-                        chave_tag = nome_tag.lower()
-                        tag = tags_existentes.get(chave_tag)
-                        if not tag:
-                            tag = Tag.objects.create(nome=nome_tag, ativo=True)
-                            tags_existentes[chave_tag] = tag
-                        
-                        if tag.id not in tags_ids:
-                            tags_ids.append(tag.id)
+                for tag_id in resolver_por_nome(Tag, self._parse_hidden_items('novas_tags')):
+                    if tag_id not in tags_ids:
+                        tags_ids.append(tag_id)
 
+                if autores_ids:
+                    self._gravar_relacao(instance, 'autores', 'autor_id', autores_ids, criado)
                 if tags_ids:
-                    instance.tags.set(tags_ids)
+                    self._gravar_relacao(instance, 'tags', 'tag_id', tags_ids, criado)
 
-        # Lógica de limpeza de arquivo físico
-        if arquivo_anterior:
+        # Lógica de limpeza de arquivo físico (no armazenamento por conteúdo, feita pelas
+        # contagens de referência, pois o arquivo pode ser compartilhado)
+        if arquivo_anterior and not armazenamento_por_conteudo():
             novo_arquivo = instance.arquivo.name if instance.arquivo else ''
             if arquivo_anterior != novo_arquivo:
-                storage = instance._meta.get_field('arquivo').storage
-                if storage.exists(arquivo_anterior):
-                    storage.delete(arquivo_anterior)
+                # delete() ignora arquivos já ausentes: sem consulta prévia ao storage
+                instance._meta.get_field('arquivo').storage.delete(arquivo_anterior)
 
         return instance
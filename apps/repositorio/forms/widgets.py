@@ -0,0 +1,36 @@
+from django import forms
+
+
+class AutocompleteMixin:
+    """
+    Select cujas opções são carregadas sob demanda de um endpoint de
+    autocomplete (static/js/autocomplete.js). O HTML inclui apenas as opções
+    definidas no campo, normalmente os valores já selecionados.
+
+    `depende_de` é o nome de outro campo do formulário cujo valor é enviado ao
+    endpoint em `parametro` (ex.: projeto -> projeto_id).
+    """
+
+    def __init__(self, url, attrs=None, depende_de=None, parametro=None, placeholder='Digite para buscar...'):
+        super().__init__(attrs)
+        self.url = url
+        self.depende_de = depende_de
+        self.parametro = parametro or depende_de
+        self.placeholder = placeholder
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = str(self.url)
+        attrs['data-autocomplete-placeholder'] = self.placeholder
+        if self.depende_de:
+            attrs['data-autocomplete-depende'] = self.depende_de
+            attrs['data-autocomplete-parametro'] = self.parametro
+        return attrs
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
@@ -0,0 +1,113 @@
+"""
+Registro local (por processo) das tabelas auxiliares.
+
+Projeto, Subprojeto, TipoDocumento, AreaTematica, Status e TipoPublicacao
+quase nunca mudam, mas alimentam os selects de quase todas as páginas. Cada
+processo guarda uma cópia carregada de uma vez (`TabelasAuxiliares`) junto com
+a versão das tabelas (`search.versioning`); a cada acesso compara essa versão
+com a do cache compartilhado (uma leitura no cache, nenhuma no banco) e
+recarrega tudo quando ela muda. Os sinais incrementam a versão ao salvar ou
+excluir qualquer linha dessas tabelas.
+
+Com LocMemCache a versão não é vista pelos outros workers, então a cópia também
+expira após `REPOSITORIO_TABELAS_AUXILIARES_TTL` segundos: é o atraso máximo
+com que uma alteração feita em outro processo aparece neste.
+
+Os objetos guardados são compartilhados entre requisições: devem ser tratados
+como somente leitura.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from apps.repositorio.models.repositorio import (
+    AreaTematica,
+    Projeto,
+    Status,
+    Subprojeto,
+    TipoDocumento,
+    TipoPublicacao,
+)
+from apps.repositorio.search.versioning import versao_tabelas_auxiliares
+
+
+def _ativos(objetos):
+    return [obj for obj in objetos if obj.ativo]
+
+
+class TabelasAuxiliares:
+    """Cópia em memória das tabelas auxiliares, na ordenação padrão de cada modelo."""
+
+    def __init__(self, versao):
+        self.versao = versao
+        self.carregadas_em = time.monotonic()
+        self.projetos = list(Projeto.objects.all())
+        self.subprojetos = list(Subprojeto.objects.select_related('projeto'))
+        self.tipos_documento = list(TipoDocumento.objects.all())
+        self.areas_tematicas = list(AreaTematica.objects.all())
+        self.status = list(Status.objects.all())
+        self.tipos_publicacao = list(TipoPublicacao.objects.all())
+
+        self.projetos_ativos = _ativos(self.projetos)
+        self.subprojetos_ativos = _ativos(self.subprojetos)
+        self.tipos_documento_ativos = _ativos(self.tipos_documento)
+        self.areas_tematicas_ativas = _ativos(self.areas_tematicas)
+        self.status_ativos = _ativos(self.status)
+        self.status_publicos = [status for status in self.status if status.is_public]
+        self.tipos_publicacao_ativos = _ativos(self.tipos_publicacao)
+
+    def subprojetos_do_projeto(self, projeto_id, apenas_ativos=True):
+        subprojetos = self.subprojetos_ativos if apenas_ativos else self.subprojetos
+        if not projeto_id:
+            return subprojetos
+        return [subprojeto for subprojeto in subprojetos if str(subprojeto.projeto_id) == str(projeto_id)]
+
+    def tipo_documento_por_nome(self, trecho):
+        """Primeiro tipo de documento ativo cujo nome contém `trecho` (sem diferença de caixa)."""
+        trecho = trecho.lower()
+        for tipo in self.tipos_documento_ativos:
+            if trecho in tipo.nome.lower():
+                return tipo
+        return None
+
+    def valida(self, versao):
+        idade = time.monotonic() - self.carregadas_em
+        return self.versao == versao and idade < settings.REPOSITORIO_TABELAS_AUXILIARES_TTL
+
+
+_tabelas = None
+_trava = threading.Lock()
+
+
+def tabelas_auxiliares():
+    """Tabelas auxiliares do processo, recarregadas quando a versão muda ou a cópia expira."""
+    global _tabelas
+    versao = versao_tabelas_auxiliares()
+    tabelas = _tabelas
+    if tabelas is not None and tabelas.valida(versao):
+        return tabelas
+    with _trava:
+        if _tabelas is None or not _tabelas.valida(versao):
+            _tabelas = TabelasAuxiliares(versao)
+        return _tabelas
+
+
+def descartar_tabelas_auxiliares():
+    """Descarta a cópia do processo (a próxima leitura recarrega do banco)."""
+    global _tabelas
+    with _trava:
+        _tabelas = None
+
+
+def definir_opcoes(campo, objetos, rotulo=None):
+    """
+    Preenche as opções de um ModelChoiceField a partir de objetos já carregados,
+    evitando a consulta do queryset na renderização. O queryset do campo
+    continua sendo usado para validar o valor enviado.
+    """
+    rotulo = rotulo or campo.label_from_instance
+    opcoes = [(obj.pk, rotulo(obj)) for obj in objetos]
+    if getattr(campo, 'empty_label', None) is not None:
+        opcoes.insert(0, ('', campo.empty_label))
+    campo.choices = opcoes
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.repositorio.search.fulltext import is_postgresql, reconstruir_search_vector
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o documento de busca full-text (search_vector) de todos os registros.'
+
+    def handle(self, *args, **options):
+        if not is_postgresql():
+            self.stdout.write(self.style.WARNING('Busca full-text disponível apenas em PostgreSQL. Nada a fazer.'))
+            return
+
+        total = reconstruir_search_vector()
+        self.stdout.write(self.style.SUCCESS(f'{total} registro(s) reindexado(s).'))
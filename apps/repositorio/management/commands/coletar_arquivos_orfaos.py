@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.repositorio.content_storage import coletar_orfaos, recontar_referencias
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove do storage os arquivos por conteúdo sem registros que os referenciem '
+        'há mais que o período de carência.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--carencia-horas', type=int, default=None, help='Horas sem referências antes da remoção.')
+        parser.add_argument('--recontar', action='store_true', help='Recalcula as contagens a partir dos registros antes.')
+
+    def handle(self, *args, **options):
+        if options['recontar']:
+            corrigidos = recontar_referencias()
+            self.stdout.write(f'{corrigidos} contagem(ns) de referência corrigida(s).')
+
+        carencia = options['carencia_horas']
+        removidos = coletar_orfaos(timedelta(hours=carencia) if carencia is not None else None)
+        self.stdout.write(self.style.SUCCESS(f'{removidos} arquivo(s) órfão(s) removido(s).'))
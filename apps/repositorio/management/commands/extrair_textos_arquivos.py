@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.repositorio.models.repositorio import TextoArquivo
+from apps.repositorio.pdf_text import extracao_disponivel
+from apps.repositorio.text_extraction import processar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Extrai o texto dos PDFs ainda sem texto para a busca (em paralelo, num pool de processos).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=None, help='Processos de extração (padrão: número de CPUs).')
+        parser.add_argument('--limite', type=int, default=None, help='Máximo de registros processados nesta execução.')
+        parser.add_argument('--refazer-erros', action='store_true', help='Tenta de novo os arquivos que falharam.')
+
+    def handle(self, *args, **options):
+        if not extracao_disponivel():
+            raise CommandError('O pypdf não está instalado.')
+
+        if options['refazer_erros']:
+            TextoArquivo.objects.filter(status=TextoArquivo.ERRO).delete()
+
+        gravados, erros = processar_pendentes(processos=options['processos'], limite=options['limite'])
+        if erros:
+            self.stdout.write(self.style.WARNING(f'{erros} arquivo(s) com erro na extração.'))
+        self.stdout.write(self.style.SUCCESS(f'{gravados} texto(s) extraído(s).'))
@@ -0,0 +1,45 @@
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.repositorio.exports import NenhumArquivoLido, arquivos_dos_documentos, filtrar_documentos, gerar_zip
+from apps.repositorio.models.repositorio import Registro
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão da montagem do ZIP de exportação a partir do storage configurado, '
+        'comparando níveis de concorrência de leitura.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concorrencia', type=int, nargs='+', default=[1, 8],
+            help='Níveis de concorrência medidos (padrão: 1 8).',
+        )
+        parser.add_argument('--limite', type=int, default=200, help='Número máximo de arquivos lidos.')
+        parser.add_argument('--timeout', type=int, default=None, help='Tempo máximo de espera por arquivo (s).')
+
+    def handle(self, *args, **options):
+        arquivos = list(islice(arquivos_dos_documentos(filtrar_documentos({})), options['limite']))
+        if not arquivos:
+            self.stdout.write(self.style.WARNING('Nenhum arquivo encontrado para medir.'))
+            return
+
+        storage = Registro._meta.get_field('arquivo').storage
+        self.stdout.write(f'{len(arquivos)} arquivo(s) em {storage.__class__.__name__}')
+
+        for concorrencia in options['concorrencia']:
+            inicio = time.monotonic()
+            try:
+                total = sum(len(bloco) for bloco in gerar_zip(
+                    arquivos, storage, concorrencia=concorrencia, timeout=options['timeout'],
+                ))
+            except NenhumArquivoLido as e:
+                raise CommandError(str(e))
+            duracao = time.monotonic() - inicio
+            self.stdout.write(
+                f'concorrência {concorrencia:>3}: {duracao:8.2f} s  '
+                f'{len(arquivos) / duracao:8.1f} arquivos/s  {total / duracao / 1024 / 1024:8.2f} MiB/s'
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.repositorio.file_metadata import preencher_metadados
+from apps.repositorio.models.repositorio import Registro
+
+
+class Command(BaseCommand):
+    help = 'Calcula tamanho, tipo, SHA-256 e páginas dos arquivos já enviados (lidos do storage em paralelo).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concorrencia', type=int, default=8, help='Arquivos lidos simultaneamente.')
+        parser.add_argument('--todos', action='store_true', help='Recalcula também os registros que já têm metadados.')
+
+    def handle(self, *args, **options):
+        queryset = Registro.objects.all()
+        if not options['todos']:
+            queryset = queryset.filter(arquivo_sha256='')
+
+        preenchidos, falhas = preencher_metadados(queryset, concorrencia=options['concorrencia'])
+        if falhas:
+            self.stdout.write(self.style.WARNING(f'{falhas} arquivo(s) não puderam ser lidos.'))
+        self.stdout.write(self.style.SUCCESS(f'{preenchidos} registro(s) com metadados preenchidos.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.repositorio.export_jobs import limpar_exportacoes, processar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Gera os ZIPs das exportações pendentes (worker separado) e remove exportações expiradas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=None, help='Número máximo de exportações processadas.')
+        parser.add_argument('--limpar', action='store_true', help='Remove exportações mais antigas que a validade.')
+
+    def handle(self, *args, **options):
+        if options['limpar']:
+            removidas = limpar_exportacoes()
+            self.stdout.write(f'{removidas} exportação(ões) expirada(s) removida(s).')
+
+        exportacoes = processar_pendentes(options['limite'])
+        for exportacao in exportacoes:
+            self.stdout.write(f'{exportacao.chave}: {exportacao.get_status_display()}')
+        self.stdout.write(self.style.SUCCESS(f'{len(exportacoes)} exportação(ões) processada(s).'))
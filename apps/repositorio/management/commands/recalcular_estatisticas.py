@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.repositorio.rollups import recalcular_projetos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as estatísticas agregadas (ProjetoEstatistica) de todos os projetos.'
+
+    def handle(self, *args, **options):
+        total = recalcular_projetos()
+        self.stdout.write(self.style.SUCCESS(f'{total} projeto(s) com estatísticas recalculadas.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.repositorio.search.bitmap import registrar_alteracao
+from apps.repositorio.search.documents import reconstruir_documentos
+
+
+class Command(BaseCommand):
+    help = 'Recria o modelo de leitura (RegistroDocumento) de todos os registros.'
+
+    def handle(self, *args, **options):
+        total = reconstruir_documentos()
+        # Faz os processos em execução recarregarem estruturas derivadas (índice de facetas)
+        registrar_alteracao()
+        self.stdout.write(self.style.SUCCESS(f'{total} documento(s) de leitura reconstruído(s).'))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-17 10:00
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def criar_indice_busca(apps, schema_editor):
+    """Cria o índice GIN e preenche o documento de busca (apenas PostgreSQL)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS registro_search_vector_gin "
+        "ON repositorio_registro USING gin (search_vector)"
+    )
+    schema_editor.execute("""
+        UPDATE repositorio_registro r SET search_vector =
+            setweight(to_tsvector('portuguese', coalesce(r.titulo, '')), 'A') ||
+            setweight(to_tsvector('portuguese', coalesce((
+                SELECT string_agg(a.nome, ' ')
+                FROM repositorio_autor a
+                JOIN repositorio_registro_autores ra ON ra.autor_id = a.id
+                WHERE ra.registro_id = r.id
+            ), '')), 'B') ||
+            setweight(to_tsvector('portuguese', coalesce((
+                SELECT string_agg(t.nome, ' ')
+                FROM repositorio_tag t
+                JOIN repositorio_registro_tags rt ON rt.tag_id = t.id
+                WHERE rt.registro_id = r.id
+            ), '')), 'B') ||
+            setweight(to_tsvector('portuguese', coalesce(r.resumo, '')), 'C')
+    """)
+
+
+def remover_indice_busca(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS registro_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0005_registro_especie_informacoes_registro_especie_nova'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registro',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Documento de Busca'),
+        ),
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-17 11:00
+
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+# Campos com busca por `sem_acento`/`similar` indexada (tabela, coluna)
+CAMPOS_TRIGRAMA = [
+    ('repositorio_registro', 'titulo'),
+    ('repositorio_autor', 'nome'),
+    ('repositorio_tag', 'nome'),
+    ('repositorio_tipodocumento', 'nome'),
+]
+
+
+def criar_indices_trigrama(apps, schema_editor):
+    """
+    Cria o wrapper IMMUTABLE de unaccent e os índices GIN de trigramas
+    sobre `lower(f_unaccent(coluna))` (apenas PostgreSQL).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+    for tabela, coluna in CAMPOS_TRIGRAMA:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {tabela}_{coluna}_trgm "
+            f"ON {tabela} USING gin (lower(f_unaccent({coluna})) gin_trgm_ops)"
+        )
+
+
+def remover_indices_trigrama(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for tabela, coluna in CAMPOS_TRIGRAMA:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {tabela}_{coluna}_trgm")
+    schema_editor.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0006_registro_search_vector'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        TrigramExtension(),
+        migrations.RunPython(criar_indices_trigrama, remover_indices_trigrama),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_documentos(apps, schema_editor):
+    """Carga inicial do modelo de leitura (depois mantido pelos sinais)."""
+    Registro = apps.get_model('repositorio', 'Registro')
+    RegistroDocumento = apps.get_model('repositorio', 'RegistroDocumento')
+
+    registros = Registro.objects.select_related(
+        'subprojeto__projeto', 'tipo_documento', 'area_tematica', 'status'
+    ).prefetch_related('autores', 'tags').order_by('pk')
+
+    lote = []
+    for registro in registros.iterator(chunk_size=500):
+        autores = list(registro.autores.all())
+        tags = list(registro.tags.all())
+        lote.append(RegistroDocumento(
+            registro_id=registro.pk,
+            titulo=registro.titulo,
+            data_publicacao=registro.data_publicacao,
+            ano=registro.data_publicacao.year if registro.data_publicacao else None,
+            projeto_id=registro.subprojeto.projeto_id,
+            projeto_nome=registro.subprojeto.projeto.nome,
+            subprojeto_id=registro.subprojeto_id,
+            subprojeto_nome=registro.subprojeto.nome,
+            tipo_documento_id=registro.tipo_documento_id,
+            tipo_documento_nome=registro.tipo_documento.nome,
+            area_tematica_id=registro.area_tematica_id,
+            area_tematica_nome=registro.area_tematica.nome,
+            status_id=registro.status_id,
+            status_nome=registro.status.nome,
+            autores_ids=[autor.pk for autor in autores],
+            autores_nomes=[autor.nome for autor in autores],
+            tags_ids=[tag.pk for tag in tags],
+            tags_nomes=[tag.nome for tag in tags],
+            arquivo=registro.arquivo.name or '',
+            link_externo=registro.link_externo or '',
+            ativo=registro.ativo,
+            publico=registro.ativo and registro.status.is_public,
+            date_create=registro.date_create,
+        ))
+        if len(lote) >= 500:
+            RegistroDocumento.objects.bulk_create(lote)
+            lote = []
+    RegistroDocumento.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0007_unaccent_trigram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroDocumento',
+            fields=[
+                ('registro', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='documento', serialize=False, to='repositorio.registro', verbose_name='Registro')),
+                ('titulo', models.CharField(max_length=2000, verbose_name='Título')),
+                ('data_publicacao', models.DateField(blank=True, null=True, verbose_name='Data da Publicação')),
+                ('ano', models.PositiveSmallIntegerField(blank=True, db_index=True, null=True, verbose_name='Ano da Publicação')),
+                ('projeto_id', models.PositiveIntegerField(db_index=True, verbose_name='ID do Projeto')),
+                ('projeto_nome', models.CharField(max_length=150, verbose_name='Projeto')),
+                ('subprojeto_id', models.PositiveIntegerField(db_index=True, verbose_name='ID do Subprojeto')),
+                ('subprojeto_nome', models.CharField(max_length=150, verbose_name='Subprojeto')),
+                ('tipo_documento_id', models.PositiveIntegerField(db_index=True, verbose_name='ID do Tipo de Documento')),
+                ('tipo_documento_nome', models.CharField(max_length=100, verbose_name='Tipo de Documento')),
+                ('area_tematica_id', models.PositiveIntegerField(db_index=True, verbose_name='ID da Área Temática')),
+                ('area_tematica_nome', models.CharField(max_length=100, verbose_name='Área Temática')),
+                ('status_id', models.PositiveIntegerField(db_index=True, verbose_name='ID do Status')),
+                ('status_nome', models.CharField(max_length=50, verbose_name='Status')),
+                ('autores_ids', models.JSONField(blank=True, default=list, verbose_name='IDs dos Autores')),
+                ('autores_nomes', models.JSONField(blank=True, default=list, verbose_name='Autores')),
+                ('tags_ids', models.JSONField(blank=True, default=list, verbose_name='IDs das Tags')),
+                ('tags_nomes', models.JSONField(blank=True, default=list, verbose_name='Palavras-chave')),
+                ('arquivo', models.CharField(blank=True, default='', max_length=5000, verbose_name='Arquivo')),
+                ('link_externo', models.CharField(blank=True, default='', max_length=2000, verbose_name='Link Externo/URL')),
+                ('ativo', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('publico', models.BooleanField(default=False, verbose_name='Visível na busca pública')),
+                ('date_create', models.DateTimeField(verbose_name='Data de Criação do Registro')),
+            ],
+            options={
+                'verbose_name': 'Documento de Leitura',
+                'verbose_name_plural': 'Documentos de Leitura',
+                'ordering': ['-data_publicacao', 'titulo'],
+                'indexes': [models.Index(fields=['publico', '-data_publicacao', 'titulo'], name='regdoc_publico_data_idx'), models.Index(fields=['publico', 'titulo'], name='regdoc_publico_titulo_idx')],
+            },
+        ),
+        migrations.RunPython(preencher_documentos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:00
+
+from django.db import migrations
+
+# Campos com autocomplete por prefixo (`prefixo_sem_acento`) indexado (tabela, coluna)
+CAMPOS_PREFIXO = [
+    ('repositorio_autor', 'nome'),
+    ('repositorio_tag', 'nome'),
+]
+
+
+def criar_indices_prefixo(apps, schema_editor):
+    """
+    Índices B-tree com text_pattern_ops sobre `lower(f_unaccent(coluna))`,
+    usados por `LIKE 'prefixo%'` independentemente da collation (apenas PostgreSQL).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for tabela, coluna in CAMPOS_PREFIXO:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {tabela}_{coluna}_prefixo "
+            f"ON {tabela} (lower(f_unaccent({coluna})) text_pattern_ops)"
+        )
+
+
+def remover_indices_prefixo(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for tabela, coluna in CAMPOS_PREFIXO:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {tabela}_{coluna}_prefixo")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0008_registrodocumento'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices_prefixo, remover_indices_prefixo),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:13
+
+import apps.repositorio.models.repositorio
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0009_indices_prefixo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportacaoArquivos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=40, unique=True, verbose_name='Chave')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Filtros')),
+                ('versao_catalogo', models.BigIntegerField(verbose_name='Versão do Catálogo')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluida', 'Concluída'), ('erro', 'Erro')], db_index=True, default='pendente', max_length=20, verbose_name='Situação')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total de Arquivos')),
+                ('processados', models.PositiveIntegerField(default=0, verbose_name='Arquivos Processados')),
+                ('arquivo', models.FileField(blank=True, max_length=500, null=True, upload_to=apps.repositorio.models.repositorio.exportacao_file_path, verbose_name='Arquivo ZIP')),
+                ('tamanho', models.BigIntegerField(default=0, verbose_name='Tamanho (bytes)')),
+                ('mensagem_erro', models.TextField(blank=True, default='', verbose_name='Mensagem de Erro')),
+                ('date_create', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('date_update', models.DateTimeField(auto_now=True, verbose_name='Data da ultima atualização')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exportacoes', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Exportação de Arquivos',
+                'verbose_name_plural': 'Exportações de Arquivos',
+                'ordering': ['-date_create'],
+            },
+        ),
+    ]
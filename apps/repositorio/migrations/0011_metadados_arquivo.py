@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0010_exportacaoarquivos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registro',
+            name='arquivo_mime',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Tipo do Arquivo'),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='arquivo_paginas',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Páginas'),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='arquivo_sha256',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64, verbose_name='SHA-256 do Arquivo'),
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='arquivo_tamanho',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Tamanho do Arquivo (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='registrodocumento',
+            name='arquivo_mime',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Tipo do Arquivo'),
+        ),
+        migrations.AddField(
+            model_name='registrodocumento',
+            name='arquivo_tamanho',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Tamanho do Arquivo (bytes)'),
+        ),
+    ]
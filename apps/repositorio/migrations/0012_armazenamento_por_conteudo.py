@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0011_metadados_arquivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArquivoConteudo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arquivo', models.CharField(max_length=500, unique=True, verbose_name='Arquivo no Storage')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('tamanho', models.BigIntegerField(blank=True, null=True, verbose_name='Tamanho (bytes)')),
+                ('referencias', models.IntegerField(default=0, verbose_name='Registros que o referenciam')),
+                ('orfao_desde', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Sem referências desde')),
+                ('date_create', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+            ],
+            options={
+                'verbose_name': 'Arquivo por Conteúdo',
+                'verbose_name_plural': 'Arquivos por Conteúdo',
+            },
+        ),
+        migrations.AddField(
+            model_name='registro',
+            name='arquivo_nome',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500, verbose_name='Nome Original do Arquivo'),
+        ),
+        migrations.AddField(
+            model_name='registrodocumento',
+            name='arquivo_nome',
+            field=models.CharField(blank=True, default='', max_length=500, verbose_name='Nome Original do Arquivo'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0012_armazenamento_por_conteudo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextoArquivo',
+            fields=[
+                ('registro', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='texto_arquivo', serialize=False, to='repositorio.registro', verbose_name='Registro')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256 do Arquivo de Origem')),
+                ('texto', models.TextField(blank=True, default='', verbose_name='Texto Extraído')),
+                ('status', models.CharField(choices=[('extraido', 'Extraído'), ('sem_texto', 'Sem texto (ex.: digitalizado)'), ('erro', 'Erro')], default='extraido', max_length=20, verbose_name='Status')),
+                ('mensagem_erro', models.TextField(blank=True, default='', verbose_name='Mensagem de Erro')),
+                ('date_update', models.DateTimeField(auto_now=True, verbose_name='Data da Extração')),
+            ],
+            options={
+                'verbose_name': 'Texto do Arquivo',
+                'verbose_name_plural': 'Textos dos Arquivos',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0013_textoarquivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjetoEstatistica',
+            fields=[
+                ('projeto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estatistica', serialize=False, to='repositorio.projeto', verbose_name='Projeto')),
+                ('producoes_academicas', models.PositiveIntegerField(default=0, verbose_name='Produções Acadêmicas')),
+                ('producoes_publicadas', models.PositiveIntegerField(default=0, verbose_name='Produções Publicadas')),
+                ('artigos_cientificos', models.PositiveIntegerField(default=0, verbose_name='Artigos Científicos')),
+                ('relatorios_tecnicos', models.PositiveIntegerField(default=0, verbose_name='Relatórios Técnicos')),
+                ('autores_unicos', models.PositiveIntegerField(default=0, verbose_name='Autores Únicos')),
+                ('subprojetos_ativos', models.PositiveIntegerField(default=0, verbose_name='Subprojetos Ativos')),
+                ('date_update', models.DateTimeField(auto_now=True, verbose_name='Data do Cálculo')),
+            ],
+            options={
+                'verbose_name': 'Estatística do Projeto',
+                'verbose_name_plural': 'Estatísticas dos Projetos',
+            },
+        ),
+    ]
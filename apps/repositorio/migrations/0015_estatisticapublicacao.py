@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0014_projetoestatistica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaPublicacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Ano da Publicação')),
+                ('projeto_id', models.PositiveIntegerField(verbose_name='ID do Projeto')),
+                ('area_tematica_id', models.PositiveIntegerField(verbose_name='ID da Área Temática')),
+                ('tipo_documento_id', models.PositiveIntegerField(verbose_name='ID do Tipo de Documento')),
+                ('registros', models.PositiveIntegerField(default=0, verbose_name='Registros')),
+                ('autores', models.PositiveIntegerField(default=0, verbose_name='Autores Distintos')),
+            ],
+            options={
+                'verbose_name': 'Estatística de Publicações',
+                'verbose_name_plural': 'Estatísticas de Publicações',
+                'indexes': [models.Index(fields=['projeto_id', 'ano'], name='estpub_projeto_ano_idx'), models.Index(fields=['ano'], name='estpub_ano_idx')],
+            },
+        ),
+    ]
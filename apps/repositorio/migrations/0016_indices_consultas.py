@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-17 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0015_estatisticapublicacao'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='registrodocumento',
+            name='regdoc_publico_data_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='registrodocumento',
+            name='regdoc_publico_titulo_idx',
+        ),
+        migrations.AddIndex(
+            model_name='registro',
+            index=models.Index(fields=['-date_create', '-id'], name='registro_criacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registro',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['-data_publicacao', 'titulo', 'id'], name='registro_ativo_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrodocumento',
+            index=models.Index(condition=models.Q(('publico', True)), fields=['-data_publicacao', 'titulo', 'registro'], name='regdoc_publico_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrodocumento',
+            index=models.Index(condition=models.Q(('publico', True)), fields=['titulo', 'registro'], name='regdoc_publico_titulo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrodocumento',
+            index=models.Index(condition=models.Q(('publico', True)), fields=['ano', '-data_publicacao', 'titulo', 'registro'], name='regdoc_publico_ano_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrodocumento',
+            index=models.Index(fields=['-date_create', '-registro'], name='regdoc_criacao_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def preencher_projeto(apps, schema_editor):
+    """Copia o projeto do subprojeto para os registros existentes (um UPDATE)."""
+    Registro = apps.get_model('repositorio', 'Registro')
+    Subprojeto = apps.get_model('repositorio', 'Subprojeto')
+    Registro.objects.using(schema_editor.connection.alias).update(
+        projeto_id=Subquery(Subprojeto.objects.filter(pk=OuterRef('subprojeto_id')).values('projeto_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0016_indices_consultas'),
+    ]
+
+    operations = [
+        # Anulável até o preenchimento; NOT NULL logo em seguida
+        migrations.AddField(
+            model_name='registro',
+            name='projeto',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='registros', to='repositorio.projeto', verbose_name='Projeto'),
+        ),
+        migrations.RunPython(preencher_projeto, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='registro',
+            name='projeto',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='registros', to='repositorio.projeto', verbose_name='Projeto'),
+        ),
+        migrations.AddIndex(
+            model_name='registro',
+            index=models.Index(fields=['projeto', '-date_create', '-id'], name='registro_projeto_criacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registro',
+            index=models.Index(fields=['projeto', 'ativo'], name='registro_projeto_ativo_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:40
+
+from django.db import migrations
+
+# Colunas do modelo de leitura filtradas por `sem_acento`/`similar`: o nome do
+# tipo de documento (busca pública por tipo textual e categoria dos cards) e o
+# título (busca da listagem de gestão nas exportações)
+CAMPOS_TRIGRAMA = [
+    ('repositorio_registrodocumento', 'tipo_documento_nome'),
+    ('repositorio_registrodocumento', 'titulo'),
+]
+
+
+def criar_indices_trigrama(apps, schema_editor):
+    """Índices GIN de trigramas sobre `lower(f_unaccent(coluna))`, como na 0007 (apenas PostgreSQL)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for tabela, coluna in CAMPOS_TRIGRAMA:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {tabela}_{coluna}_trgm "
+            f"ON {tabela} USING gin (lower(f_unaccent({coluna})) gin_trgm_ops)"
+        )
+
+
+def remover_indices_trigrama(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for tabela, coluna in CAMPOS_TRIGRAMA:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {tabela}_{coluna}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0017_registro_projeto'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices_trigrama, remover_indices_trigrama),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:10
+
+from django.db import migrations, models
+from django.db.models import F, Q
+
+# Índices com `-data_publicacao` (nome, tabela, colunas, condição). As buscas
+# ordenam com NULLs por último (search.pagination.ordem_nulos_por_ultimo); no
+# PostgreSQL um índice DESC guarda os NULLs primeiro e não atende essa ordem.
+INDICES_DATA = [
+    ('registro_ativo_data_idx', 'repositorio_registro',
+     'data_publicacao DESC NULLS LAST, titulo, id', 'ativo'),
+    ('regdoc_publico_data_idx', 'repositorio_registrodocumento',
+     'data_publicacao DESC NULLS LAST, titulo, registro_id', 'publico'),
+    ('regdoc_publico_ano_data_idx', 'repositorio_registrodocumento',
+     'ano, data_publicacao DESC NULLS LAST, titulo, registro_id', 'publico'),
+]
+
+
+def recriar_indices(apps, schema_editor, nulos_por_ultimo=True):
+    """
+    Recria os índices com DESC NULLS LAST (apenas PostgreSQL; o SQLite não
+    aceita NULLS LAST em índices e já guarda os NULLs por último em DESC).
+    O estado das migrations recebe a definição equivalente (`state_operations`).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for nome, tabela, colunas, condicao in INDICES_DATA:
+        if not nulos_por_ultimo:
+            colunas = colunas.replace(' NULLS LAST', '')
+        schema_editor.execute(f"DROP INDEX IF EXISTS {nome}")
+        schema_editor.execute(f"CREATE INDEX {nome} ON {tabela} ({colunas}) WHERE {condicao}")
+
+
+def restaurar_indices(apps, schema_editor):
+    recriar_indices(apps, schema_editor, nulos_por_ultimo=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositorio', '0018_registrodocumento_trigrama'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(recriar_indices, restaurar_indices),
+            ],
+            state_operations=[
+                migrations.RemoveIndex(model_name='registro', name='registro_ativo_data_idx'),
+                migrations.AddIndex(
+                    model_name='registro',
+                    index=models.Index(
+                        F('data_publicacao').desc(nulls_last=True), F('titulo'), F('id'),
+                        condition=Q(ativo=True),
+                        name='registro_ativo_data_idx',
+                    ),
+                ),
+                migrations.RemoveIndex(model_name='registrodocumento', name='regdoc_publico_data_idx'),
+                migrations.AddIndex(
+                    model_name='registrodocumento',
+                    index=models.Index(
+                        F('data_publicacao').desc(nulls_last=True), F('titulo'), F('registro'),
+                        condition=Q(publico=True),
+                        name='regdoc_publico_data_idx',
+                    ),
+                ),
+                migrations.RemoveIndex(model_name='registrodocumento', name='regdoc_publico_ano_data_idx'),
+                migrations.AddIndex(
+                    model_name='registrodocumento',
+                    index=models.Index(
+                        F('ano'), F('data_publicacao').desc(nulls_last=True), F('titulo'), F('registro'),
+                        condition=Q(publico=True),
+                        name='regdoc_publico_ano_data_idx',
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -8,5 +8,11 @@ from .repositorio import (
     Status,
     TipoPublicacao,
     Registro,
+    RegistroDocumento,
+    ProjetoEstatistica,
+    EstatisticaPublicacao,
+    ExportacaoArquivos,
+    ArquivoConteudo,
+    TextoArquivo,
     FotoGaleria
 )
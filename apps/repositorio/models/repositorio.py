@@ -1,9 +1,15 @@
+import os
+
+from django.conf import settings
 from django.db import models
+from django.db.models import F, Q
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator
 from django.utils.text import slugify
 from datetime import date
 from django.utils import timezone
+from django_cleanup import cleanup
 from apps.repositorio.validators import validate_isbn
 
 # Importa o modelo User customizado do projeto (apps.accounts.User)
@@ -12,10 +18,31 @@ User = get_user_model()
 
 
 # Funções de Upload
+
+# Prefixo dos arquivos gravados por conteúdo (REPOSITORIO_ARMAZENAMENTO_POR_CONTEUDO)
+PREFIXO_CONTEUDO = 'repositorio/conteudo/'
+
+
+def armazenamento_por_conteudo():
+    return getattr(settings, 'REPOSITORIO_ARMAZENAMENTO_POR_CONTEUDO', False)
+
+
+def caminho_por_conteudo(sha256, filename):
+    """Caminho endereçado pelo conteúdo: repositorio/conteudo/ab/abcdef....pdf."""
+    extensao = os.path.splitext(filename)[1].lower()
+    return f"{PREFIXO_CONTEUDO}{sha256[:2]}/{sha256}{extensao}"
+
+
 def item_file_path(instance, filename):
     """
     Define o caminho de upload do arquivo: repositorio/projeto_slug/subprojeto_slug/MES/DIA/nome_do_arquivo.
+
+    Com armazenamento por conteúdo, o caminho vem do SHA-256 (calculado no
+    pre_save): arquivos idênticos ocupam um único objeto no storage.
     """
+    if armazenamento_por_conteudo() and instance.arquivo_sha256:
+        return caminho_por_conteudo(instance.arquivo_sha256, filename)
+
     # Garante slugs seguros para o sistema de arquivos e URL
     projeto_slug = slugify(instance.subprojeto.projeto.nome) if instance.subprojeto.projeto.nome else 'sem_projeto'
     subprojeto_slug = slugify(instance.subprojeto.nome) if instance.subprojeto.nome else 'sem_subprojeto'
@@ -171,6 +198,10 @@ class Registro(models.Model):
     # RELAÇÕES E METADADOS CONTROLADOS
     # ------------------------------------
     subprojeto = models.ForeignKey(Subprojeto, on_delete=models.PROTECT, related_name="subprojetos", verbose_name="Subprojeto")
+    # Cópia de subprojeto.projeto, mantida em save() e quando o subprojeto muda de
+    # projeto (apps.repositorio.signals): filtros e contagens por projeto sem join.
+    # Indexada junto com a ordenação da gestão (ver Meta.indexes).
+    projeto = models.ForeignKey(Projeto, on_delete=models.PROTECT, related_name="registros", editable=False, db_index=False, verbose_name="Projeto")
     autores = models.ManyToManyField(Autor, related_name="autores", verbose_name="Autores")
     tags = models.ManyToManyField(Tag, related_name="tags", verbose_name="Palavras-chave")
     tipo_documento = models.ForeignKey(TipoDocumento, on_delete=models.PROTECT, related_name="tipo_documentos", verbose_name="Tipo de Documento")
@@ -191,6 +222,13 @@ class Registro(models.Model):
     # Arquivo (upload para S3 em produção)
     arquivo = models.FileField(upload_to=item_file_path, null=True, blank=True, verbose_name="Arquivo", max_length=5000)
 
+    # Metadados do arquivo, calculados no upload (apps.repositorio.file_metadata)
+    arquivo_nome = models.CharField(max_length=500, blank=True, default='', editable=False, verbose_name="Nome Original do Arquivo")
+    arquivo_tamanho = models.BigIntegerField(null=True, blank=True, editable=False, verbose_name="Tamanho do Arquivo (bytes)")
+    arquivo_mime = models.CharField(max_length=100, blank=True, default='', editable=False, verbose_name="Tipo do Arquivo")
+    arquivo_sha256 = models.CharField(max_length=64, blank=True, default='', editable=False, verbose_name="SHA-256 do Arquivo")
+    arquivo_paginas = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Páginas")
+
     # Link externo (ex: URL da revista)
     link_externo = models.URLField(max_length=2000, validators=[URLValidator()], null=True, blank=True, verbose_name="Link Externo/URL")
 
@@ -214,10 +252,36 @@ class Registro(models.Model):
     )
     ativo = models.BooleanField(default=True, verbose_name="Ativo")
 
+    # ------------------------------------
+    # BUSCA
+    # ------------------------------------
+    # Documento de busca (tsvector) mantido pelos sinais em apps.repositorio.signals.
+    # O índice GIN é criado na migration (apenas em PostgreSQL).
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name="Documento de Busca")
+
     class Meta:
         verbose_name = "Registro / Documento"
         verbose_name_plural = "Registros / Documentos"
         ordering = ['-data_publicacao', 'titulo']
+        indexes = [
+            # Listagem de gestão (`_apply_filters_to_queryset`): mais recentes primeiro.
+            # Quase todos os registros são ativos, então o filtro de situação
+            # é resolvido percorrendo o mesmo índice.
+            models.Index(fields=['-date_create', '-id'], name='registro_criacao_idx'),
+            # Mesma listagem filtrada por projeto; serve também às consultas pela FK
+            models.Index(fields=['projeto', '-date_create', '-id'], name='registro_projeto_criacao_idx'),
+            # Contadores por projeto (apps.repositorio.rollups): apenas registros ativos
+            models.Index(fields=['projeto', 'ativo'], name='registro_projeto_ativo_idx'),
+            # Ordenação padrão restrita aos registros ativos, com NULLs por último.
+            # Criado só no PostgreSQL pela migration 0019: o SQLite não aceita NULLS
+            # LAST em índices (migrations que recriem a tabela no SQLite precisam
+            # tratar estes índices à parte).
+            models.Index(
+                F('data_publicacao').desc(nulls_last=True), F('titulo'), F('id'),
+                condition=Q(ativo=True),
+                name='registro_ativo_data_idx',
+            ),
+        ]
 
     def validate_isbn(value):
         # Remove hifens e espaços antes de validar
@@ -227,6 +291,15 @@ class Registro(models.Model):
     def __str__(self):
         return self.titulo
 
+    def save(self, *args, **kwargs):
+        # O projeto é sempre o do subprojeto
+        if self.subprojeto_id is not None:
+            self.projeto_id = self.subprojeto.projeto_id
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'subprojeto' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'projeto'}
+        super().save(*args, **kwargs)
+
     def _is_video_type(self):
         """Verifica se o tipo de documento é um vídeo."""
         return 'vídeo' in self.tipo_documento.nome.lower()
@@ -261,6 +334,72 @@ class Registro(models.Model):
         super().clean()
 
 
+if armazenamento_por_conteudo():
+    # Objetos compartilhados entre registros: a remoção fica com as contagens de
+    # referência (ArquivoConteudo), não com o django_cleanup
+    cleanup.ignore(Registro)
+
+
+class ArquivoConteudo(models.Model):
+    """
+    Objeto do storage endereçado pelo conteúdo, com o número de registros que o
+    referenciam. Sem referências, é removido pelo comando
+    `coletar_arquivos_orfaos` depois do período de carência.
+    """
+
+    arquivo = models.CharField(max_length=500, unique=True, verbose_name="Arquivo no Storage")
+    sha256 = models.CharField(max_length=64, db_index=True, verbose_name="SHA-256")
+    tamanho = models.BigIntegerField(null=True, blank=True, verbose_name="Tamanho (bytes)")
+    referencias = models.IntegerField(default=0, verbose_name="Registros que o referenciam")
+    orfao_desde = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="Sem referências desde")
+    date_create = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
+
+    class Meta:
+        verbose_name = "Arquivo por Conteúdo"
+        verbose_name_plural = "Arquivos por Conteúdo"
+
+    def __str__(self):
+        return self.arquivo
+
+
+class TextoArquivo(models.Model):
+    """
+    Texto extraído do PDF de um Registro (apps.repositorio.text_extraction),
+    em tabela própria para manter as linhas de Registro estreitas. Entra no
+    documento de busca com o menor peso. `sha256` identifica o arquivo de
+    origem: a extração só é refeita quando o arquivo muda.
+    """
+
+    EXTRAIDO = 'extraido'
+    SEM_TEXTO = 'sem_texto'
+    ERRO = 'erro'
+    STATUS_CHOICES = [
+        (EXTRAIDO, 'Extraído'),
+        (SEM_TEXTO, 'Sem texto (ex.: digitalizado)'),
+        (ERRO, 'Erro'),
+    ]
+
+    registro = models.OneToOneField(
+        Registro,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='texto_arquivo',
+        verbose_name="Registro",
+    )
+    sha256 = models.CharField(max_length=64, db_index=True, verbose_name="SHA-256 do Arquivo de Origem")
+    texto = models.TextField(blank=True, default='', verbose_name="Texto Extraído")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=EXTRAIDO, verbose_name="Status")
+    mensagem_erro = models.TextField(blank=True, default='', verbose_name="Mensagem de Erro")
+    date_update = models.DateTimeField(auto_now=True, verbose_name="Data da Extração")
+
+    class Meta:
+        verbose_name = "Texto do Arquivo"
+        verbose_name_plural = "Textos dos Arquivos"
+
+    def __str__(self):
+        return f"Texto de {self.registro_id}"
+
+
 class FotoGaleria(models.Model):
     """Modelo para imagens da galeria do site."""
 
@@ -293,3 +432,207 @@ class FotoGaleria(models.Model):
 
     def __str__(self):
         return self.titulo
+
+
+# Modelo de Leitura (Busca e Listagens)
+
+class RegistroDocumento(models.Model):
+    """
+    Cópia achatada de um Registro para leitura: nomes de projeto, subprojeto,
+    tipo, área e status, autores/tags em listas e flags prontas, de modo que a
+    listagem pública, as facetas e as exportações leiam uma única tabela.
+    Mantido pelos sinais em apps.repositorio.signals (comando
+    `reconstruir_documentos` para a carga completa).
+    """
+    registro = models.OneToOneField(
+        Registro,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="documento",
+        verbose_name="Registro"
+    )
+    titulo = models.CharField(max_length=2000, verbose_name="Título")
+    data_publicacao = models.DateField(null=True, blank=True, verbose_name="Data da Publicação")
+    ano = models.PositiveSmallIntegerField(null=True, blank=True, db_index=True, verbose_name="Ano da Publicação")
+
+    projeto_id = models.PositiveIntegerField(db_index=True, verbose_name="ID do Projeto")
+    projeto_nome = models.CharField(max_length=150, verbose_name="Projeto")
+    subprojeto_id = models.PositiveIntegerField(db_index=True, verbose_name="ID do Subprojeto")
+    subprojeto_nome = models.CharField(max_length=150, verbose_name="Subprojeto")
+    tipo_documento_id = models.PositiveIntegerField(db_index=True, verbose_name="ID do Tipo de Documento")
+    tipo_documento_nome = models.CharField(max_length=100, verbose_name="Tipo de Documento")
+    area_tematica_id = models.PositiveIntegerField(db_index=True, verbose_name="ID da Área Temática")
+    area_tematica_nome = models.CharField(max_length=100, verbose_name="Área Temática")
+    status_id = models.PositiveIntegerField(db_index=True, verbose_name="ID do Status")
+    status_nome = models.CharField(max_length=50, verbose_name="Status")
+
+    autores_ids = models.JSONField(default=list, blank=True, verbose_name="IDs dos Autores")
+    autores_nomes = models.JSONField(default=list, blank=True, verbose_name="Autores")
+    tags_ids = models.JSONField(default=list, blank=True, verbose_name="IDs das Tags")
+    tags_nomes = models.JSONField(default=list, blank=True, verbose_name="Palavras-chave")
+
+    arquivo = models.CharField(max_length=5000, blank=True, default='', verbose_name="Arquivo")
+    arquivo_nome = models.CharField(max_length=500, blank=True, default='', verbose_name="Nome Original do Arquivo")
+    arquivo_tamanho = models.BigIntegerField(null=True, blank=True, verbose_name="Tamanho do Arquivo (bytes)")
+    arquivo_mime = models.CharField(max_length=100, blank=True, default='', verbose_name="Tipo do Arquivo")
+    link_externo = models.CharField(max_length=2000, blank=True, default='', verbose_name="Link Externo/URL")
+
+    ativo = models.BooleanField(default=True, verbose_name="Ativo")
+    publico = models.BooleanField(default=False, verbose_name="Visível na busca pública")
+    date_create = models.DateTimeField(verbose_name="Data de Criação do Registro")
+
+    class Meta:
+        verbose_name = "Documento de Leitura"
+        verbose_name_plural = "Documentos de Leitura"
+        ordering = ['-data_publicacao', 'titulo']
+        # Índices parciais sobre o subconjunto público (`publico` = ativo e status
+        # público), na ordem das ordenações da busca com o desempate por id da
+        # paginação; o ano (coluna gravada) vem antes da ordenação para a faceta.
+        # Os de `-data_publicacao` usam NULLS LAST e, como em Registro, são criados
+        # só no PostgreSQL (migration 0019).
+        indexes = [
+            models.Index(
+                F('data_publicacao').desc(nulls_last=True), F('titulo'), F('registro'),
+                condition=Q(publico=True),
+                name='regdoc_publico_data_idx',
+            ),
+            models.Index(fields=['titulo', 'registro'], condition=Q(publico=True), name='regdoc_publico_titulo_idx'),
+            models.Index(
+                F('ano'), F('data_publicacao').desc(nulls_last=True), F('titulo'), F('registro'),
+                condition=Q(publico=True),
+                name='regdoc_publico_ano_data_idx',
+            ),
+            # Exportações (mesma ordenação da listagem de gestão)
+            models.Index(fields=['-date_create', '-registro'], name='regdoc_criacao_idx'),
+        ]
+
+    def __str__(self):
+        return self.titulo
+
+    @property
+    def tem_arquivo(self):
+        return bool(self.arquivo)
+
+
+# Estatísticas Agregadas
+
+class ProjetoEstatistica(models.Model):
+    """
+    Contadores de um Projeto exibidos na página do TCCE, lidos numa única
+    consulta. Recalculados por projeto após o commit das alterações de
+    Registros e relações (apps.repositorio.rollups) e pelo comando
+    `recalcular_estatisticas`.
+    """
+    projeto = models.OneToOneField(
+        Projeto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="estatistica",
+        verbose_name="Projeto"
+    )
+    producoes_academicas = models.PositiveIntegerField(default=0, verbose_name="Produções Acadêmicas")
+    producoes_publicadas = models.PositiveIntegerField(default=0, verbose_name="Produções Publicadas")
+    artigos_cientificos = models.PositiveIntegerField(default=0, verbose_name="Artigos Científicos")
+    relatorios_tecnicos = models.PositiveIntegerField(default=0, verbose_name="Relatórios Técnicos")
+    autores_unicos = models.PositiveIntegerField(default=0, verbose_name="Autores Únicos")
+    subprojetos_ativos = models.PositiveIntegerField(default=0, verbose_name="Subprojetos Ativos")
+    date_update = models.DateTimeField(auto_now=True, verbose_name="Data do Cálculo")
+
+    class Meta:
+        verbose_name = "Estatística do Projeto"
+        verbose_name_plural = "Estatísticas dos Projetos"
+
+    def __str__(self):
+        return f"Estatísticas de {self.projeto_id}"
+
+
+class EstatisticaPublicacao(models.Model):
+    """
+    Registros públicos por ano × projeto × área temática × tipo de documento
+    (uma linha por combinação existente), com os autores distintos da
+    combinação. Alimenta a API de estatísticas; as linhas de um projeto são
+    refeitas junto com a sua ProjetoEstatistica (apps.repositorio.rollups).
+    """
+    ano = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Ano da Publicação")
+    projeto_id = models.PositiveIntegerField(verbose_name="ID do Projeto")
+    area_tematica_id = models.PositiveIntegerField(verbose_name="ID da Área Temática")
+    tipo_documento_id = models.PositiveIntegerField(verbose_name="ID do Tipo de Documento")
+    registros = models.PositiveIntegerField(default=0, verbose_name="Registros")
+    autores = models.PositiveIntegerField(default=0, verbose_name="Autores Distintos")
+
+    class Meta:
+        verbose_name = "Estatística de Publicações"
+        verbose_name_plural = "Estatísticas de Publicações"
+        indexes = [
+            models.Index(fields=['projeto_id', 'ano'], name='estpub_projeto_ano_idx'),
+            models.Index(fields=['ano'], name='estpub_ano_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ano} / {self.projeto_id} / {self.area_tematica_id} / {self.tipo_documento_id}"
+
+
+# Exportações em Segundo Plano
+
+def exportacao_file_path(instance, filename):
+    """Arquivos gerados pelas exportações: exportacoes/<chave>.zip."""
+    return f"exportacoes/{instance.chave}.zip"
+
+
+class ExportacaoArquivos(models.Model):
+    """
+    ZIP dos arquivos de uma listagem filtrada, gerado fora da requisição
+    (apps.repositorio.export_jobs). A `chave` identifica os filtros
+    normalizados e a versão do catálogo: o mesmo pedido com o catálogo
+    inalterado reaproveita o arquivo já gerado.
+    """
+    PENDENTE = 'pendente'
+    PROCESSANDO = 'processando'
+    CONCLUIDA = 'concluida'
+    ERRO = 'erro'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'),
+        (PROCESSANDO, 'Processando'),
+        (CONCLUIDA, 'Concluída'),
+        (ERRO, 'Erro'),
+    ]
+
+    chave = models.CharField(max_length=40, unique=True, verbose_name="Chave")
+    parametros = models.JSONField(default=dict, blank=True, verbose_name="Filtros")
+    versao_catalogo = models.BigIntegerField(verbose_name="Versão do Catálogo")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDENTE, db_index=True, verbose_name="Situação")
+
+    total = models.PositiveIntegerField(default=0, verbose_name="Total de Arquivos")
+    processados = models.PositiveIntegerField(default=0, verbose_name="Arquivos Processados")
+    arquivo = models.FileField(upload_to=exportacao_file_path, null=True, blank=True, max_length=500, verbose_name="Arquivo ZIP")
+    tamanho = models.BigIntegerField(default=0, verbose_name="Tamanho (bytes)")
+    mensagem_erro = models.TextField(blank=True, default='', verbose_name="Mensagem de Erro")
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="exportacoes",
+        verbose_name="Solicitado por"
+    )
+    date_create = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
+    date_update = models.DateTimeField(auto_now=True, verbose_name="Data da ultima atualização")
+    concluida_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluída em")
+
+    class Meta:
+        verbose_name = "Exportação de Arquivos"
+        verbose_name_plural = "Exportações de Arquivos"
+        ordering = ['-date_create']
+
+    def __str__(self):
+        return f"Exportação {self.chave[:8]} ({self.get_status_display()})"
+
+    @property
+    def progresso(self):
+        """Percentual de arquivos processados (0 a 100)."""
+        if self.status == self.CONCLUIDA:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.processados * 100 / self.total))
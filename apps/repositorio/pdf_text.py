@@ -0,0 +1,44 @@
+"""
+Extração do texto de PDFs com o pypdf (Python puro, apenas CPU).
+
+Este módulo não importa o Django: as funções podem ser executadas em processos
+de um ProcessPoolExecutor (reprocessamento em lote), recebendo os bytes do
+arquivo já lidos do storage pelo processo principal.
+"""
+import io
+import re
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - dependência opcional
+    PdfReader = None
+
+# Espaços repetidos, quebras de linha e caracteres de controle viram um único espaço
+_ESPACOS = re.compile(r'[\s\x00-\x1f]+')
+
+
+def extracao_disponivel():
+    return PdfReader is not None
+
+
+def extrair_texto_pdf(dados, limite_caracteres=None):
+    """
+    Texto das páginas do PDF (bytes), com os espaços normalizados e truncado em
+    `limite_caracteres`. Retorna (texto, páginas).
+    """
+    leitor = PdfReader(io.BytesIO(dados), strict=False)
+    partes = []
+    total = 0
+    for pagina in leitor.pages:
+        texto = _ESPACOS.sub(' ', pagina.extract_text() or '').strip()
+        if not texto:
+            continue
+        partes.append(texto)
+        total += len(texto) + 1
+        if limite_caracteres and total >= limite_caracteres:
+            break
+
+    texto = ' '.join(partes)
+    if limite_caracteres:
+        texto = texto[:limite_caracteres]
+    return texto, len(leitor.pages)
@@ -0,0 +1,197 @@
+"""
+Estatísticas agregadas (rollups) do repositório.
+
+`ProjetoEstatistica` guarda os contadores de cada projeto exibidos na página
+do TCCE e `EstatisticaPublicacao` os registros públicos por ano × projeto ×
+área temática × tipo de documento, servidos pela API de estatísticas e pelos
+contadores da página inicial sem agregações sobre as tabelas completas.
+
+Os sinais de Registro e das relações marcam os projetos afetados e,
+após o commit, só as linhas desses projetos são recalculadas (uma consulta
+agrupada por métrica, filtrada pelos projetos). Alterações em tabelas
+auxiliares que mudam as regras de contagem (nome do status/tipo, `ativo` de
+autores e subprojetos) recalculam todos os projetos, que são poucos.
+
+O comando `recalcular_estatisticas` refaz a tabela inteira.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from apps.repositorio.models.repositorio import (
+    EstatisticaPublicacao,
+    Projeto,
+    ProjetoEstatistica,
+    Registro,
+    RegistroDocumento,
+    Subprojeto,
+)
+from apps.repositorio.search.versioning import incrementar_versao_estatisticas
+
+# Regras de contagem da página do TCCE
+STATUS_PUBLICADO = 'PUBLICADO'
+TIPO_ARTIGO = 'ARTIGO'
+TIPO_RELATORIO_TECNICO = 'RELATÓRIO TÉCNICO FINAL'
+
+CAMPOS_ESTATISTICA = [
+    'producoes_academicas',
+    'producoes_publicadas',
+    'artigos_cientificos',
+    'relatorios_tecnicos',
+    'autores_unicos',
+    'subprojetos_ativos',
+]
+
+# Dimensões das linhas de EstatisticaPublicacao (colunas de RegistroDocumento)
+DIMENSOES_PUBLICACAO = ['ano', 'projeto_id', 'area_tematica_id', 'tipo_documento_id']
+
+
+def calcular_estatisticas(projeto_ids=None):
+    """Contadores por projeto ({projeto_id: {campo: valor}}), para os projetos informados ou todos."""
+    projetos = Projeto.objects.all()
+    if projeto_ids is not None:
+        projetos = projetos.filter(pk__in=projeto_ids)
+    resultado = {pk: dict.fromkeys(CAMPOS_ESTATISTICA, 0) for pk in projetos.values_list('pk', flat=True)}
+    if not resultado:
+        return resultado
+
+    registros = (
+        Registro.objects.filter(ativo=True, projeto_id__in=list(resultado))
+        .values('projeto_id')
+        .annotate(
+            producoes_academicas=Count('pk'),
+            producoes_publicadas=Count('pk', filter=Q(status__nome=STATUS_PUBLICADO)),
+            artigos_cientificos=Count('pk', filter=Q(tipo_documento__nome__icontains=TIPO_ARTIGO)),
+            relatorios_tecnicos=Count('pk', filter=Q(tipo_documento__nome__icontains=TIPO_RELATORIO_TECNICO)),
+        )
+        .order_by()
+    )
+    for linha in registros:
+        projeto_id = linha.pop('projeto_id')
+        resultado[projeto_id].update(linha)
+
+    autores = (
+        Registro.autores.through.objects.filter(
+            registro__projeto_id__in=list(resultado), autor__ativo=True,
+        )
+        .values_list('registro__projeto_id')
+        .annotate(total=Count('autor_id', distinct=True))
+        .order_by()
+    )
+    for projeto_id, total in autores:
+        resultado[projeto_id]['autores_unicos'] = total
+
+    subprojetos = (
+        Subprojeto.objects.filter(ativo=True, projeto_id__in=list(resultado))
+        .values_list('projeto_id')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    for projeto_id, total in subprojetos:
+        resultado[projeto_id]['subprojetos_ativos'] = total
+    return resultado
+
+
+def calcular_publicacoes(projeto_ids=None):
+    """Linhas de EstatisticaPublicacao (não gravadas) dos projetos informados ou de todos."""
+    documentos = RegistroDocumento.objects.filter(publico=True)
+    vinculos = Registro.autores.through.objects.filter(registro__documento__publico=True, autor__ativo=True)
+    if projeto_ids is not None:
+        documentos = documentos.filter(projeto_id__in=projeto_ids)
+        vinculos = vinculos.filter(registro__documento__projeto_id__in=projeto_ids)
+
+    dimensoes_autores = [f'registro__documento__{dimensao}' for dimensao in DIMENSOES_PUBLICACAO]
+    autores = {
+        tuple(linha[:-1]): linha[-1]
+        for linha in vinculos.values_list(*dimensoes_autores).annotate(total=Count('autor_id', distinct=True)).order_by()
+    }
+    return [
+        EstatisticaPublicacao(
+            registros=linha.pop('registros'),
+            autores=autores.get(tuple(linha[dimensao] for dimensao in DIMENSOES_PUBLICACAO), 0),
+            **linha,
+        )
+        for linha in documentos.values(*DIMENSOES_PUBLICACAO).annotate(registros=Count('pk')).order_by()
+    ]
+
+
+def recalcular_projetos(projeto_ids=None):
+    """Regrava as estatísticas (ProjetoEstatistica e EstatisticaPublicacao) dos projetos informados ou de todos."""
+    estatisticas = calcular_estatisticas(projeto_ids)
+    publicacoes = calcular_publicacoes(projeto_ids)
+    with transaction.atomic():
+        ProjetoEstatistica.objects.bulk_create(
+            [ProjetoEstatistica(projeto_id=pk, **valores) for pk, valores in estatisticas.items()],
+            update_conflicts=True,
+            unique_fields=['projeto'],
+            update_fields=CAMPOS_ESTATISTICA + ['date_update'],
+        )
+        antigas = EstatisticaPublicacao.objects.all()
+        if projeto_ids is not None:
+            antigas = antigas.filter(projeto_id__in=projeto_ids)
+        antigas.delete()
+        EstatisticaPublicacao.objects.bulk_create(publicacoes)
+        # Invalida as respostas da API de estatísticas (ETag e cache)
+        transaction.on_commit(incrementar_versao_estatisticas)
+    return len(estatisticas)
+
+
+def projetos_alterados(projeto_ids=None):
+    """Agenda o recálculo dos projetos (None = todos) para depois do commit da transação."""
+    projeto_ids = None if projeto_ids is None else sorted({pk for pk in projeto_ids if pk})
+    if projeto_ids == []:
+        return
+    transaction.on_commit(partial(recalcular_projetos, projeto_ids))
+
+
+def projetos_dos_registros(registro_ids):
+    """
+    Projetos atuais dos registros e os registrados no documento de leitura
+    (projeto anterior, quando o subprojeto mudou e o documento ainda não foi
+    sincronizado).
+    """
+    linhas = Registro.objects.filter(pk__in=registro_ids).values_list('projeto_id', 'documento__projeto_id')
+    return {pk for linha in linhas for pk in linha if pk}
+
+
+def estatisticas_projetos():
+    """
+    Estatísticas dos projetos ativos ({projeto_id: ProjetoEstatistica}) numa
+    consulta. Com a tabela ainda vazia (antes do primeiro
+    `recalcular_estatisticas`), os projetos são calculados nesta chamada.
+    """
+    consulta = ProjetoEstatistica.objects.filter(projeto__ativo=True).select_related('projeto')
+    estatisticas = {estatistica.projeto_id: estatistica for estatistica in consulta}
+    if not estatisticas and recalcular_projetos():
+        estatisticas = {estatistica.projeto_id: estatistica for estatistica in consulta.all()}
+    return estatisticas
+
+
+def series_publicacoes(projeto_ids=None, ano_inicio=None, ano_fim=None):
+    """Linhas de EstatisticaPublicacao filtradas, como dicts (ordem: ano, projeto, área, tipo)."""
+    linhas = EstatisticaPublicacao.objects.all()
+    if projeto_ids:
+        linhas = linhas.filter(projeto_id__in=projeto_ids)
+    if ano_inicio is not None:
+        linhas = linhas.filter(ano__gte=ano_inicio)
+    if ano_fim is not None:
+        linhas = linhas.filter(ano__lte=ano_fim)
+    return [
+        {
+            'ano': ano,
+            'projeto': projeto_id,
+            'area_tematica': area_tematica_id,
+            'tipo_documento': tipo_documento_id,
+            'registros': registros,
+            'autores': autores,
+        }
+        for ano, projeto_id, area_tematica_id, tipo_documento_id, registros, autores in linhas.order_by(
+            'ano', 'projeto_id', 'area_tematica_id', 'tipo_documento_id',
+        ).values_list(*DIMENSOES_PUBLICACAO, 'registros', 'autores')
+    ]
+
+
+def total_publicacoes():
+    """Registros públicos (soma das linhas agregadas, sem contar a tabela de registros)."""
+    return EstatisticaPublicacao.objects.aggregate(total=Sum('registros'))['total'] or 0
@@ -0,0 +1,5 @@
+from .fulltext import (
+    aplicar_busca_textual,
+    atualizar_search_vector,
+    reconstruir_search_vector,
+)
@@ -0,0 +1,101 @@
+"""
+Autocomplete de autores, tags e subprojetos.
+
+As sugestões são buscadas por prefixo do nome, sem diferenciar maiúsculas nem
+acentos (lookup `prefixo_sem_acento`, indexado no PostgreSQL), em páginas de
+POR_PAGINA itens; `mais` indica se há uma próxima página (busca-se um item a
+mais, sem COUNT).
+
+As respostas carregam um ETag derivado dos parâmetros e da versão dos dados
+(`search.versioning`): um `If-None-Match` igual é respondido com 304 sem ir
+ao banco, e o corpo fica no cache do Django para as demais requisições.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+
+from apps.repositorio.search.lookups import remover_acentos
+
+PREFIXO_CHAVE = 'repositorio:autocomplete'
+
+POR_PAGINA = 20
+
+# Tempo (s) em que navegadores e proxies podem reutilizar a resposta sem revalidar
+MAX_AGE = 60
+
+# Tempo (s) do corpo no cache do servidor (a chave já muda a cada versão)
+TIMEOUT_CACHE = 600
+
+
+def normalizar_termo(termo):
+    return ' '.join(str(termo or '').split())
+
+
+def obter_pagina(valor):
+    try:
+        return max(int(valor), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def paginar(itens, pagina):
+    """Fatia `itens` (queryset ou lista) na página informada."""
+    inicio = (pagina - 1) * POR_PAGINA
+    itens = list(itens[inicio:inicio + POR_PAGINA + 1])
+    return itens[:POR_PAGINA], len(itens) > POR_PAGINA
+
+
+def sugerir_queryset(queryset, termo, pagina, campo='nome'):
+    """Página de `{'id', 'nome'}` do queryset cujo `campo` começa com `termo`."""
+    if termo:
+        queryset = queryset.filter(**{f'{campo}__prefixo_sem_acento': termo})
+    queryset = queryset.order_by(campo, 'pk').values_list('pk', campo)
+    itens, mais = paginar(queryset, pagina)
+    return [{'id': pk, 'nome': nome} for pk, nome in itens], mais
+
+
+def sugerir_objetos(objetos, termo, pagina):
+    """Mesma busca de `sugerir_queryset` sobre objetos já carregados (ex.: tabelas auxiliares)."""
+    prefixo = remover_acentos(termo).lower()
+    objetos = sorted(
+        (obj for obj in objetos if remover_acentos(obj.nome).lower().startswith(prefixo)),
+        key=lambda obj: (obj.nome, obj.pk),
+    )
+    itens, mais = paginar(objetos, pagina)
+    return [{'id': obj.pk, 'nome': obj.nome} for obj in itens], mais
+
+
+def resposta_autocomplete(request, nome, versao, sugerir, **parametros):
+    """
+    Resposta JSON de uma página de sugestões, com ETag e cache.
+
+    `sugerir(termo, pagina)` retorna `(resultados, mais)` e só é chamada se o
+    corpo não estiver em cache; `parametros` são filtros extras que entram no
+    ETag (ex.: projeto_id).
+    """
+    termo = normalizar_termo(request.GET.get('q'))
+    pagina = obter_pagina(request.GET.get('page'))
+    assinatura = hashlib.sha1(json.dumps(
+        [nome, versao, remover_acentos(termo).lower(), pagina, sorted(parametros.items())],
+        default=str,
+    ).encode()).hexdigest()
+    etag = quote_etag(assinatura)
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        chave = f'{PREFIXO_CHAVE}:{assinatura}'
+        corpo = cache.get(chave)
+        if corpo is None:
+            resultados, mais = sugerir(termo, pagina)
+            corpo = json.dumps({'resultados': resultados, 'pagina': pagina, 'mais': mais})
+            cache.set(chave, corpo, timeout=TIMEOUT_CACHE)
+        response = HttpResponse(corpo, content_type='application/json')
+
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=MAX_AGE)
+    return response
@@ -0,0 +1,331 @@
+"""
+Índice de facetas em memória (opcional, requer NumPy).
+
+O catálogo cabe com folga na memória de cada processo, então os filtros de
+faceta (projeto, subprojeto, autor, tag, tipo de documento, área temática,
+status e ano) podem ser resolvidos sem SQL. O índice é carregado do modelo de
+leitura `RegistroDocumento` e das tabelas M2M: cada Registro ocupa uma posição
+fixa em arrays NumPy e cada filtro vira uma máscara booleana (bitmap) sobre
+essas posições. Interseções são `&` entre máscaras e contagens por valor são
+`np.unique` sobre a coluna mascarada, tudo vetorizado.
+
+As colunas de chave estrangeira guardam o id do valor por registro; as relações
+M2M guardam os pares (posição do registro, id do valor). Assim o índice não
+precisa de um bitset por autor/tag, que custaria memória proporcional a
+autores × registros.
+
+O banco só é consultado para buscar as linhas da página exibida (`ResultadoIds`)
+e, após cada alteração, para recalcular a ordem de exibição (uma consulta por
+ordenação usada).
+
+Atualização:
+- no processo que alterou o Registro, os sinais atualizam o índice de forma
+  incremental após o commit (`registrar_alteracao`);
+- os demais processos percebem a mudança pela versão global do catálogo
+  (`search.versioning`) e reconstroem o índice na próxima consulta.
+
+Ativado pelo setting `REPOSITORIO_INDICE_FACETAS`; sem NumPy instalado as
+views continuam usando apenas SQL.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db.models import F
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependência opcional
+    np = None
+
+from apps.repositorio.models.repositorio import Registro, RegistroDocumento
+from apps.repositorio.search.pagination import ordem_nulos_por_ultimo
+from apps.repositorio.search.versioning import incrementar_versao_catalogo, versao_catalogo
+
+logger = logging.getLogger(__name__)
+
+# Facetas de valor único: nome -> campo lido do RegistroDocumento
+COLUNAS = {
+    'projeto': 'projeto_id',
+    'subprojeto': 'subprojeto_id',
+    'tipo_documento': 'tipo_documento_id',
+    'area_tematica': 'area_tematica_id',
+    'status': 'status_id',
+    'ano': 'ano',
+}
+
+# Facetas M2M: nome -> (relação no Registro, coluna do valor na tabela intermediária)
+RELACOES = {
+    'autor': ('autores', 'autor_id'),
+    'tag': ('tags', 'tag_id'),
+}
+
+CAMPOS_DOCUMENTO = ['registro_id', 'ativo', 'publico', *COLUNAS.values()]
+
+
+def _vazio(dtype=None):
+    return np.empty(0, dtype=dtype or np.int64)
+
+
+class IndiceFacetas:
+    """Colunas NumPy dos Registros para filtrar, contar e ordenar sem SQL."""
+
+    def __init__(self, versao=None):
+        self.versao = versao
+        self._lock = threading.RLock()
+        self._carregar()
+
+    @property
+    def facetas(self):
+        return [*COLUNAS, *RELACOES]
+
+    # ------------------------------------------------------------------
+    # Carga e atualização
+    # ------------------------------------------------------------------
+    def _carregar(self):
+        self.ids = _vazio()
+        self.existe = _vazio(bool)
+        self.ativo = _vazio(bool)
+        self.publico = _vazio(bool)
+        self.colunas = {nome: _vazio() for nome in COLUNAS}
+        self.pares = {nome: (_vazio(), _vazio()) for nome in RELACOES}
+        self.posicoes = {}
+        self._ordens = {}
+
+        self._anexar(RegistroDocumento.objects.order_by('pk').values_list(*CAMPOS_DOCUMENTO))
+        for nome in RELACOES:
+            self._carregar_pares(nome)
+
+    @staticmethod
+    def _valores_linha(linha):
+        pk, ativo, publico, *valores = linha
+        return pk, bool(ativo), bool(publico), dict(zip(COLUNAS, (valor or 0 for valor in valores)))
+
+    def _anexar(self, linhas):
+        ids, ativos, publicos, colunas = [], [], [], {nome: [] for nome in self.colunas}
+        for linha in linhas:
+            pk, ativo, publico, valores = self._valores_linha(linha)
+            self.posicoes[pk] = len(self.ids) + len(ids)
+            ids.append(pk)
+            ativos.append(ativo)
+            publicos.append(publico)
+            for nome, valor in valores.items():
+                colunas[nome].append(valor)
+
+        if not ids:
+            return
+        self.ids = np.concatenate([self.ids, np.array(ids, dtype=np.int64)])
+        self.existe = np.concatenate([self.existe, np.ones(len(ids), dtype=bool)])
+        self.ativo = np.concatenate([self.ativo, np.array(ativos, dtype=bool)])
+        self.publico = np.concatenate([self.publico, np.array(publicos, dtype=bool)])
+        for nome, valores in colunas.items():
+            self.colunas[nome] = np.concatenate([self.colunas[nome], np.array(valores, dtype=np.int64)])
+
+    def _gravar(self, posicao, linha):
+        _, ativo, publico, valores = self._valores_linha(linha)
+        self.existe[posicao] = True
+        self.ativo[posicao] = ativo
+        self.publico[posicao] = publico
+        for nome, valor in valores.items():
+            self.colunas[nome][posicao] = valor
+
+    def _carregar_pares(self, nome, registro_ids=None):
+        """(Re)carrega os pares registro/valor de uma relação M2M."""
+        relacao, coluna = RELACOES[nome]
+        through = getattr(Registro, relacao).through
+        linhas = through.objects.values_list('registro_id', coluna)
+
+        registros, valores = self.pares[nome]
+        if registro_ids is not None:
+            linhas = linhas.filter(registro_id__in=registro_ids)
+            posicoes = [self.posicoes[pk] for pk in registro_ids if pk in self.posicoes]
+            manter = ~np.isin(registros, np.array(posicoes, dtype=np.int64))
+            registros, valores = registros[manter], valores[manter]
+
+        novos = [(self.posicoes[registro_id], valor) for registro_id, valor in linhas if registro_id in self.posicoes]
+        if novos:
+            novos = np.array(novos, dtype=np.int64)
+            registros = np.concatenate([registros, novos[:, 0]])
+            valores = np.concatenate([valores, novos[:, 1]])
+        self.pares[nome] = (registros, valores)
+
+    def atualizar_registros(self, registro_ids):
+        """Relê os registros informados (incluídos, alterados ou excluídos)."""
+        registro_ids = {int(pk) for pk in registro_ids if pk}
+        if not registro_ids:
+            return
+        with self._lock:
+            linhas = list(RegistroDocumento.objects.filter(pk__in=registro_ids).values_list(*CAMPOS_DOCUMENTO))
+            encontrados = {linha[0] for linha in linhas}
+
+            self._anexar([linha for linha in linhas if linha[0] not in self.posicoes])
+            for linha in linhas:
+                self._gravar(self.posicoes[linha[0]], linha)
+            for pk in registro_ids - encontrados:
+                if pk in self.posicoes:
+                    self.existe[self.posicoes[pk]] = False
+
+            for nome in RELACOES:
+                self._carregar_pares(nome, registro_ids)
+            self._ordens = {}
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def _mascara_base(self, publicos=True, ativo=None):
+        mascara = self.existe.copy()
+        if publicos:
+            mascara &= self.publico
+        elif ativo is not None:
+            mascara &= self.ativo == bool(ativo)
+        return mascara
+
+    def _mascara_faceta(self, nome, valores):
+        valores = np.array(list(valores), dtype=np.int64)
+        if nome in self.pares:
+            registros, ids_valores = self.pares[nome]
+            mascara = np.zeros(len(self.ids), dtype=bool)
+            mascara[registros[np.isin(ids_valores, valores)]] = True
+            return mascara
+        return np.isin(self.colunas[nome], valores)
+
+    def _mascaras(self, selecionadas):
+        return {
+            nome: self._mascara_faceta(nome, valores)
+            for nome, valores in selecionadas.items()
+            if valores and nome in self.facetas
+        }
+
+    def _contagens(self, nome, mascara):
+        if nome in self.pares:
+            registros, valores = self.pares[nome]
+            valores = valores[mascara[registros]]
+        else:
+            valores = self.colunas[nome][mascara]
+        ids_valores, totais = np.unique(valores, return_counts=True)
+        return {int(valor): int(total) for valor, total in zip(ids_valores, totais) if valor}
+
+    def contar(self, selecionadas, facetas=None, publicos=True, ativo=None):
+        """
+        Contagens por valor de cada faceta, aplicando os filtros selecionados
+        exceto o da própria faceta (mesma semântica de `MotorFacetas.contar`).
+        """
+        with self._lock:
+            base = self._mascara_base(publicos, ativo)
+            mascaras = self._mascaras(selecionadas)
+            resultado = {}
+            for nome in facetas or self.facetas:
+                mascara = base.copy()
+                for outra, mascara_outra in mascaras.items():
+                    if outra != nome:
+                        mascara &= mascara_outra
+                resultado[nome] = self._contagens(nome, mascara)
+            return resultado
+
+    def consultar(self, selecionadas, ordenacao, publicos=True, ativo=None):
+        """Ids dos registros filtrados, na ordem informada (array NumPy)."""
+        with self._lock:
+            mascara = self._mascara_base(publicos, ativo)
+            for mascara_faceta in self._mascaras(selecionadas).values():
+                mascara &= mascara_faceta
+            ordem = self._ordem(tuple(ordenacao))
+            return self.ids[ordem[mascara[ordem]]]
+
+    def _ordem(self, ordenacao):
+        """
+        Posições de todos os registros na ordenação pedida, calculada pelo banco
+        (respeita a collation do título) e guardada até a próxima alteração.
+        NULLs por último (`ordem_nulos_por_ultimo`), como na paginação por
+        cursor e na busca resolvida pelo banco.
+        """
+        if ordenacao not in self._ordens:
+            expressoes = ordem_nulos_por_ultimo(ordenacao)
+            if not {'pk', 'id'} & {campo.lstrip('-') for campo in ordenacao}:
+                expressoes.append(F('pk').asc())
+            ids = Registro.objects.order_by(*expressoes).values_list('pk', flat=True)
+            self._ordens[ordenacao] = np.array(
+                [self.posicoes[pk] for pk in ids.iterator() if pk in self.posicoes], dtype=np.int64
+            )
+        return self._ordens[ordenacao]
+
+
+class ResultadoIds:
+    """
+    Sequência de Registros a partir de ids já filtrados e ordenados. Compatível
+    com o Paginator do Django: o total vem do array de ids e cada fatia busca no
+    banco apenas as linhas que serão exibidas.
+    """
+
+    def __init__(self, ids, queryset):
+        self.ids = ids
+        self.queryset = queryset
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, indice):
+        if not isinstance(indice, slice):
+            return self[indice:indice + 1][0] if indice >= 0 else self[len(self) + indice]
+        ids = [int(pk) for pk in self.ids[indice]]
+        objetos = {obj.pk: obj for obj in self.queryset.filter(pk__in=ids).order_by()}
+        return [objetos[pk] for pk in ids if pk in objetos]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+# ----------------------------------------------------------------------
+# Índice do processo
+# ----------------------------------------------------------------------
+_indice = None
+_lock_indice = threading.Lock()
+
+
+def indice_habilitado():
+    return np is not None and getattr(settings, 'REPOSITORIO_INDICE_FACETAS', False)
+
+
+def obter_indice():
+    """Índice de facetas do processo, reconstruído se o catálogo mudou. None se desabilitado."""
+    global _indice
+    if not indice_habilitado():
+        return None
+
+    versao = versao_catalogo()
+    indice = _indice
+    if indice is not None and indice.versao == versao:
+        return indice
+
+    with _lock_indice:
+        if _indice is None or _indice.versao != versao:
+            _indice = IndiceFacetas(versao)
+        return _indice
+
+
+def descartar_indice():
+    global _indice
+    _indice = None
+
+
+def registrar_alteracao(registro_ids=()):
+    """
+    Aplica uma alteração do catálogo já commitada: atualiza o índice deste
+    processo de forma incremental e incrementa a versão global, que faz os
+    demais processos reconstruírem os seus.
+    """
+    indice = _indice
+    if indice is not None:
+        try:
+            indice.atualizar_registros(registro_ids)
+        except Exception:
+            logger.exception('Falha ao atualizar o índice de facetas; ele será reconstruído.')
+            descartar_indice()
+            indice = None
+
+    nova_versao = incrementar_versao_catalogo()
+    # Só acompanha a nova versão se nenhuma outra alteração ocorreu no meio
+    if indice is not None and indice.versao == nova_versao - 1:
+        indice.versao = nova_versao
@@ -0,0 +1,92 @@
+"""
+Manutenção do modelo de leitura `RegistroDocumento`.
+
+Cada Registro tem um documento com os dados de exibição e de filtro já
+achatados. Os sinais chamam `sincronizar_documentos` com os ids afetados;
+`reconstruir_documentos` refaz a tabela inteira em lotes.
+"""
+from apps.repositorio.models.repositorio import Registro, RegistroDocumento
+from apps.repositorio.search.fulltext import TAMANHO_LOTE
+
+CAMPOS_ATUALIZADOS = [
+    field.name for field in RegistroDocumento._meta.concrete_fields if not field.primary_key
+]
+
+
+def montar_documento(registro):
+    """Documento de leitura de um Registro (com relações já carregadas)."""
+    autores = list(registro.autores.all())
+    tags = list(registro.tags.all())
+    return RegistroDocumento(
+        registro_id=registro.pk,
+        titulo=registro.titulo,
+        data_publicacao=registro.data_publicacao,
+        ano=registro.data_publicacao.year if registro.data_publicacao else None,
+        projeto_id=registro.projeto_id,
+        projeto_nome=registro.projeto.nome,
+        subprojeto_id=registro.subprojeto_id,
+        subprojeto_nome=registro.subprojeto.nome,
+        tipo_documento_id=registro.tipo_documento_id,
+        tipo_documento_nome=registro.tipo_documento.nome,
+        area_tematica_id=registro.area_tematica_id,
+        area_tematica_nome=registro.area_tematica.nome,
+        status_id=registro.status_id,
+        status_nome=registro.status.nome,
+        autores_ids=[autor.pk for autor in autores],
+        autores_nomes=[autor.nome for autor in autores],
+        tags_ids=[tag.pk for tag in tags],
+        tags_nomes=[tag.nome for tag in tags],
+        arquivo=registro.arquivo.name or '',
+        arquivo_nome=registro.arquivo_nome,
+        arquivo_tamanho=registro.arquivo_tamanho,
+        arquivo_mime=registro.arquivo_mime,
+        link_externo=registro.link_externo or '',
+        ativo=registro.ativo,
+        publico=registro.ativo and registro.status.is_public,
+        date_create=registro.date_create,
+    )
+
+
+def sincronizar_documentos(registro_ids):
+    """
+    Recria os documentos dos registros informados com um upsert em lote.
+    Registros que não existem mais perdem o documento.
+    """
+    registro_ids = {pk for pk in registro_ids if pk}
+    if not registro_ids:
+        return 0
+
+    registros = (
+        Registro.objects.filter(pk__in=registro_ids)
+        .select_related('subprojeto', 'projeto', 'tipo_documento', 'area_tematica', 'status')
+        .prefetch_related('autores', 'tags')
+        .order_by()
+    )
+    documentos = [montar_documento(registro) for registro in registros]
+    if documentos:
+        RegistroDocumento.objects.bulk_create(
+            documentos,
+            update_conflicts=True,
+            unique_fields=['registro'],
+            update_fields=CAMPOS_ATUALIZADOS,
+        )
+
+    removidos = registro_ids - {documento.registro_id for documento in documentos}
+    if removidos:
+        RegistroDocumento.objects.filter(registro_id__in=removidos).delete()
+    return len(documentos)
+
+
+def sincronizar_vinculados(queryset):
+    """Sincroniza, em lotes, os documentos dos registros de um queryset."""
+    ids = list(queryset.order_by().values_list('pk', flat=True))
+    for inicio in range(0, len(ids), TAMANHO_LOTE):
+        sincronizar_documentos(ids[inicio:inicio + TAMANHO_LOTE])
+    return ids
+
+
+def reconstruir_documentos():
+    """Recria todos os documentos de leitura e remove os órfãos."""
+    ids = sincronizar_vinculados(Registro.objects.all())
+    RegistroDocumento.objects.exclude(registro_id__in=Registro.objects.values('pk')).delete()
+    return len(ids)
@@ -0,0 +1,171 @@
+"""
+Facetas da busca pública.
+
+Cada faceta sabe filtrar o queryset de Registros (aceitando vários valores,
+combinados com OU) e contar, em uma única consulta agrupada, quantos registros
+do resultado atual existem para cada valor. A contagem de uma faceta ignora o
+filtro da própria faceta, para que a seleção múltipla mostre as alternativas.
+
+    motor = MotorFacetas.from_querydict(request.GET)
+    registros = motor.filtrar(queryset)
+    contagens = motor.contar(queryset)   # {'autor': {3: 12, 7: 1}, 'ano': {2019: 4}, ...}
+"""
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractYear
+
+from apps.repositorio.models.repositorio import Registro
+
+
+def _inteiros(valores):
+    """Converte os valores recebidos via GET em inteiros, descartando inválidos."""
+    resultado = []
+    for valor in valores:
+        valor = str(valor).strip()
+        if valor.isdigit() and int(valor) not in resultado:
+            resultado.append(int(valor))
+    return resultado
+
+
+class Faceta:
+    """Faceta sobre uma coluna (FK ou expressão) do próprio Registro."""
+
+    def __init__(self, nome, campo, contar=True):
+        self.nome = nome
+        self.campo = campo
+        self.contar = contar
+
+    def filtrar(self, queryset, valores):
+        return queryset.filter(**{f'{self.campo}__in': valores})
+
+    def contagens(self, queryset):
+        linhas = (
+            queryset.order_by()
+            .values(self.campo)
+            .annotate(total=Count('pk'))
+            .values_list(self.campo, 'total')
+        )
+        return {valor: total for valor, total in linhas if valor is not None}
+
+
+class FacetaAno(Faceta):
+    """Faceta pelo ano de `data_publicacao`."""
+
+    def __init__(self, nome='ano', campo='data_publicacao'):
+        super().__init__(nome, campo)
+
+    def filtrar(self, queryset, valores):
+        # `__year` exato vira um intervalo de datas (BETWEEN), atendido pelos
+        # índices sobre a data; `__year__in` seria um EXTRACT por linha
+        condicao = Q()
+        for ano in valores:
+            condicao |= Q(**{f'{self.campo}__year': ano})
+        return queryset.filter(condicao)
+
+    def contagens(self, queryset):
+        linhas = (
+            queryset.order_by()
+            .annotate(_ano=ExtractYear(self.campo))
+            .values('_ano')
+            .annotate(total=Count('pk'))
+            .values_list('_ano', 'total')
+        )
+        return {ano: total for ano, total in linhas if ano is not None}
+
+
+class FacetaM2M(Faceta):
+    """
+    Faceta sobre uma relação M2M. Filtra e conta pela tabela intermediária
+    (subquery), sem join no queryset principal, evitando linhas duplicadas.
+    Serve para querysets de Registro e de RegistroDocumento (mesma pk).
+    """
+
+    def __init__(self, nome, relacao, coluna, contar=True):
+        super().__init__(nome, relacao, contar)
+        self.coluna = coluna
+
+    @property
+    def through(self):
+        return getattr(Registro, self.campo).through
+
+    def filtrar(self, queryset, valores):
+        registros = self.through.objects.filter(**{f'{self.coluna}__in': valores}).values('registro_id')
+        return queryset.filter(pk__in=registros)
+
+    def contagens(self, queryset):
+        linhas = (
+            self.through.objects.filter(registro_id__in=queryset.order_by().values('pk'))
+            .values(self.coluna)
+            .annotate(total=Count('registro_id'))
+            .values_list(self.coluna, 'total')
+        )
+        return dict(linhas)
+
+
+FACETAS_REGISTRO = [
+    Faceta('projeto', 'projeto_id'),
+    Faceta('subprojeto', 'subprojeto_id'),
+    FacetaM2M('autor', 'autores', 'autor_id'),
+    FacetaM2M('tag', 'tags', 'tag_id', contar=False),
+    Faceta('tipo_documento', 'tipo_documento_id'),
+    Faceta('area_tematica', 'area_tematica_id'),
+    Faceta('status', 'status_id'),
+    FacetaAno(),
+]
+
+
+# Mesmas facetas sobre o modelo de leitura (colunas locais, inclusive o ano)
+FACETAS_DOCUMENTO = [
+    Faceta('projeto', 'projeto_id'),
+    Faceta('subprojeto', 'subprojeto_id'),
+    FacetaM2M('autor', 'autores', 'autor_id'),
+    FacetaM2M('tag', 'tags', 'tag_id', contar=False),
+    Faceta('tipo_documento', 'tipo_documento_id'),
+    Faceta('area_tematica', 'area_tematica_id'),
+    Faceta('status', 'status_id'),
+    Faceta('ano', 'ano'),
+]
+
+
+class MotorFacetas:
+    """Aplica as facetas selecionadas e calcula as contagens por valor."""
+
+    def __init__(self, selecionadas, facetas=None):
+        self.facetas = facetas or FACETAS_REGISTRO
+        nomes = {faceta.nome for faceta in self.facetas}
+        self.selecionadas = {nome: valores for nome, valores in selecionadas.items() if nome in nomes and valores}
+
+    @classmethod
+    def from_querydict(cls, querydict, facetas=None):
+        facetas = facetas or FACETAS_REGISTRO
+        return cls({faceta.nome: _inteiros(querydict.getlist(faceta.nome)) for faceta in facetas}, facetas)
+
+    def filtrar(self, queryset, exceto=None):
+        for faceta in self.facetas:
+            valores = self.selecionadas.get(faceta.nome)
+            if valores and faceta.nome != exceto:
+                queryset = faceta.filtrar(queryset, valores)
+        return queryset
+
+    def nomes_contados(self, nomes=None):
+        """Facetas com contagem, restritas a `nomes` quando informado."""
+        return [
+            faceta.nome for faceta in self.facetas
+            if faceta.contar and (nomes is None or faceta.nome in nomes)
+        ]
+
+    def contar(self, queryset, nomes=None):
+        """
+        Contagens de cada faceta sobre `queryset` (já com a busca textual e os
+        demais filtros não-faceta aplicados): uma consulta agrupada por faceta.
+        `nomes` restringe as facetas contadas às que serão exibidas.
+        """
+        contadas = self.nomes_contados(nomes)
+        return {
+            faceta.nome: faceta.contagens(self.filtrar(queryset, exceto=faceta.nome))
+            for faceta in self.facetas
+            if faceta.nome in contadas
+        }
+
+    def contar_no_indice(self, indice, nomes=None, **kwargs):
+        """Mesmas contagens de `contar`, resolvidas pelo índice em memória (search.bitmap)."""
+        return indice.contar(self.selecionadas, self.nomes_contados(nomes), **kwargs)
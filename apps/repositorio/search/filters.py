@@ -0,0 +1,85 @@
+"""
+Filtros que não dependem do modelo consultado.
+
+A listagem de gestão lê Registro, as exportações leem o modelo de leitura
+RegistroDocumento e, sem busca textual, ambas podem ser resolvidas pelo
+índice de facetas em memória (search.bitmap). Os três caminhos usam
+FiltrosGestao, então um filtro novo (ou uma mudança de regra) vale para todos:
+
+    filtros = FiltrosGestao(request.GET)
+    registros = filtros.aplicar(Registro.objects.all())
+    documentos = filtros.aplicar(RegistroDocumento.objects.all(), prefixo='registro__')
+    ids = filtros.consultar_indice(indice, ('-date_create', '-id'))
+
+`prefixo` é o caminho até o Registro para os campos que só existem nele
+(o resumo), como em `anotar_trechos` e `Consulta.condicao`; os demais campos
+têm o mesmo nome nos dois modelos.
+"""
+from django.db.models import Q
+from django.utils.datastructures import MultiValueDict
+
+from apps.repositorio.search import lookups  # noqa: F401  (registra sem_acento/similar)
+from apps.repositorio.search.facets import FACETAS_DOCUMENTO, MotorFacetas
+
+# Filtros por chave estrangeira da listagem de gestão (um valor cada)
+FILTROS_GESTAO = ('status', 'tipo_documento', 'projeto', 'subprojeto')
+
+# Parâmetros que alteram o conjunto filtrado da listagem de gestão
+PARAMETROS_GESTAO = ('q', *FILTROS_GESTAO, 'ativo')
+
+# Colunas das facetas presentes em Registro e em RegistroDocumento
+FACETAS_GESTAO = [faceta for faceta in FACETAS_DOCUMENTO if faceta.nome in FILTROS_GESTAO]
+
+
+class FiltrosGestao:
+    """Busca por título/resumo, filtros por FK e situação ativa/inativa da listagem de gestão."""
+
+    def __init__(self, query_params):
+        if not hasattr(query_params, 'getlist'):
+            # Parâmetros gravados em JSON (exportações em segundo plano): um valor por nome
+            query_params = MultiValueDict({nome: [valor] for nome, valor in query_params.items()})
+        self.busca = query_params.get('q') or ''
+        self.motor = MotorFacetas.from_querydict(query_params, FACETAS_GESTAO)
+        self.ativo = {'1': True, '0': False}.get(query_params.get('ativo'))
+
+    def aplicar(self, queryset, prefixo=''):
+        # Busca por título (tolerante a acentos/erros de digitação) ou resumo
+        if self.busca:
+            queryset = queryset.filter(
+                Q(titulo__similar=self.busca) | Q(**{f'{prefixo}resumo__sem_acento': self.busca})
+            )
+
+        # Status, tipo de documento, projeto e subprojeto
+        queryset = self.motor.filtrar(queryset)
+
+        # Situação ativa/inativa
+        if self.ativo is not None:
+            queryset = queryset.filter(ativo=self.ativo)
+        return queryset
+
+    def consultar_indice(self, indice, ordenacao):
+        """Ids filtrados pelo índice de facetas; None com busca textual, que fica no banco."""
+        if self.busca:
+            return None
+        return indice.consultar(self.motor.selecionadas, ordenacao, publicos=False, ativo=self.ativo)
+
+
+def normalizar_categoria(categoria):
+    """Nome do tipo de documento a partir da categoria dos cards (sem o 's' do plural simples)."""
+    norm = categoria.strip()
+    if len(norm) > 1 and (norm.endswith('s') or norm.endswith('S')):
+        norm = norm[:-1]
+    return norm
+
+
+def filtrar_nome_tipo_documento(queryset, tipo_documento=None, categoria=None, campo='tipo_documento_nome'):
+    """
+    Filtros da busca pública pelo nome do tipo de documento: `tipo_documento`
+    textual (o numérico é tratado pela faceta) e `categoria` dos cards.
+    Acentos e caixa são ignorados pelo lookup `sem_acento` (índice de trigramas).
+    """
+    if tipo_documento and not str(tipo_documento).isdigit():
+        queryset = queryset.filter(**{f'{campo}__sem_acento': tipo_documento})
+    if categoria:
+        queryset = queryset.filter(**{f'{campo}__sem_acento': normalizar_categoria(categoria)})
+    return queryset
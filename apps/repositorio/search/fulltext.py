@@ -0,0 +1,143 @@
+"""
+Busca full-text dos Registros.
+
+Em PostgreSQL a busca usa a coluna `Registro.search_vector` (tsvector com
+configuração 'portuguese', indexada por GIN) e ordena pelo SearchRank.
+Em outros bancos (ex.: SQLite dos testes) cai para uma busca por substring
+insensível a acentos (lookup `sem_acento`).
+"""
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+
+from apps.repositorio.models.repositorio import Autor, Registro, Tag, TextoArquivo
+from apps.repositorio.search import lookups  # noqa: F401  (registra sem_acento/similar)
+
+# Configuração de idioma do PostgreSQL (stemming e stopwords em português)
+CONFIGURACAO_BUSCA = 'portuguese'
+
+# Tamanho dos lotes usados na reconstrução completa do índice
+TAMANHO_LOTE = 500
+
+
+def is_postgresql(using='default'):
+    """Indica se o banco informado suporta os recursos de busca do PostgreSQL."""
+    return connections[using].vendor == 'postgresql'
+
+
+def _nomes_relacionados(model, related_name):
+    """Subquery que concatena os nomes de autores/tags de cada registro."""
+    return Subquery(
+        model.objects.filter(**{related_name: OuterRef('pk')})
+        .values(related_name)
+        .annotate(nomes=StringAgg('nome', delimiter=' '))
+        .values('nomes')[:1]
+    )
+
+
+def build_search_vector():
+    """
+    Monta a expressão do documento de busca com pesos:
+    A = título, B = autores e palavras-chave, C = resumo, D = texto extraído
+    do arquivo (TextoArquivo).
+    """
+    autores = Coalesce(_nomes_relacionados(Autor, 'autores'), Value(''), output_field=TextField())
+    tags = Coalesce(_nomes_relacionados(Tag, 'tags'), Value(''), output_field=TextField())
+    resumo = Coalesce('resumo', Value(''), output_field=TextField())
+    texto = Coalesce(
+        Subquery(TextoArquivo.objects.filter(registro=OuterRef('pk')).values('texto')[:1]),
+        Value(''),
+        output_field=TextField(),
+    )
+
+    return (
+        SearchVector('titulo', weight='A', config=CONFIGURACAO_BUSCA)
+        + SearchVector(autores, weight='B', config=CONFIGURACAO_BUSCA)
+        + SearchVector(tags, weight='B', config=CONFIGURACAO_BUSCA)
+        + SearchVector(resumo, weight='C', config=CONFIGURACAO_BUSCA)
+        + SearchVector(texto, weight='D', config=CONFIGURACAO_BUSCA)
+    )
+
+
+def atualizar_search_vector(registro_ids):
+    """
+    Recalcula o `search_vector` dos registros informados com um único UPDATE.
+    Não faz nada fora do PostgreSQL.
+    """
+    registro_ids = [pk for pk in registro_ids if pk]
+    if not registro_ids or not is_postgresql(Registro.objects.db):
+        return 0
+
+    return Registro.objects.filter(pk__in=registro_ids).update(search_vector=build_search_vector())
+
+
+def reconstruir_search_vector():
+    """Recalcula o documento de busca de todos os registros, em lotes."""
+    ids = list(Registro.objects.order_by('pk').values_list('pk', flat=True))
+    total = 0
+    for inicio in range(0, len(ids), TAMANHO_LOTE):
+        total += atualizar_search_vector(ids[inicio:inicio + TAMANHO_LOTE])
+    return total
+
+
+def condicao_textual(termo, using='default', prefixo='', search_type='websearch'):
+    """
+    Condição (Q) da busca textual de `termo`, usada por `aplicar_busca_textual`
+    e por cada termo livre da sintaxe avançada (search.query_syntax).
+    `search_type='phrase'` exige as palavras em sequência no full-text.
+    """
+    if is_postgresql(using):
+        consulta = SearchQuery(termo, config=CONFIGURACAO_BUSCA, search_type=search_type)
+        autores = Registro.autores.through.objects.filter(autor__nome__similar=termo).values('registro_id')
+        tags = Registro.tags.through.objects.filter(tag__nome__similar=termo).values('registro_id')
+        return (
+            Q(**{f'{prefixo}search_vector': consulta}) |
+            Q(**{f'{prefixo}titulo__similar': termo}) |
+            Q(**{f'{prefixo}pk__in': autores}) |
+            Q(**{f'{prefixo}pk__in': tags})
+        )
+
+    autores = Registro.autores.through.objects.filter(autor__nome__sem_acento=termo).values('registro_id')
+    tags = Registro.tags.through.objects.filter(tag__nome__sem_acento=termo).values('registro_id')
+    textos = TextoArquivo.objects.filter(texto__sem_acento=termo).values('registro_id')
+    return (
+        Q(**{f'{prefixo}titulo__sem_acento': termo}) |
+        Q(**{f'{prefixo}resumo__sem_acento': termo}) |
+        Q(**{f'{prefixo}pk__in': autores}) |
+        Q(**{f'{prefixo}pk__in': tags}) |
+        Q(**{f'{prefixo}pk__in': textos})
+    )
+
+
+def anotar_relevancia(queryset, termo, prefixo=''):
+    """Anota `rank` (SearchRank do termo) para ordenação por relevância. Só no PostgreSQL."""
+    if not termo or not is_postgresql(queryset.db):
+        return queryset
+    consulta = SearchQuery(termo, config=CONFIGURACAO_BUSCA, search_type='websearch')
+    return queryset.annotate(rank=SearchRank(F(f'{prefixo}search_vector'), consulta))
+
+
+def aplicar_busca_textual(queryset, termo, anotar_rank=True, prefixo=''):
+    """
+    Filtra o queryset pelo termo de busca.
+
+    No PostgreSQL, combina o full-text (search_vector) com a similaridade de
+    trigramas em título, autores e tags (tolerância a acentos e erros de
+    digitação) e anota `rank` (SearchRank) para ordenação por relevância.
+    As relações M2M são consultadas por subquery, evitando joins que duplicam
+    linhas e exigem `distinct()`. Com `anotar_rank=False` apenas filtra (ex.:
+    querysets usados em agregações, como as contagens de facetas).
+
+    `prefixo` é o caminho até o Registro quando o queryset é de outro modelo
+    (ex.: 'registro__' para RegistroDocumento).
+    """
+    termo = (termo or '').strip()
+    if not termo:
+        return queryset
+
+    queryset = queryset.filter(condicao_textual(termo, queryset.db, prefixo))
+    if anotar_rank:
+        queryset = anotar_relevancia(queryset, termo, prefixo)
+    return queryset
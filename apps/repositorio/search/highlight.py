@@ -0,0 +1,145 @@
+"""
+Trechos destacados dos resultados da busca textual.
+
+No PostgreSQL, os trechos de título, resumo e texto extraído do arquivo
+(TextoArquivo) são anotados com `ts_headline` no próprio queryset da busca.
+Expressões caras da lista do SELECT são avaliadas pelo PostgreSQL depois do
+ORDER BY/LIMIT, então só as linhas da página exibida são processadas, na
+mesma consulta que as busca.
+
+O `ts_headline` não escapa HTML: os termos vêm entre caracteres de controle,
+trocados por <mark> depois de o trecho ser escapado (`destacar_resultados`).
+
+Em outros bancos (ex.: SQLite dos testes), resumo e texto vêm na mesma
+consulta e o trecho é recortado em Python ao redor dos termos, ignorando
+acentos e caixa.
+"""
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery
+from django.db.models import F, OuterRef, Subquery
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from apps.repositorio.models.repositorio import TextoArquivo
+from apps.repositorio.search.fulltext import CONFIGURACAO_BUSCA, is_postgresql
+
+# Marcadores dos termos encontrados (caracteres de controle não ocorrem nos textos indexados)
+INICIO = '\x02'
+FIM = '\x03'
+
+# Tamanho aproximado dos trechos (em palavras no PostgreSQL e em caracteres no recorte em Python)
+PALAVRAS_TRECHO = 30
+CARACTERES_TRECHO = 240
+
+SEPARADOR_FRAGMENTOS = ' … '
+
+
+def _texto_arquivo(prefixo):
+    return Subquery(TextoArquivo.objects.filter(registro=OuterRef(f'{prefixo}pk')).values('texto')[:1])
+
+
+def anotar_trechos(queryset, termo, prefixo=''):
+    """
+    Anota `trecho_titulo`, `trecho_resumo` e `trecho_texto` no queryset.
+    `prefixo` é o caminho até o Registro (ex.: 'registro__' para RegistroDocumento).
+    """
+    termo = (termo or '').strip()
+    if not termo:
+        return queryset
+
+    if not is_postgresql(queryset.db):
+        return queryset.annotate(trecho_resumo=F(f'{prefixo}resumo'), trecho_texto=_texto_arquivo(prefixo))
+
+    consulta = SearchQuery(termo, config=CONFIGURACAO_BUSCA, search_type='websearch')
+    opcoes = {'config': CONFIGURACAO_BUSCA, 'start_sel': INICIO, 'stop_sel': FIM}
+    fragmentos = {
+        'max_words': PALAVRAS_TRECHO,
+        'min_words': PALAVRAS_TRECHO // 2,
+        'max_fragments': 2,
+        'fragment_delimiter': SEPARADOR_FRAGMENTOS,
+    }
+    return queryset.annotate(
+        trecho_titulo=SearchHeadline(f'{prefixo}titulo', consulta, highlight_all=True, **opcoes),
+        trecho_resumo=SearchHeadline(f'{prefixo}resumo', consulta, **opcoes, **fragmentos),
+        trecho_texto=SearchHeadline(_texto_arquivo(prefixo), consulta, **opcoes, **fragmentos),
+    )
+
+
+def _sem_acento(texto):
+    # Um caractere por caractere do original, para que as posições coincidam
+    return ''.join(unicodedata.normalize('NFD', c)[:1].lower()[:1] for c in texto)
+
+
+def _termos(termo):
+    palavras = {_sem_acento(palavra) for palavra in re.findall(r'\w+', termo or '') if len(palavra) > 1}
+    return sorted(palavras, key=len, reverse=True)
+
+
+def _padrao(termo):
+    termos = _termos(termo)
+    return re.compile('|'.join(re.escape(t) for t in termos)) if termos else None
+
+
+def marcar_termos(texto, termo):
+    """Texto com as ocorrências dos termos entre os marcadores. Vazio se nenhum termo ocorre."""
+    padrao = _padrao(termo)
+    if not texto or padrao is None:
+        return ''
+    partes = []
+    posicao = 0
+    for ocorrencia in padrao.finditer(_sem_acento(texto)):
+        partes += [texto[posicao:ocorrencia.start()], INICIO, texto[ocorrencia.start():ocorrencia.end()], FIM]
+        posicao = ocorrencia.end()
+    if not partes:
+        return ''
+    partes.append(texto[posicao:])
+    return ''.join(partes)
+
+
+def recortar_trecho(texto, termo, tamanho=CARACTERES_TRECHO):
+    """Trecho de `texto` ao redor da primeira ocorrência dos termos, marcadas. Vazio se nenhum ocorre."""
+    padrao = _padrao(termo)
+    encontrado = padrao.search(_sem_acento(texto)) if texto and padrao else None
+    if encontrado is None:
+        return ''
+
+    inicio = max(encontrado.start() - tamanho // 3, 0)
+    if inicio:
+        # Começa numa palavra inteira
+        espaco = texto.find(' ', inicio, encontrado.start())
+        inicio = espaco + 1 if espaco != -1 else inicio
+    fim = min(inicio + tamanho, len(texto))
+    trecho = marcar_termos(texto[inicio:fim], termo).strip()
+    return ('…' if inicio else '') + trecho + ('…' if fim < len(texto) else '')
+
+
+def _html(trecho):
+    """Escapa o trecho e troca os marcadores por <mark>."""
+    return mark_safe(escape(trecho).replace(INICIO, '<mark>').replace(FIM, '</mark>'))
+
+
+def destacar_resultados(objetos, termo):
+    """
+    Define `titulo_destacado` e `trecho` (HTML seguro) nos objetos da página,
+    a partir das anotações de `anotar_trechos`. O trecho é o do resumo ou, se
+    o termo não estiver nele, o do texto do arquivo.
+    """
+    for obj in objetos:
+        if not hasattr(obj, 'trecho_resumo'):
+            continue
+        no_banco = hasattr(obj, 'trecho_titulo')
+        titulo = obj.trecho_titulo if no_banco else marcar_termos(obj.titulo, termo)
+        obj.titulo_destacado = _html(titulo or obj.titulo)
+
+        trecho = ''
+        for campo in ('trecho_resumo', 'trecho_texto'):
+            valor = getattr(obj, campo) or ''
+            if not no_banco:
+                valor = recortar_trecho(valor, termo)
+            if INICIO in valor:
+                trecho = valor
+                break
+        obj.trecho = _html(trecho) if trecho else ''
+    return objetos
@@ -0,0 +1,89 @@
+"""
+Lookups de texto insensíveis a acentos e tolerantes a erros de digitação.
+
+    Registro.objects.filter(titulo__sem_acento='relatorio')   # 'Relatório'
+    Autor.objects.filter(nome__similar='Amazonia')             # 'Amazônia', 'Amazonas'...
+    Autor.objects.filter(nome__prefixo_sem_acento='joao')     # 'João Silva'
+
+Todos comparam `lower(f_unaccent(campo))`, a mesma expressão dos índices GIN
+(gin_trgm_ops) criados nas migrations 0007 e 0018 e dos índices B-tree de prefixo
+(text_pattern_ops) da migration 0009, então o PostgreSQL resolve as buscas
+pelos índices. `f_unaccent` é um wrapper IMMUTABLE de `unaccent`
+(requisito para uso em índices); no SQLite a função é registrada em Python.
+"""
+import unicodedata
+
+from django.db import models
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def remover_acentos(valor):
+    """Remove acentos/diacríticos (equivalente ao unaccent do PostgreSQL)."""
+    if valor is None:
+        return None
+    decomposto = unicodedata.normalize('NFKD', str(valor))
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+@receiver(connection_created, dispatch_uid='repositorio_sqlite_f_unaccent')
+def registrar_funcoes_sqlite(sender, connection, **kwargs):
+    """Disponibiliza `f_unaccent` em conexões SQLite (usado nos testes)."""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('f_unaccent', 1, remover_acentos, deterministic=True)
+
+
+class SemAcento(models.Lookup):
+    """`contains` sem diferenciar maiúsculas nem acentos."""
+    lookup_name = 'sem_acento'
+
+    def get_db_prep_lookup(self, value, connection):
+        padrao = f'%{connection.ops.prep_for_like_query(value)}%'
+        return '%s', [padrao]
+
+    def _padrao_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        lhs = f'LOWER(f_unaccent({lhs_sql}))'
+        rhs = f'LOWER(f_unaccent({rhs_sql}))'
+        return lhs, rhs, lhs_params, rhs_params
+
+    def as_sql(self, compiler, connection):
+        lhs, rhs, lhs_params, rhs_params = self._padrao_sql(compiler, connection)
+        return f"{lhs} LIKE {rhs} ESCAPE '\\'", lhs_params + rhs_params
+
+
+class PrefixoSemAcento(SemAcento):
+    """`startswith` sem diferenciar maiúsculas nem acentos (usado pelo autocomplete)."""
+    lookup_name = 'prefixo_sem_acento'
+
+    def get_db_prep_lookup(self, value, connection):
+        padrao = f'{connection.ops.prep_for_like_query(value)}%'
+        return '%s', [padrao]
+
+
+class Similar(SemAcento):
+    """
+    `sem_acento` ou similaridade de trigramas por palavra (operador `<%` do
+    pg_trgm), que tolera erros de digitação. Fora do PostgreSQL equivale a
+    `sem_acento`.
+    """
+    lookup_name = 'similar'
+
+    def as_postgresql(self, compiler, connection):
+        lhs, rhs, lhs_params, rhs_params = self._padrao_sql(compiler, connection)
+        sql = f"{lhs} LIKE {rhs} ESCAPE '\\'"
+        params = lhs_params + rhs_params
+        if self.rhs_is_direct_value():
+            # `%` literal escapado por causa da interpolação de parâmetros
+            sql = f"({sql} OR LOWER(f_unaccent(%s)) <%% {lhs})"
+            params = params + [str(self.rhs)] + lhs_params
+        return sql, params
+
+
+models.CharField.register_lookup(SemAcento)
+models.TextField.register_lookup(SemAcento)
+models.CharField.register_lookup(PrefixoSemAcento)
+models.TextField.register_lookup(PrefixoSemAcento)
+models.CharField.register_lookup(Similar)
+models.TextField.register_lookup(Similar)
@@ -0,0 +1,379 @@
+"""
+Paginação por cursor (keyset) para as listagens.
+
+Em vez de `OFFSET n` + `COUNT(*)` a cada página, a próxima página é buscada a
+partir dos valores de ordenação do último item exibido
+(`WHERE (data, titulo, id) < (...)`), então o custo não cresce com a
+profundidade da página.
+
+O cursor é um token opaco e assinado, transportado no próprio parâmetro
+`page`. Assim os links de anterior/próxima dos templates
+(`?page={{ page_obj.next_page_number }}`) funcionam sem alteração. Com o
+cursor ativo (`paginacao_cursor` no contexto) os templates não mostram o
+total, os números de página nem o link da última página. Números de página
+(`?page=3`) continuam aceitos e são resolvidos por fatiamento, sem
+`COUNT(*)`. O total só é calculado se algum template usar
+`paginator.count`/`num_pages`, e viaja no token para as páginas seguintes.
+"""
+import datetime
+import math
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import InvalidPage
+from django.db.models import F, Q, QuerySet
+from django.db.models.expressions import OrderBy
+from django.http import Http404
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import cached_property
+
+SALT_CURSOR = 'repositorio.paginacao.cursor'
+
+
+class CursorInvalido(InvalidPage):
+    pass
+
+
+def _serializar(valor):
+    if isinstance(valor, datetime.datetime):
+        return {'dt': valor.isoformat()}
+    if isinstance(valor, datetime.date):
+        return {'d': valor.isoformat()}
+    return valor
+
+
+def _desserializar(valor):
+    if isinstance(valor, dict):
+        if 'dt' in valor:
+            return parse_datetime(valor['dt'])
+        if 'd' in valor:
+            return parse_date(valor['d'])
+    return valor
+
+
+def _valor_do_objeto(obj, campo):
+    """Lê o valor de ordenação de um objeto, seguindo relações (`projeto__nome`)."""
+    valor = obj
+    for parte in campo.split('__'):
+        if valor is None:
+            return None
+        valor = getattr(valor, parte)
+    return valor
+
+
+def _campo_anulavel(model, campo):
+    """Indica se o caminho de ordenação pode conter NULL."""
+    meta = model._meta
+    partes = campo.split('__')
+    for indice, parte in enumerate(partes):
+        if parte == 'pk':
+            return False
+        try:
+            field = meta.get_field(parte)
+        except FieldDoesNotExist:
+            return False  # anotação (ex.: rank da busca full-text)
+        if field.null:
+            return True
+        if indice < len(partes) - 1:
+            if not field.is_relation:
+                return False
+            meta = field.related_model._meta
+    return False
+
+
+def ordem_nulos_por_ultimo(ordenacao, reverso=False):
+    """
+    Expressões de `order_by` para campos no formato do Django ('-data', 'titulo')
+    com NULLs por último (ou primeiro, quando percorrida ao contrário). É a
+    regra da paginação por cursor e do índice de facetas; as consultas
+    ordenadas no banco usam a mesma para não depender do padrão de cada banco
+    (o PostgreSQL põe NULLs primeiro em DESC, o SQLite em ASC).
+    """
+    nulos = {'nulls_first': True} if reverso else {'nulls_last': True}
+    expressoes = []
+    for campo in ordenacao:
+        desc = campo.startswith('-')
+        if desc != reverso:
+            expressoes.append(F(campo.lstrip('-')).desc(**nulos))
+        else:
+            expressoes.append(F(campo.lstrip('-')).asc(**nulos))
+    return expressoes
+
+
+def _campos_ordenacao(ordem):
+    """
+    Campos ('-data', 'titulo') de uma ordenação feita só com nomes ou com
+    `ordem_nulos_por_ultimo`; None para expressões ou ordem aleatória.
+    """
+    campos = []
+    for item in ordem:
+        if isinstance(item, OrderBy) and isinstance(item.expression, F):
+            campos.append(('-' if item.descending else '') + item.expression.name)
+        elif isinstance(item, str) and item.lstrip('-') != '?':
+            campos.append(item)
+        else:
+            return None
+    return campos
+
+
+class KeysetPage:
+    """Página de resultados com interface compatível com `django.core.paginator.Page`."""
+
+    def __init__(self, object_list, paginator, number, anterior=None, proximo=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.number = number
+        self._anterior = anterior
+        self._proximo = proximo
+
+    def __repr__(self):
+        return f'<KeysetPage {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._proximo is not None
+
+    def has_previous(self):
+        return self._anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        if self._proximo is None:
+            raise InvalidPage('Não há próxima página.')
+        return self.paginator.gerar_cursor(self._proximo, 'n', self.number + 1)
+
+    def previous_page_number(self):
+        if self._anterior is None:
+            raise InvalidPage('Não há página anterior.')
+        if self.number - 1 <= 1:
+            return 1
+        return self.paginator.gerar_cursor(self._anterior, 'p', self.number - 1)
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor sobre a ordenação ativa do queryset, completada com
+    `pk` como desempate. NULLs são sempre ordenados por último, em qualquer
+    banco, para que o cursor seja determinístico.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordenacao = self._ordenacao_ativa(queryset)
+        self._total = None
+
+    @property
+    def suportado(self):
+        return self.ordenacao is not None
+
+    @staticmethod
+    def _ordenacao_ativa(queryset):
+        ordem = _campos_ordenacao(queryset.query.order_by or queryset.model._meta.ordering or [])
+        if ordem is None:
+            return None  # expressões/aleatório: usa a paginação tradicional
+
+        nomes = [campo.lstrip('-') for campo in ordem]
+        if 'pk' not in nomes and 'id' not in nomes:
+            ordem.append('pk')
+        return [(campo.lstrip('-'), campo.startswith('-')) for campo in ordem]
+
+    def _expressoes_ordem(self, reverso=False):
+        """Ordenação com NULLs por último (ou primeiro, quando percorrida ao contrário)."""
+        return ordem_nulos_por_ultimo(self.assinatura.split(','), reverso)
+
+    @property
+    def assinatura(self):
+        return ','.join(('-' if desc else '') + campo for campo, desc in self.ordenacao)
+
+    # ------------------------------------------------------------------
+    # Total (calculado apenas se o template pedir)
+    # ------------------------------------------------------------------
+    @cached_property
+    def count(self):
+        if self._total is None:
+            self._total = self.queryset.count()
+        return self._total
+
+    @property
+    def num_pages(self):
+        if self.count == 0:
+            return 1
+        return math.ceil(self.count / self.per_page)
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    # ------------------------------------------------------------------
+    # Cursores
+    # ------------------------------------------------------------------
+    def gerar_cursor(self, obj, direcao, numero):
+        payload = {
+            'o': self.assinatura,
+            'd': direcao,
+            'n': numero,
+            'v': [_serializar(_valor_do_objeto(obj, campo)) for campo, _ in self.ordenacao],
+        }
+        if self._total is not None:
+            payload['t'] = self._total
+        return signing.dumps(payload, salt=SALT_CURSOR, compress=True)
+
+    def _ler_cursor(self, token):
+        try:
+            payload = signing.loads(token, salt=SALT_CURSOR)
+        except signing.BadSignature:
+            raise CursorInvalido('Cursor de paginação inválido.')
+
+        if payload.get('o') != self.assinatura or len(payload.get('v', [])) != len(self.ordenacao):
+            raise CursorInvalido('Cursor de paginação não corresponde à ordenação atual.')
+
+        if payload.get('t') is not None:
+            self._total = payload['t']
+        valores = [_desserializar(valor) for valor in payload['v']]
+        return payload.get('d'), max(int(payload.get('n', 1)), 1), valores
+
+    def _condicao(self, valores, antes):
+        """
+        Monta `(c1, c2, ...) > (v1, v2, ...)` respeitando a direção de cada
+        coluna (ou `<` quando `antes=True`), com NULLs ao final.
+        """
+        model = self.queryset.model
+        condicao = Q(pk__in=[])
+        igualdade = Q()
+
+        for (campo, desc), valor in zip(self.ordenacao, valores):
+            anulavel = _campo_anulavel(model, campo)
+            if antes:
+                if valor is None:
+                    termo = Q(**{f'{campo}__isnull': False})
+                else:
+                    termo = Q(**{f'{campo}__gt' if desc else f'{campo}__lt': valor})
+            else:
+                if valor is None:
+                    termo = None  # nada vem depois de NULL nesta coluna
+                else:
+                    termo = Q(**{f'{campo}__lt' if desc else f'{campo}__gt': valor})
+                    if anulavel:
+                        termo |= Q(**{f'{campo}__isnull': True})
+
+            if termo is not None:
+                condicao |= igualdade & termo
+
+            if valor is None:
+                igualdade &= Q(**{f'{campo}__isnull': True})
+            else:
+                igualdade &= Q(**{campo: valor})
+
+        return condicao
+
+    # ------------------------------------------------------------------
+    # Páginas
+    # ------------------------------------------------------------------
+    def page(self, valor):
+        valor = str(valor or '1').strip()
+        if valor.isdigit():
+            return self._pagina_por_numero(int(valor))
+
+        direcao, numero, valores = self._ler_cursor(valor)
+        if direcao == 'p':
+            linhas = list(
+                self.queryset.filter(self._condicao(valores, antes=True))
+                .order_by(*self._expressoes_ordem(reverso=True))[:self.per_page + 1]
+            )
+            tem_anterior = len(linhas) > self.per_page
+            linhas = list(reversed(linhas[:self.per_page]))
+            return KeysetPage(
+                linhas, self, numero,
+                anterior=linhas[0] if tem_anterior and linhas else None,
+                proximo=linhas[-1] if linhas else None,
+            )
+
+        linhas = list(
+            self.queryset.filter(self._condicao(valores, antes=False))
+            .order_by(*self._expressoes_ordem())[:self.per_page + 1]
+        )
+        tem_proxima = len(linhas) > self.per_page
+        linhas = linhas[:self.per_page]
+        return KeysetPage(
+            linhas, self, numero,
+            anterior=linhas[0] if linhas else None,
+            proximo=linhas[-1] if tem_proxima else None,
+        )
+
+    def _pagina_por_numero(self, numero):
+        """Acesso direto a uma página numerada (ex.: links `?page=3`), sem COUNT."""
+        if numero < 1:
+            raise CursorInvalido('Número de página inválido.')
+        inicio = (numero - 1) * self.per_page
+        linhas = list(self.queryset.order_by(*self._expressoes_ordem())[inicio:inicio + self.per_page + 1])
+        if not linhas and numero > 1:
+            raise CursorInvalido('Página sem resultados.')
+        tem_proxima = len(linhas) > self.per_page
+        linhas = linhas[:self.per_page]
+        return KeysetPage(
+            linhas, self, numero,
+            anterior=linhas[0] if numero > 1 and linhas else None,
+            proximo=linhas[-1] if tem_proxima else None,
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin para ListView que ativa a paginação por cursor.
+
+    Opt-in: `keyset_pagination = True` na view ou, quando o atributo não é
+    definido, o setting `REPOSITORIO_PAGINACAO_CURSOR`.
+
+    O contexto recebe `paginacao_cursor`: quando verdadeiro, os templates
+    mostram só os links de anterior/próxima, sem total nem número de páginas
+    (que custariam um COUNT a cada página).
+    """
+    keyset_pagination = None
+    paginacao_cursor = False
+
+    def usar_paginacao_cursor(self):
+        if self.keyset_pagination is not None:
+            return self.keyset_pagination
+        return getattr(settings, 'REPOSITORIO_PAGINACAO_CURSOR', False)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.usar_paginacao_cursor() or not isinstance(queryset, QuerySet):
+            # Sequências já ordenadas (ex.: ids do índice de facetas) fatiam direto
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size)
+        if not paginator.suportado:
+            return super().paginate_queryset(queryset, page_size)
+
+        valor = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg)
+        try:
+            page = paginator.page(valor)
+        except InvalidPage as e:
+            raise Http404(f'Página inválida: {e}')
+        self.paginacao_cursor = True
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['paginacao_cursor'] = self.paginacao_cursor
+        return context
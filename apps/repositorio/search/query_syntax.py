@@ -0,0 +1,313 @@
+"""
+Sintaxe avançada da busca pública (campo `q`).
+
+    autor:"Silva" tag:anfíbios ano:2019..2022 -relatório
+    (caverna OR gruta) titulo:fauna "lista de espécies"
+
+- `campo:valor` ou `campo:"valor com espaços"`: autor, tag, titulo, tipo,
+  projeto, subprojeto, area e ano (`2019`, `2019..2022`, `2019..`, `..2022`);
+- `"frase"`: palavras em sequência;
+- `-termo`, `-campo:valor`, `-(...)`: exclusão;
+- `OR` (em qualquer caixa, ou `|`) entre termos e parênteses para agrupar; o padrão é E.
+
+A consulta é compilada numa única condição (Q) sobre o modelo de leitura
+(RegistroDocumento): termos livres usam a mesma condição da busca simples
+(search_vector/trigramas), autores e tags vão pelas tabelas intermediárias
+(subquery), tipo, projeto, subprojeto e área pelas colunas de id do documento
+e o ano pela coluna `ano`, todas indexadas. Consultas acima dos limites de
+tamanho, termos e aninhamento são recusadas com `ConsultaInvalida`.
+"""
+import re
+
+from django.db.models import Q
+
+from apps.repositorio.models.repositorio import AreaTematica, Projeto, Registro, Subprojeto, TipoDocumento
+from apps.repositorio.search.fulltext import condicao_textual
+from apps.repositorio.search.lookups import remover_acentos
+
+# Limites de custo das consultas
+MAX_CARACTERES = 300
+MAX_TERMOS = 12
+MAX_PROFUNDIDADE = 4
+# Valores de campo mais curtos que isso percorreriam o índice de trigramas inteiro
+MIN_CARACTERES_VALOR = 2
+
+ANO_MINIMO = 1000
+ANO_MAXIMO = 2999
+
+# Nome aceito (sem acentos, minúsculo) -> campo
+CAMPOS = {
+    'autor': 'autor', 'autores': 'autor',
+    'tag': 'tag', 'tags': 'tag', 'palavra-chave': 'tag',
+    'titulo': 'titulo',
+    'tipo': 'tipo',
+    'projeto': 'projeto',
+    'subprojeto': 'subprojeto',
+    'area': 'area',
+    'ano': 'ano',
+}
+
+# Campos resolvidos pelo nome na tabela auxiliar e filtrados pela coluna de id do documento
+CAMPOS_AUXILIARES = {
+    'tipo': (TipoDocumento, 'tipo_documento_id'),
+    'projeto': (Projeto, 'projeto_id'),
+    'subprojeto': (Subprojeto, 'subprojeto_id'),
+    'area': (AreaTematica, 'area_tematica_id'),
+}
+
+_TOKENS = re.compile(r'''
+    (?P<espaco>\s+)
+  | (?P<abre>\()
+  | (?P<fecha>\))
+  | (?P<ou>\|)
+  | (?P<menos>-(?=[^\s)]))
+  | (?P<campo>[\w-]+):(?=[^\s)])
+  | "(?P<frase>[^"]*)"?
+  | (?P<palavra>[^\s()"]+)
+''', re.VERBOSE)
+
+_PALAVRA = re.compile(r'(?P<palavra>[^\s()"]+)')
+
+_ANO = re.compile(r'^(\d{4})?(?:(\.\.)(\d{4})?)?$')
+
+
+class ConsultaInvalida(ValueError):
+    """Consulta fora dos limites ou com valor inválido (mensagem exibível ao usuário)."""
+
+
+class Termo:
+    """Termo livre ou frase, buscado como na busca simples."""
+
+    def __init__(self, texto, frase=False):
+        self.texto = texto
+        self.frase = frase
+
+    def condicao(self, using, prefixo):
+        search_type = 'phrase' if self.frase else 'websearch'
+        return condicao_textual(self.texto, using, prefixo, search_type=search_type)
+
+    def texto_livre(self):
+        return f'"{self.texto}"' if self.frase else self.texto
+
+
+class Campo:
+    """Filtro `campo:valor` sobre colunas indexadas."""
+
+    def __init__(self, campo, valor):
+        self.campo = campo
+        self.valor = valor
+        if campo == 'ano':
+            self.intervalo = _intervalo_anos(valor)
+        elif len(valor) < MIN_CARACTERES_VALOR:
+            raise ConsultaInvalida(f'O valor de "{campo}:" precisa ter ao menos {MIN_CARACTERES_VALOR} caracteres.')
+
+    def condicao(self, using, prefixo):
+        if self.campo == 'ano':
+            inicio, fim = self.intervalo
+            filtros = {}
+            if inicio is not None:
+                filtros['ano__gte'] = inicio
+            if fim is not None:
+                filtros['ano__lte'] = fim
+            return Q(**filtros)
+        if self.campo == 'autor':
+            ids = Registro.autores.through.objects.filter(autor__nome__sem_acento=self.valor).values('registro_id')
+            return Q(pk__in=ids)
+        if self.campo == 'tag':
+            ids = Registro.tags.through.objects.filter(tag__nome__sem_acento=self.valor).values('registro_id')
+            return Q(pk__in=ids)
+        if self.campo == 'titulo':
+            return Q(**{f'{prefixo}titulo__sem_acento': self.valor})
+        model, coluna = CAMPOS_AUXILIARES[self.campo]
+        return Q(**{f'{coluna}__in': model.objects.filter(nome__sem_acento=self.valor).values('pk')})
+
+    def texto_livre(self):
+        return ''
+
+
+class Negacao:
+    def __init__(self, no):
+        self.no = no
+
+    def condicao(self, using, prefixo):
+        return ~self.no.condicao(using, prefixo)
+
+    def texto_livre(self):
+        return ''
+
+
+class Grupo:
+    """Nós combinados com E (`ou=False`) ou OU."""
+
+    def __init__(self, nos, ou=False):
+        self.nos = nos
+        self.ou = ou
+
+    def condicao(self, using, prefixo):
+        condicao = None
+        for no in self.nos:
+            atual = no.condicao(using, prefixo)
+            if condicao is None:
+                condicao = atual
+            else:
+                condicao = condicao | atual if self.ou else condicao & atual
+        return condicao
+
+    def texto_livre(self):
+        partes = [no.texto_livre() for no in self.nos]
+        return (' or ' if self.ou else ' ').join(parte for parte in partes if parte)
+
+
+def _intervalo_anos(valor):
+    encontrado = _ANO.match(valor)
+    if not encontrado or not (encontrado.group(1) or encontrado.group(3)):
+        raise ConsultaInvalida(f'Ano inválido: "{valor}" (use 2019, 2019..2022, 2019.. ou ..2022).')
+    inicio = int(encontrado.group(1)) if encontrado.group(1) else None
+    fim = int(encontrado.group(3)) if encontrado.group(3) else None
+    if not encontrado.group(2):
+        fim = inicio
+    for ano in (inicio, fim):
+        if ano is not None and not ANO_MINIMO <= ano <= ANO_MAXIMO:
+            raise ConsultaInvalida(f'Ano fora do intervalo aceito: {ano}.')
+    if inicio is not None and fim is not None and inicio > fim:
+        raise ConsultaInvalida(f'Intervalo de anos invertido: "{valor}".')
+    return inicio, fim
+
+
+def _tokenizar(texto):
+    tokens = []
+    posicao = 0
+    while posicao < len(texto):
+        encontrado = _TOKENS.match(texto, posicao)
+        tipo = encontrado.lastgroup
+        if tipo == 'campo':
+            nome = CAMPOS.get(remover_acentos(encontrado.group('campo')).lower())
+            if nome is None:
+                # Não é um campo conhecido (ex.: "http://..."): o texto segue como palavra
+                encontrado = _PALAVRA.match(texto, posicao)
+                tipo = 'palavra'
+            else:
+                tokens.append(('campo', nome))
+        # OR em qualquer caixa (como no websearch do PostgreSQL): o cache de
+        # resultados normaliza `q` para minúsculas
+        if tipo == 'palavra' and encontrado.group(0).upper() == 'OR':
+            tokens.append(('ou', None))
+        elif tipo not in ('espaco', 'campo'):
+            tokens.append((tipo, encontrado.group(tipo) if tipo in ('frase', 'palavra') else None))
+        posicao = encontrado.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.posicao = 0
+        self.termos = 0
+
+    def _proximo(self):
+        return self.tokens[self.posicao] if self.posicao < len(self.tokens) else (None, None)
+
+    def _avancar(self):
+        token = self._proximo()
+        self.posicao += 1
+        return token
+
+    def _contar_termo(self):
+        self.termos += 1
+        if self.termos > MAX_TERMOS:
+            raise ConsultaInvalida(f'A busca aceita no máximo {MAX_TERMOS} termos.')
+
+    def sequencia(self, profundidade=0):
+        """Nós até o fim ou até o `)` do grupo, combinados com E."""
+        nos = []
+        while True:
+            tipo, _ = self._proximo()
+            if tipo is None or (tipo == 'fecha' and profundidade):
+                break
+            if tipo in ('fecha', 'ou'):
+                self._avancar()  # `)` sem par ou OR sem termo à esquerda: ignorado
+                continue
+            no = self.alternativas(profundidade)
+            if no is not None:
+                nos.append(no)
+        return nos[0] if len(nos) == 1 else (Grupo(nos) if nos else None)
+
+    def alternativas(self, profundidade):
+        nos = [self.unario(profundidade)]
+        while self._proximo()[0] == 'ou':
+            self._avancar()
+            if self._proximo()[0] in (None, 'fecha', 'ou'):
+                break
+            nos.append(self.unario(profundidade))
+        nos = [no for no in nos if no is not None]
+        if len(nos) <= 1:
+            return nos[0] if nos else None
+        return Grupo(nos, ou=True)
+
+    def unario(self, profundidade):
+        if self._proximo()[0] == 'menos':
+            self._avancar()
+            no = self.primario(profundidade)
+            return Negacao(no) if no is not None else None
+        return self.primario(profundidade)
+
+    def primario(self, profundidade):
+        tipo, valor = self._avancar()
+        if tipo == 'abre':
+            if profundidade >= MAX_PROFUNDIDADE:
+                raise ConsultaInvalida(f'A busca aceita no máximo {MAX_PROFUNDIDADE} níveis de parênteses.')
+            no = self.sequencia(profundidade + 1)
+            if self._proximo()[0] == 'fecha':
+                self._avancar()
+            return no
+        if tipo == 'campo':
+            tipo_valor, valor_campo = self._avancar()
+            if tipo_valor not in ('palavra', 'frase'):
+                return None
+            self._contar_termo()
+            return Campo(valor, ' '.join(valor_campo.split()))
+        if tipo == 'frase':
+            valor = ' '.join(valor.split())
+            if not valor:
+                return None
+            self._contar_termo()
+            return Termo(valor, frase=' ' in valor)
+        if tipo == 'palavra':
+            # Palavras de um caractere (ex.: artigos) não filtram nada de útil
+            if len(valor) < MIN_CARACTERES_VALOR:
+                return None
+            self._contar_termo()
+            return Termo(valor)
+        return None
+
+
+class ConsultaAvancada:
+    """Consulta analisada: `condicao()` para filtrar e `texto_livre` para relevância/destaques."""
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+
+    @property
+    def vazia(self):
+        return self.raiz is None
+
+    @property
+    def texto_livre(self):
+        """Termos livres positivos, na sintaxe websearch (ordenação por relevância e trechos)."""
+        return self.raiz.texto_livre() if self.raiz is not None else ''
+
+    def condicao(self, using='default', prefixo=''):
+        return self.raiz.condicao(using, prefixo) if self.raiz is not None else Q()
+
+
+def usa_sintaxe_avancada(texto):
+    """Indica se o texto tem algum operador (campo, aspas, exclusão, OU, parênteses)."""
+    return any(tipo not in ('palavra',) for tipo, _ in _tokenizar(texto or ''))
+
+
+def analisar(texto):
+    """Analisa o texto da busca. Levanta `ConsultaInvalida` se exceder os limites."""
+    texto = (texto or '').strip()
+    if len(texto) > MAX_CARACTERES:
+        raise ConsultaInvalida(f'A busca aceita no máximo {MAX_CARACTERES} caracteres.')
+    return ConsultaAvancada(_Parser(_tokenizar(texto)).sequencia())
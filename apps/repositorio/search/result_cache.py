@@ -0,0 +1,106 @@
+"""
+Cache de resultados da busca pública.
+
+Guarda, para cada combinação normalizada de parâmetros, a lista ordenada de
+ids e as contagens das facetas. A chave inclui a versão global do catálogo
+(`search.versioning`), incrementada a cada alteração de Registro, Autor, Tag
+ou tabela auxiliar; entradas de versões antigas deixam de ser lidas e expiram
+pelo timeout. Num acerto, a view busca no banco apenas as linhas da página.
+
+Acertos e falhas são contados no próprio cache (compartilhado entre workers
+quando o backend é Redis/Memcached) e expostos por `estatisticas()`.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.repositorio.search.facets import FACETAS_DOCUMENTO
+from apps.repositorio.search.versioning import versao_catalogo
+
+PREFIXO_CHAVE = 'repositorio:busca'
+CHAVE_ACERTOS = f'{PREFIXO_CHAVE}:acertos'
+CHAVE_FALHAS = f'{PREFIXO_CHAVE}:falhas'
+
+# Únicos parâmetros que entram na chave (os lidos pela busca pública). Outros
+# (página, utm_*, parâmetros arbitrários) não alteram o resultado e não podem
+# criar entradas novas no cache.
+FACETAS = {faceta.nome for faceta in FACETAS_DOCUMENTO}
+PARAMETROS_RESULTADO = {'q', 'categoria', 'ordenar_por'} | FACETAS
+# Facetas que aceitam valores não numéricos (tipo de documento pelo nome)
+FACETAS_TEXTUAIS = {'tipo_documento'}
+
+
+def cache_habilitado():
+    return getattr(settings, 'REPOSITORIO_CACHE_BUSCA', False)
+
+
+def normalizar_parametros(querydict, ordenacoes=None):
+    """
+    Forma canônica dos parâmetros: apenas os de PARAMETROS_RESULTADO, sem
+    valores vazios ou que a busca descartaria (ids não numéricos, ordenação
+    fora de `ordenacoes`), chaves e valores ordenados e termo de busca sem
+    diferença de caixa/espaços.
+    """
+    normalizados = {}
+    for chave in sorted(querydict.keys()):
+        if chave not in PARAMETROS_RESULTADO:
+            continue
+        valores = [' '.join(str(valor).split()) for valor in querydict.getlist(chave)]
+        if chave == 'q':
+            valores = [valor.lower() for valor in valores]
+        elif chave in FACETAS and chave not in FACETAS_TEXTUAIS:
+            valores = [valor for valor in valores if valor.isdigit()]
+        elif chave == 'ordenar_por' and ordenacoes is not None:
+            valores = [valor for valor in valores if valor in ordenacoes]
+        valores = sorted({valor for valor in valores if valor})
+        if valores:
+            normalizados[chave] = valores
+    return normalizados
+
+
+def chave_resultado(parametros, versao=None):
+    versao = versao_catalogo() if versao is None else versao
+    assinatura = hashlib.sha1(json.dumps(parametros, sort_keys=True).encode()).hexdigest()
+    return f'{PREFIXO_CHAVE}:{versao}:{assinatura}'
+
+
+def _contar(chave):
+    cache.add(chave, 0, timeout=None)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        pass
+
+
+def obter_resultado(chave):
+    """Entrada guardada (`{'ids': [...], 'facetas': {...}}`) ou None, contando acerto/falha."""
+    entrada = cache.get(chave)
+    _contar(CHAVE_ACERTOS if entrada is not None else CHAVE_FALHAS)
+    return entrada
+
+
+def guardar_resultado(chave, ids, facetas):
+    """Guarda o resultado se o número de ids couber no limite configurado."""
+    limite = getattr(settings, 'REPOSITORIO_CACHE_BUSCA_LIMITE', 10000)
+    if len(ids) > limite:
+        return False
+    cache.set(
+        chave,
+        {'ids': [int(pk) for pk in ids], 'facetas': facetas},
+        timeout=getattr(settings, 'REPOSITORIO_CACHE_BUSCA_TIMEOUT', 600),
+    )
+    return True
+
+
+def estatisticas():
+    acertos = cache.get(CHAVE_ACERTOS) or 0
+    falhas = cache.get(CHAVE_FALHAS) or 0
+    total = acertos + falhas
+    return {
+        'acertos': acertos,
+        'falhas': falhas,
+        'taxa_acerto': round(acertos / total, 4) if total else None,
+        'versao_catalogo': versao_catalogo(),
+    }
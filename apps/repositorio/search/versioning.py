@@ -0,0 +1,66 @@
+"""
+Versões globais do catálogo, das tabelas auxiliares e das estatísticas agregadas.
+
+Números guardados no cache do Django e incrementados sempre que os dados
+correspondentes mudam. Estruturas mantidas em memória por processo (índice de
+facetas, registro de tabelas auxiliares) e entradas do cache de resultados
+comparam a versão com a que conhecem para saber se estão desatualizadas. Com
+vários workers, o cache precisa ser compartilhado (Redis/Memcached); com
+LocMemCache a versão vale apenas para o processo.
+"""
+import time
+
+from django.core.cache import cache
+
+CHAVE_VERSAO_CATALOGO = 'repositorio:catalogo:versao'
+CHAVE_VERSAO_TABELAS_AUXILIARES = 'repositorio:tabelas_auxiliares:versao'
+CHAVE_VERSAO_ESTATISTICAS = 'repositorio:estatisticas:versao'
+
+
+def _versao_inicial():
+    # Baseada no relógio: se o cache for esvaziado, a nova sequência não repete
+    # versões já vistas pelos processos.
+    return time.time_ns() // 1000
+
+
+def versao(chave):
+    """Versão atual guardada em `chave` (cria a chave se ainda não existir)."""
+    atual = cache.get(chave)
+    if atual is None:
+        cache.add(chave, _versao_inicial(), timeout=None)
+        atual = cache.get(chave)
+    return atual
+
+
+def incrementar_versao(chave):
+    """Marca os dados como alterados e retorna a nova versão."""
+    try:
+        return cache.incr(chave)
+    except ValueError:
+        nova = _versao_inicial()
+        cache.set(chave, nova, timeout=None)
+        return nova
+
+
+def versao_catalogo():
+    return versao(CHAVE_VERSAO_CATALOGO)
+
+
+def incrementar_versao_catalogo():
+    return incrementar_versao(CHAVE_VERSAO_CATALOGO)
+
+
+def versao_tabelas_auxiliares():
+    return versao(CHAVE_VERSAO_TABELAS_AUXILIARES)
+
+
+def incrementar_versao_tabelas_auxiliares():
+    return incrementar_versao(CHAVE_VERSAO_TABELAS_AUXILIARES)
+
+
+def versao_estatisticas():
+    return versao(CHAVE_VERSAO_ESTATISTICAS)
+
+
+def incrementar_versao_estatisticas():
+    return incrementar_versao(CHAVE_VERSAO_ESTATISTICAS)
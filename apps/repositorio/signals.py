@@ -0,0 +1,294 @@
+"""
+Handlers de sinais do app repositorio.
+
+Mantêm estruturas derivadas dos Registros (documento de busca full-text,
+modelo de leitura RegistroDocumento e índice de facetas em memória) e o
+registro em memória das tabelas auxiliares sincronizados com as alterações
+feitas pelo ORM.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.repositorio.models.repositorio import (
+    AreaTematica,
+    Autor,
+    Projeto,
+    Registro,
+    Status,
+    Subprojeto,
+    Tag,
+    TipoDocumento,
+    TextoArquivo,
+    TipoPublicacao,
+    armazenamento_por_conteudo,
+)
+from apps.repositorio import content_storage, rollups, text_extraction
+from apps.repositorio.file_metadata import aplicar_metadados, extrair_metadados
+from apps.repositorio.search.bitmap import registrar_alteracao
+from apps.repositorio.search.documents import sincronizar_documentos, sincronizar_vinculados
+from apps.repositorio.search.fulltext import atualizar_search_vector
+from apps.repositorio.search.versioning import incrementar_versao_tabelas_auxiliares
+
+
+def _registros_vinculados(through, instance):
+    """Ids dos registros ligados a um Autor/Tag pela tabela intermediária."""
+    campo = f'{instance._meta.model_name}_id'
+    return list(through.objects.filter(**{campo: instance.pk}).values_list('registro_id', flat=True))
+
+
+_adiados = threading.local()
+
+
+@contextmanager
+def sincronizacao_adiada():
+    """
+    Agrupa as sincronizações dos registros alterados dentro do bloco numa só,
+    feita ao final (ex.: salvar o Registro e depois gravar autores e tags).
+    Também permite gravar as tabelas intermediárias sem passar pelo ORM das
+    relações: basta que o registro tenha sido salvo dentro do bloco. Se o
+    bloco terminar com exceção, nada é sincronizado.
+    """
+    if getattr(_adiados, 'ids', None) is not None:
+        yield
+        return
+
+    _adiados.ids = set()
+    try:
+        yield
+        registro_ids = _adiados.ids
+    finally:
+        _adiados.ids = None
+    _registros_alterados(registro_ids)
+
+
+def _registros_alterados(registro_ids, search_vector=True):
+    registro_ids = [pk for pk in registro_ids if pk]
+    if not registro_ids:
+        return
+    if getattr(_adiados, 'ids', None) is not None:
+        _adiados.ids.update(registro_ids)
+        return
+    if search_vector:
+        atualizar_search_vector(registro_ids)
+    # Antes da sincronização: o documento ainda tem o projeto anterior a uma troca de subprojeto
+    rollups.projetos_alterados(rollups.projetos_dos_registros(registro_ids))
+    sincronizar_documentos(registro_ids)
+    _catalogo_alterado(registro_ids)
+
+
+def _catalogo_alterado(registro_ids=()):
+    # Índice de facetas e versão do catálogo (cache de resultados) só mudam se a
+    # transação for confirmada
+    transaction.on_commit(partial(registrar_alteracao, registro_ids=list(registro_ids)))
+
+
+@receiver(pre_save, sender=Registro, dispatch_uid='registro_metadados_arquivo')
+def registro_metadados_arquivo(sender, instance, raw=False, **kwargs):
+    # Novo upload ainda não gravado no storage: metadados lidos do próprio upload
+    if raw:
+        return
+    if not instance.arquivo:
+        if instance.arquivo_sha256 or instance.arquivo_tamanho is not None:
+            aplicar_metadados(instance, None)
+            instance._arquivo_alterado = True
+    elif not instance.arquivo._committed:
+        instance._arquivo_alterado = True
+        instance.arquivo_nome = os.path.basename(instance.arquivo.name)[:500]
+        aplicar_metadados(instance, extrair_metadados(instance.arquivo, instance.arquivo.name))
+        if armazenamento_por_conteudo():
+            content_storage.reaproveitar_conteudo(instance)
+
+    if armazenamento_por_conteudo():
+        # Arquivo anterior, para ajustar as referências no post_save
+        instance._arquivo_anterior = (
+            Registro.objects.filter(pk=instance.pk).values_list('arquivo', flat=True).first() or ''
+            if instance.pk else ''
+        )
+
+
+@receiver(post_save, sender=Registro, dispatch_uid='registro_referencias_arquivo')
+def registro_referencias_arquivo(sender, instance, raw=False, **kwargs):
+    if raw or not armazenamento_por_conteudo():
+        return
+    content_storage.arquivo_substituido(instance, getattr(instance, '_arquivo_anterior', ''))
+    instance._arquivo_anterior = instance.arquivo.name if instance.arquivo else ''
+
+
+@receiver(post_delete, sender=Registro, dispatch_uid='registro_arquivo_liberado')
+def registro_arquivo_liberado(sender, instance, **kwargs):
+    if armazenamento_por_conteudo() and instance.arquivo:
+        content_storage.arquivo_liberado(instance.arquivo.name)
+
+
+@receiver(post_save, sender=Registro, dispatch_uid='registro_texto_arquivo')
+def registro_texto_arquivo(sender, instance, raw=False, **kwargs):
+    # Texto de um arquivo que não é mais o do registro sai do documento de busca
+    # (o search_vector é recalculado logo abaixo); o novo PDF vai para a extração
+    if raw or not getattr(instance, '_arquivo_alterado', False):
+        return
+    instance._arquivo_alterado = False
+    textos = TextoArquivo.objects.filter(registro_id=instance.pk)
+    if instance.arquivo_sha256:
+        textos = textos.exclude(sha256=instance.arquivo_sha256)
+    textos.delete()
+    if instance.arquivo_mime == text_extraction.MIME_PDF:
+        text_extraction.enfileirar(instance.pk)
+
+
+@receiver(post_save, sender=Registro, dispatch_uid='registro_search_vector')
+def registro_salvo(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _registros_alterados([instance.pk])
+
+
+@receiver(post_delete, sender=Registro, dispatch_uid='registro_excluido')
+def registro_excluido(sender, instance, **kwargs):
+    # O documento de leitura é removido em cascata
+    _catalogo_alterado([instance.pk])
+    rollups.projetos_alterados([instance.projeto_id])
+
+
+@receiver(m2m_changed, sender=Registro.autores.through, dispatch_uid='registro_autores_alterados')
+@receiver(m2m_changed, sender=Registro.tags.through, dispatch_uid='registro_tags_alteradas')
+def registro_relacoes_alteradas(sender, instance, action, reverse, pk_set, **kwargs):
+    """Atualiza os registros afetados por alterações em autores/tags."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _registros_alterados([instance.pk])
+        return
+
+    # Lado reverso (ex.: autor.autores.add(registro)): instance é o Autor/Tag.
+    if action == 'pre_clear':
+        # O post_clear não informa quais registros foram desvinculados.
+        instance._registros_desvinculados = _registros_vinculados(sender, instance)
+    elif action == 'post_clear':
+        _registros_alterados(getattr(instance, '_registros_desvinculados', []))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        _registros_alterados(pk_set)
+
+
+@receiver(post_save, sender=Autor, dispatch_uid='autor_search_vector')
+@receiver(post_save, sender=Tag, dispatch_uid='tag_search_vector')
+def nome_relacionado_salvo(sender, instance, created=False, raw=False, **kwargs):
+    """Renomear um autor/tag altera os documentos de busca e de leitura dos registros vinculados."""
+    if raw:
+        return
+    through = Registro.autores.through if sender is Autor else Registro.tags.through
+    registro_ids = [] if created else _registros_vinculados(through, instance)
+    if registro_ids:
+        _registros_alterados(registro_ids)
+    else:
+        _catalogo_alterado()
+
+
+@receiver(post_save, sender=Subprojeto, dispatch_uid='subprojeto_projeto_registros')
+def subprojeto_projeto_registros(sender, instance, created=False, raw=False, **kwargs):
+    """Subprojeto movido para outro projeto: atualiza o projeto copiado nos registros (antes dos documentos)."""
+    if raw or created:
+        return
+    Registro.objects.filter(subprojeto=instance).exclude(projeto_id=instance.projeto_id).update(projeto_id=instance.projeto_id)
+
+
+# Campo do Registro que aponta para cada tabela auxiliar exibida no documento de leitura
+CAMPOS_AUXILIARES = {
+    Projeto: 'projeto',
+    Subprojeto: 'subprojeto',
+    TipoDocumento: 'tipo_documento',
+    AreaTematica: 'area_tematica',
+    Status: 'status',
+}
+
+
+@receiver(post_save, sender=Projeto, dispatch_uid='projeto_documentos')
+@receiver(post_save, sender=Subprojeto, dispatch_uid='subprojeto_documentos')
+@receiver(post_save, sender=TipoDocumento, dispatch_uid='tipo_documento_documentos')
+@receiver(post_save, sender=AreaTematica, dispatch_uid='area_tematica_documentos')
+@receiver(post_save, sender=Status, dispatch_uid='status_documentos')
+def auxiliar_salvo(sender, instance, created=False, raw=False, **kwargs):
+    """Nomes, projeto do subprojeto e `is_public` do status são copiados para os documentos."""
+    if raw:
+        return
+    registro_ids = []
+    if not created:
+        registro_ids = sincronizar_vinculados(Registro.objects.filter(**{CAMPOS_AUXILIARES[sender]: instance}))
+    _catalogo_alterado(registro_ids)
+
+
+@receiver(post_save, sender=Projeto, dispatch_uid='projeto_estatisticas')
+@receiver(post_save, sender=Subprojeto, dispatch_uid='subprojeto_estatisticas')
+@receiver(post_save, sender=TipoDocumento, dispatch_uid='tipo_documento_estatisticas')
+@receiver(post_save, sender=Status, dispatch_uid='status_estatisticas')
+@receiver(post_delete, sender=Subprojeto, dispatch_uid='subprojeto_excluido_estatisticas')
+@receiver(post_delete, sender=TipoDocumento, dispatch_uid='tipo_documento_excluido_estatisticas')
+@receiver(post_delete, sender=Status, dispatch_uid='status_excluido_estatisticas')
+@receiver(post_delete, sender=Autor, dispatch_uid='autor_excluido_estatisticas')
+def estatisticas_auxiliar_alterada(sender, instance, created=False, raw=False, **kwargs):
+    """Contadores dos projetos (apps.repositorio.rollups) que dependem das tabelas auxiliares."""
+    if raw:
+        return
+    if sender is Projeto:
+        rollups.projetos_alterados([instance.pk])
+    elif sender is Subprojeto and created:
+        rollups.projetos_alterados([instance.projeto_id])
+    elif not created:
+        # Nomes de status/tipo, `ativo` e troca de projeto mudam as regras de contagem
+        rollups.projetos_alterados()
+
+
+@receiver(post_save, sender=TipoPublicacao, dispatch_uid='tipo_publicacao_catalogo')
+@receiver(post_delete, sender=TipoPublicacao, dispatch_uid='tipo_publicacao_excluido')
+@receiver(post_delete, sender=Projeto, dispatch_uid='projeto_excluido')
+@receiver(post_delete, sender=Subprojeto, dispatch_uid='subprojeto_excluido')
+@receiver(post_delete, sender=TipoDocumento, dispatch_uid='tipo_documento_excluido')
+@receiver(post_delete, sender=AreaTematica, dispatch_uid='area_tematica_excluida')
+@receiver(post_delete, sender=Status, dispatch_uid='status_excluido')
+@receiver(post_delete, sender=Autor, dispatch_uid='autor_excluido')
+@receiver(post_delete, sender=Tag, dispatch_uid='tag_excluida')
+def tabela_auxiliar_alterada(sender, raw=False, **kwargs):
+    """Qualquer alteração nas tabelas auxiliares invalida os resultados em cache."""
+    if raw:
+        return
+    _catalogo_alterado()
+
+
+def auxiliares_atualizadas_em_lote():
+    """
+    Efeitos dos sinais acima para alterações em lote de tabelas auxiliares
+    (`queryset.update()`, que não dispara post_save; ex.: ações do admin que
+    ativam/inativam): registro em memória, contadores dos projetos, índice de
+    facetas e versão do catálogo.
+    """
+    incrementar_versao_tabelas_auxiliares()
+    transaction.on_commit(incrementar_versao_tabelas_auxiliares)
+    rollups.projetos_alterados()
+    _catalogo_alterado()
+
+
+@receiver(post_save, sender=Projeto, dispatch_uid='projeto_tabelas_auxiliares')
+@receiver(post_save, sender=Subprojeto, dispatch_uid='subprojeto_tabelas_auxiliares')
+@receiver(post_save, sender=TipoDocumento, dispatch_uid='tipo_documento_tabelas_auxiliares')
+@receiver(post_save, sender=AreaTematica, dispatch_uid='area_tematica_tabelas_auxiliares')
+@receiver(post_save, sender=Status, dispatch_uid='status_tabelas_auxiliares')
+@receiver(post_save, sender=TipoPublicacao, dispatch_uid='tipo_publicacao_tabelas_auxiliares')
+@receiver(post_delete, sender=Projeto, dispatch_uid='projeto_excluido_tabelas_auxiliares')
+@receiver(post_delete, sender=Subprojeto, dispatch_uid='subprojeto_excluido_tabelas_auxiliares')
+@receiver(post_delete, sender=TipoDocumento, dispatch_uid='tipo_documento_excluido_tabelas_auxiliares')
+@receiver(post_delete, sender=AreaTematica, dispatch_uid='area_tematica_excluida_tabelas_auxiliares')
+@receiver(post_delete, sender=Status, dispatch_uid='status_excluido_tabelas_auxiliares')
+@receiver(post_delete, sender=TipoPublicacao, dispatch_uid='tipo_publicacao_excluido_tabelas_auxiliares')
+def tabelas_auxiliares_alteradas(sender, raw=False, **kwargs):
+    """Invalida o registro em memória das tabelas auxiliares (apps.repositorio.lookup_tables)."""
+    if raw:
+        return
+    # Incrementa já (o próprio processo enxerga a alteração ainda na transação)
+    # e de novo após o commit, para que outros workers não guardem uma cópia
+    # recarregada antes de a transação ser confirmada
+    incrementar_versao_tabelas_auxiliares()
+    transaction.on_commit(incrementar_versao_tabelas_auxiliares)
@@ -0,0 +1,44 @@
+from django.test import TestCase
+
+from apps.accounts.models.user import User
+from apps.repositorio.models.repositorio import (
+    AreaTematica,
+    Projeto,
+    Registro,
+    Status,
+    Subprojeto,
+    TipoDocumento,
+    TipoPublicacao,
+)
+
+
+class RegistroBuscaBaseTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='buscatester@example.com',
+            password='secret123',
+            first_name='Busca',
+            last_name='Tester',
+        )
+        self.projeto = Projeto.objects.create(nome='Projeto Busca', ativo=True)
+        self.subprojeto = Subprojeto.objects.create(projeto=self.projeto, nome='Subprojeto Busca', ativo=True)
+        self.tipo_documento = TipoDocumento.objects.create(nome='Artigo', ativo=True)
+        self.area_tematica = AreaTematica.objects.create(nome='Espeleologia', ativo=True)
+        self.status = Status.objects.create(nome='Publicado', ativo=True, is_public=True)
+        self.tipo_publicacao = TipoPublicacao.objects.create(nome='Revista', ativo=True)
+
+    def criar_registro(self, titulo, **kwargs):
+        dados = {
+            'titulo': titulo,
+            'subprojeto': self.subprojeto,
+            'tipo_documento': self.tipo_documento,
+            'area_tematica': self.area_tematica,
+            'status': self.status,
+            'tipo_publicacao': self.tipo_publicacao,
+            'usuario_criacao': self.user,
+            'usuario_ultima_atualizacao': self.user,
+            'link_externo': 'https://exemplo.test/registro',
+        }
+        dados.update(kwargs)
+        return Registro.objects.create(**dados)
+
@@ -0,0 +1,249 @@
+import hashlib
+import io
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from apps.repositorio.content_storage import coletar_orfaos
+from apps.repositorio.models.repositorio import ArquivoConteudo, Registro, RegistroDocumento, TextoArquivo
+from apps.repositorio.tests.base import RegistroBuscaBaseTest
+from apps.repositorio.text_extraction import extrair_registro, pendentes
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # pypdf é opcional
+    PdfWriter = None
+
+
+def pdf_com_paginas(quantidade):
+    escritor = PdfWriter()
+    for _ in range(quantidade):
+        escritor.add_blank_page(width=200, height=200)
+    saida = io.BytesIO()
+    escritor.write(saida)
+    return saida.getvalue()
+
+
+@skipUnless(PdfWriter, 'pypdf é necessário para gerar PDFs de teste')
+class MetadadosArquivoTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        configuracao = self.settings(MEDIA_ROOT=media_root.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.dados = pdf_com_paginas(3)
+
+    def test_metadados_calculados_no_upload(self):
+        registro = self.criar_registro('Com PDF', arquivo=SimpleUploadedFile('mapa.pdf', self.dados))
+
+        registro.refresh_from_db()
+        self.assertEqual(registro.arquivo_tamanho, len(self.dados))
+        self.assertEqual(registro.arquivo_mime, 'application/pdf')
+        self.assertEqual(registro.arquivo_sha256, hashlib.sha256(self.dados).hexdigest())
+        self.assertEqual(registro.arquivo_paginas, 3)
+        self.assertEqual(RegistroDocumento.objects.get(pk=registro.pk).arquivo_tamanho, len(self.dados))
+
+        # Sem novo upload, os metadados não são recalculados; remover o arquivo os limpa
+        with mock.patch('apps.repositorio.signals.extrair_metadados') as extrair:
+            registro.titulo = 'Outro título'
+            registro.save()
+        extrair.assert_not_called()
+
+        registro.arquivo = None
+        registro.save()
+        registro.refresh_from_db()
+        self.assertIsNone(registro.arquivo_tamanho)
+        self.assertEqual(registro.arquivo_sha256, '')
+
+    def test_etag_usa_o_hash_gravado(self):
+        registro = self.criar_registro('Com PDF', arquivo=SimpleUploadedFile('mapa.pdf', self.dados))
+
+        response = self.client.get(reverse('core:view_file', args=[registro.pk]))
+
+        self.assertIn(registro.arquivo_sha256[:32], response['ETag'])
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_preenchimento_de_arquivos_existentes(self):
+        registro = self.criar_registro('Antigo', arquivo=SimpleUploadedFile('antigo.pdf', self.dados))
+        perdido = self.criar_registro('Perdido', arquivo=SimpleUploadedFile('perdido.pdf', b'%PDF'))
+        os.remove(perdido.arquivo.path)
+        Registro.objects.update(arquivo_tamanho=None, arquivo_mime='', arquivo_sha256='', arquivo_paginas=None)
+        saida = io.StringIO()
+
+        with self.assertLogs('apps.repositorio.file_metadata', 'ERROR'):
+            call_command('preencher_metadados_arquivos', '--concorrencia', '2', stdout=saida)
+
+        registro.refresh_from_db()
+        self.assertEqual((registro.arquivo_tamanho, registro.arquivo_paginas), (len(self.dados), 3))
+        self.assertEqual(RegistroDocumento.objects.get(pk=registro.pk).arquivo_mime, 'application/pdf')
+        self.assertIn('1 registro(s) com metadados preenchidos.', saida.getvalue())
+
+
+@override_settings(REPOSITORIO_ARMAZENAMENTO_POR_CONTEUDO=True)
+class ArmazenamentoPorConteudoTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        configuracao = self.settings(MEDIA_ROOT=media_root.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.media_root = media_root.name
+        self.dados = b'%PDF-1.4 mesmo conteudo'
+
+    def arquivos_gravados(self):
+        return [nome for _, _, nomes in os.walk(self.media_root) for nome in nomes]
+
+    def test_conteudo_identico_gravado_uma_vez(self):
+        primeiro = self.criar_registro('Primeiro', arquivo=SimpleUploadedFile('mapa.pdf', self.dados))
+        segundo = self.criar_registro('Segundo', arquivo=SimpleUploadedFile('copia.PDF', self.dados))
+
+        sha256 = hashlib.sha256(self.dados).hexdigest()
+        self.assertEqual(primeiro.arquivo.name, f'repositorio/conteudo/{sha256[:2]}/{sha256}.pdf')
+        self.assertEqual(segundo.arquivo.name, primeiro.arquivo.name)
+        self.assertEqual(self.arquivos_gravados(), [f'{sha256}.pdf'])
+        self.assertEqual(ArquivoConteudo.objects.get().referencias, 2)
+
+        # O download usa o nome original do upload
+        response = self.client.get(reverse('core:registro_download', args=[segundo.pk]))
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="copia.PDF"')
+
+    def test_coleta_apos_perder_as_referencias(self):
+        primeiro = self.criar_registro('Primeiro', arquivo=SimpleUploadedFile('mapa.pdf', self.dados))
+        segundo = self.criar_registro('Segundo', arquivo=SimpleUploadedFile('mapa.pdf', self.dados))
+
+        primeiro.delete()
+        self.assertEqual(coletar_orfaos(timedelta(0)), 0)
+
+        segundo.arquivo = SimpleUploadedFile('novo.pdf', b'%PDF-1.4 outro conteudo')
+        segundo.save()
+        blob = ArquivoConteudo.objects.get(sha256=hashlib.sha256(self.dados).hexdigest())
+        self.assertEqual(blob.referencias, 0)
+        self.assertIsNotNone(blob.orfao_desde)
+
+        # Dentro da carência o objeto é mantido; depois dela, removido
+        self.assertEqual(coletar_orfaos(timedelta(hours=1)), 0)
+        self.assertEqual(coletar_orfaos(timedelta(0)), 1)
+        self.assertFalse(ArquivoConteudo.objects.filter(pk=blob.pk).exists())
+        self.assertEqual(len(self.arquivos_gravados()), 1)
+
+    def test_orfao_reaproveitado_antes_da_coleta(self):
+        registro = self.criar_registro('Primeiro', arquivo=SimpleUploadedFile('mapa.pdf', self.dados))
+        registro.delete()
+
+        novo = self.criar_registro('De novo', arquivo=SimpleUploadedFile('mapa.pdf', self.dados))
+
+        self.assertEqual(ArquivoConteudo.objects.get().referencias, 1)
+        self.assertEqual(coletar_orfaos(timedelta(0)), 0)
+        self.assertTrue(novo.arquivo.storage.exists(novo.arquivo.name))
+
+    def test_recontagem(self):
+        registro = self.criar_registro('Primeiro', arquivo=SimpleUploadedFile('mapa.pdf', self.dados))
+        ArquivoConteudo.objects.all().delete()
+
+        call_command('coletar_arquivos_orfaos', '--recontar', stdout=io.StringIO())
+
+        self.assertEqual(ArquivoConteudo.objects.get(arquivo=registro.arquivo.name).referencias, 1)
+
+
+def pdf_com_texto(texto):
+    """PDF mínimo de uma página com `texto` em Helvetica."""
+    conteudo = f'BT /F1 12 Tf 20 100 Td ({texto}) Tj ET'.encode('latin-1')
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 400 200] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(conteudo), conteudo),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    saida = io.BytesIO()
+    saida.write(b'%PDF-1.4\n')
+    posicoes = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posicoes.append(saida.tell())
+        saida.write(b'%d 0 obj\n%s\nendobj\n' % (numero, objeto))
+    xref = saida.tell()
+    saida.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1))
+    for posicao in posicoes:
+        saida.write(b'%010d 00000 n \n' % posicao)
+    saida.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, xref))
+    return saida.getvalue()
+
+
+@skipUnless(PdfWriter, 'pypdf é necessário para extrair o texto dos PDFs')
+@override_settings(REPOSITORIO_EXTRACAO_TEXTO_WORKERS=0)
+class TextoArquivoTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        configuracao = self.settings(MEDIA_ROOT=media_root.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def criar_com_pdf(self, titulo, texto):
+        return self.criar_registro(titulo, arquivo=SimpleUploadedFile('relatorio.pdf', pdf_com_texto(texto)))
+
+    def test_texto_extraido_entra_na_busca(self):
+        registro = self.criar_com_pdf('Relatório de campo', 'Ocorrencia de estalactites calcarias')
+        self.criar_com_pdf('Outro relatório', 'Levantamento de morcegos')
+        self.assertIn(registro.pk, pendentes().values_list('pk', flat=True))
+
+        self.assertTrue(extrair_registro(registro.pk))
+
+        texto = TextoArquivo.objects.get(registro=registro)
+        self.assertEqual(texto.status, TextoArquivo.EXTRAIDO)
+        self.assertIn('estalactites', texto.texto)
+        self.assertNotIn(registro.pk, pendentes().values_list('pk', flat=True))
+
+        response = self.client.get(reverse('core:repositorio'), {'q': 'estalactites'})
+        self.assertEqual([r.pk for r in response.context['registros']], [registro.pk])
+
+    def test_extracao_incremental_pelo_hash(self):
+        registro = self.criar_com_pdf('Relatório', 'Primeira versao')
+        copia = self.criar_com_pdf('Cópia', 'Primeira versao')
+        extrair_registro(registro.pk)
+
+        # Arquivo inalterado não é reprocessado; o mesmo conteúdo é copiado sem ler o PDF
+        with mock.patch('apps.repositorio.text_extraction.extrair_texto_pdf') as extrair:
+            registro.titulo = 'Relatório revisado'
+            registro.save()
+            self.assertFalse(extrair_registro(registro.pk))
+            self.assertTrue(extrair_registro(copia.pk))
+        extrair.assert_not_called()
+        self.assertIn('Primeira', TextoArquivo.objects.get(registro=copia).texto)
+
+        # Um novo arquivo descarta o texto anterior e volta a ficar pendente
+        registro.arquivo = SimpleUploadedFile('relatorio.pdf', pdf_com_texto('Segunda versao'))
+        registro.save()
+        self.assertFalse(TextoArquivo.objects.filter(registro=registro).exists())
+        self.assertEqual(list(pendentes()), [registro])
+
+    def test_upload_agenda_extracao_apos_commit(self):
+        with self.settings(REPOSITORIO_EXTRACAO_TEXTO_WORKERS=1):
+            with mock.patch('apps.repositorio.text_extraction._obter_executor') as obter:
+                with self.captureOnCommitCallbacks(execute=True):
+                    registro = self.criar_com_pdf('Relatório', 'Texto qualquer')
+        obter.return_value.submit.assert_called_once()
+        self.assertEqual(obter.return_value.submit.call_args.args[1], registro.pk)
+
+    def test_comando_extrai_pendentes(self):
+        registro = self.criar_com_pdf('Relatório', 'Conteudo do comando')
+        self.criar_registro('Sem arquivo')
+
+        saida = io.StringIO()
+        call_command('extrair_textos_arquivos', '--processos', '1', stdout=saida)
+
+        self.assertIn('1 texto(s)', saida.getvalue())
+        self.assertIn('comando', TextoArquivo.objects.get(registro=registro).texto)
+        self.assertFalse(pendentes().exists())
+
@@ -0,0 +1,558 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.core.views.repositorio import RepositorioView
+from apps.repositorio.exports import filtrar_documentos
+from apps.repositorio.lookup_tables import descartar_tabelas_auxiliares
+from apps.repositorio.models.repositorio import (
+    Autor,
+    Projeto,
+    Registro,
+    Status,
+    Subprojeto,
+    Tag,
+    TextoArquivo,
+    TipoDocumento,
+)
+from apps.repositorio.search.bitmap import descartar_indice, obter_indice, registrar_alteracao
+from apps.repositorio.search.highlight import recortar_trecho
+from apps.repositorio.search.query_syntax import MAX_TERMOS, ConsultaInvalida, analisar, usa_sintaxe_avancada
+from apps.repositorio.search.result_cache import chave_resultado, normalizar_parametros
+from apps.repositorio.tests.base import RegistroBuscaBaseTest
+from apps.repositorio.views.registro_views import _apply_filters_to_queryset, _consultar_indice_facetas
+
+
+class RepositorioBuscaTest(RegistroBuscaBaseTest):
+
+    def test_busca_por_autor_e_tag_nao_duplica_resultados(self):
+        registro = self.criar_registro('Cavernas do Pará')
+        registro.autores.add(Autor.objects.create(nome='Morcego Silva'), Autor.objects.create(nome='Morcego Souza'))
+        registro.tags.add(Tag.objects.create(nome='Morcegos'))
+        self.criar_registro('Outro registro')
+
+        response = self.client.get(reverse('core:repositorio'), {'q': 'Morcego'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r.pk for r in response.context['registros']], [registro.pk])
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+
+    def test_busca_combina_com_filtros(self):
+        registro = self.criar_registro('Fauna cavernícola')
+        outro_status = Status.objects.create(nome='Revisado', ativo=True, is_public=True)
+        self.criar_registro('Fauna de superfície', status=outro_status)
+
+        response = self.client.get(reverse('core:repositorio'), {'q': 'Fauna', 'status': self.status.pk})
+
+        self.assertEqual([r.pk for r in response.context['registros']], [registro.pk])
+
+    def test_busca_ignora_acentos(self):
+        registro = self.criar_registro('Fauna da Amazônia')
+
+        response = self.client.get(reverse('core:repositorio'), {'q': 'amazonia'})
+
+        self.assertEqual([r.pk for r in response.context['registros']], [registro.pk])
+
+    def test_categoria_ignora_acentos_e_plural(self):
+        relatorio = TipoDocumento.objects.create(nome='RELATÓRIO TÉCNICO', ativo=True)
+        registro = self.criar_registro('Relatório final', tipo_documento=relatorio)
+        self.criar_registro('Artigo qualquer')
+
+        response = self.client.get(reverse('core:repositorio'), {'categoria': 'relatorios'})
+
+        self.assertEqual([r.pk for r in response.context['registros']], [registro.pk])
+
+
+class FacetasTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        super().setUp()
+        self.ana = Autor.objects.create(nome='Ana')
+        self.bruno = Autor.objects.create(nome='Bruno')
+        self.relatorio = TipoDocumento.objects.create(nome='Relatório', ativo=True)
+
+        primeiro = self.criar_registro('Primeiro', data_publicacao=date(2020, 5, 1))
+        primeiro.autores.add(self.ana, self.bruno)
+        segundo = self.criar_registro('Segundo', data_publicacao=date(2021, 5, 1))
+        segundo.autores.add(self.ana)
+        terceiro = self.criar_registro('Terceiro', tipo_documento=self.relatorio, data_publicacao=date(2021, 1, 1))
+        terceiro.autores.add(self.bruno)
+        self.registros = [primeiro, segundo, terceiro]
+
+    def test_contagens_sem_filtros(self):
+        response = self.client.get(reverse('core:repositorio'))
+        facetas = response.context['facetas']
+
+        # Sem autor selecionado o autocomplete não lista autores: contagens não calculadas
+        self.assertNotIn('autor', facetas)
+        self.assertEqual(facetas['tipo_documento'], {self.tipo_documento.pk: 2, self.relatorio.pk: 1})
+        self.assertEqual(facetas['ano'], {2020: 1, 2021: 2})
+        self.assertEqual(facetas['projeto'], {self.projeto.pk: 3})
+        # Autores são carregados sob demanda; as demais opções trazem a contagem
+        self.assertIn('Relatório (1)', response.content.decode())
+        self.assertNotIn('Ana (2)', response.content.decode())
+
+    def test_faceta_ignora_o_proprio_filtro(self):
+        response = self.client.get(reverse('core:repositorio'), {'autor': self.ana.pk})
+        facetas = response.context['facetas']
+
+        self.assertEqual(len(response.context['registros']), 2)
+        # Autor continua mostrando as alternativas; demais facetas refletem o filtro
+        self.assertEqual(facetas['autor'], {self.ana.pk: 2, self.bruno.pk: 2})
+        self.assertEqual(facetas['tipo_documento'], {self.tipo_documento.pk: 2})
+        self.assertEqual(facetas['ano'], {2020: 1, 2021: 1})
+        self.assertIn('Ana (2)', response.content.decode())
+
+    def test_selecao_multipla(self):
+        response = self.client.get(
+            reverse('core:repositorio'),
+            {'ano': [2020, 2021], 'tipo_documento': [self.relatorio.pk, self.tipo_documento.pk], 'autor': self.bruno.pk},
+        )
+
+        self.assertEqual(
+            sorted(r.pk for r in response.context['registros']),
+            sorted([self.registros[0].pk, self.registros[2].pk]),
+        )
+        self.assertEqual(response.context['facetas']['ano'], {2020: 1, 2021: 1})
+
+    def test_links_de_paginacao_mantem_facetas_multiplas(self):
+        for indice in range(10):
+            self.criar_registro(f'Extra {indice}', tipo_documento=self.relatorio, data_publicacao=date(2021, 2, 1))
+
+        response = self.client.get(
+            reverse('core:repositorio'),
+            {'tipo_documento': [self.relatorio.pk, self.tipo_documento.pk], 'ordenar_por': '-data_publicacao', 'page': 1},
+        )
+
+        query_params = response.context['query_params']
+        self.assertEqual(
+            query_params,
+            f'tipo_documento={self.relatorio.pk}&tipo_documento={self.tipo_documento.pk}&ordenar_por=-data_publicacao',
+        )
+        self.assertContains(response, f'href="?page=2&{query_params.replace("&", "&amp;")}"')
+
+    def test_contagens_respeitam_a_busca(self):
+        response = self.client.get(reverse('core:repositorio'), {'q': 'Terceiro', 'autor': self.bruno.pk})
+        facetas = response.context['facetas']
+
+        self.assertEqual(facetas['autor'], {self.bruno.pk: 1})
+        self.assertEqual(facetas['tipo_documento'], {self.relatorio.pk: 1})
+
+
+@override_settings(REPOSITORIO_INDICE_FACETAS=True)
+class IndiceFacetasTest(FacetasTest):
+    """Mesmos cenários de FacetasTest, resolvidos pelo índice em memória."""
+
+    def setUp(self):
+        descartar_indice()
+        self.addCleanup(descartar_indice)
+        super().setUp()
+
+    def test_listagem_usa_o_indice(self):
+        params = {'autor': self.bruno.pk, 'ordenar_por': 'titulo'}
+        self.client.get(reverse('core:repositorio'), params)  # constrói o índice e a ordenação
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('core:repositorio'), params)
+
+        # Nenhuma contagem/agrupamento no banco: só as linhas da página são buscadas
+        sql = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('GROUP BY', sql)
+
+        self.assertEqual([r.pk for r in response.context['registros']], [self.registros[0].pk, self.registros[2].pk])
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+    def test_listagem_de_gestao(self):
+        self.registros[1].ativo = False
+        self.registros[1].save()
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('repositorio:lista'), {'tipo_documento': self.tipo_documento.pk, 'ativo': '1'})
+
+        self.assertEqual([r.pk for r in response.context['registros']], [self.registros[0].pk])
+
+    def test_datas_nulas_na_mesma_posicao_no_indice_e_no_banco(self):
+        sem_data = self.criar_registro('Sem data', data_publicacao=None)
+        for ordenar_por in ('-data_publicacao', 'data_publicacao'):
+            with self.subTest(ordenar_por=ordenar_por):
+                pelo_indice = self.client.get(reverse('core:repositorio'), {'ordenar_por': ordenar_por})
+                with self.settings(REPOSITORIO_INDICE_FACETAS=False):
+                    pelo_banco = self.client.get(reverse('core:repositorio'), {'ordenar_por': ordenar_por})
+
+                ids = [r.pk for r in pelo_indice.context['registros']]
+                self.assertEqual(ids[-1], sem_data.pk)
+                self.assertEqual([r.pk for r in pelo_banco.context['registros']], ids)
+
+    def test_filtros_de_gestao_iguais_nos_tres_caminhos(self):
+        self.registros[1].ativo = False
+        self.registros[1].save()
+        cenarios = [
+            {},
+            {'tipo_documento': self.tipo_documento.pk},
+            {'tipo_documento': self.relatorio.pk, 'ativo': '1'},
+            {'projeto': self.projeto.pk, 'ativo': '0'},
+            {'status': self.status.pk, 'subprojeto': self.subprojeto.pk},
+        ]
+        for params in cenarios:
+            with self.subTest(params=params):
+                query_params = QueryDict(mutable=True)
+                query_params.update({nome: str(valor) for nome, valor in params.items()})
+
+                listagem = list(_apply_filters_to_queryset(query_params).values_list('pk', flat=True))
+                exportacao = list(filtrar_documentos(query_params).values_list('registro_id', flat=True))
+                indice = list(_consultar_indice_facetas(query_params).ids)
+
+                self.assertEqual(exportacao, listagem)
+                self.assertEqual(indice, listagem)
+
+    def test_atualizacao_incremental(self):
+        indice = obter_indice()
+        novo = self.criar_registro('Quarto', data_publicacao=date(2022, 1, 1))
+        novo.autores.add(self.ana)
+        excluido = self.registros[2].pk
+        self.registros[2].delete()
+
+        registrar_alteracao(registro_ids=[novo.pk, excluido])
+
+        self.assertIs(obter_indice(), indice)
+        self.assertEqual(
+            list(indice.consultar({'autor': [self.ana.pk]}, ('-data_publicacao',))),
+            [novo.pk, self.registros[1].pk, self.registros[0].pk],
+        )
+        self.assertEqual(indice.contar({}, ['tipo_documento'])['tipo_documento'], {self.tipo_documento.pk: 3})
+
+
+class TrechosDestacadosTest(RegistroBuscaBaseTest):
+    def buscar(self, termo):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('core:repositorio'), {'q': termo})
+        return response, len(consultas)
+
+    def test_trecho_do_resumo_e_titulo_destacados(self):
+        self.criar_registro('Cavernas <b>calcárias</b>', resumo='Estudo das formações calcarias do Pará.')
+
+        response, _ = self.buscar('calcarias')
+
+        registro = response.context['registros'][0]
+        self.assertEqual(registro.titulo_destacado, 'Cavernas &lt;b&gt;<mark>calcárias</mark>&lt;/b&gt;')
+        self.assertIn('formações <mark>calcarias</mark> do Pará', registro.trecho)
+        self.assertContains(response, '<mark>calcarias</mark>')
+
+    def test_trecho_do_texto_extraido(self):
+        registro = self.criar_registro('Relatório final', resumo='Sem relação.')
+        TextoArquivo.objects.create(
+            registro=registro, sha256='0' * 64, texto='Introdução. ' * 50 + 'Foram catalogados espeleotemas raros.',
+        )
+
+        response, _ = self.buscar('espeleotemas')
+
+        trecho = response.context['registros'][0].trecho
+        self.assertTrue(trecho.startswith('…'))
+        self.assertIn('catalogados <mark>espeleotemas</mark> raros', trecho)
+
+    def test_trechos_na_mesma_consulta_da_pagina(self):
+        # A segunda busca de cada rodada já encontra as tabelas auxiliares carregadas
+        self.criar_registro('Gruta um', resumo='Gruta com morcegos.')
+        self.buscar('gruta')
+        _, com_um = self.buscar('gruta')
+        for numero in range(5):
+            self.criar_registro(f'Gruta {numero}', resumo='Gruta com morcegos.')
+        self.buscar('gruta')
+        _, com_seis = self.buscar('gruta')
+
+        self.assertEqual(com_um, com_seis)
+
+    def test_recorte_ignora_acentos(self):
+        self.assertEqual(recortar_trecho('Fauna da Amazônia', 'amazonia'), 'Fauna da \x02Amazônia\x03')
+        self.assertEqual(recortar_trecho('Fauna da Amazônia', 'cerrado'), '')
+
+
+class ConsultaAvancadaTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        super().setUp()
+        silva = Autor.objects.create(nome='Ana Silva')
+        anfibios = Tag.objects.create(nome='Anfíbios')
+        relatorio = TipoDocumento.objects.create(nome='Relatório Técnico', ativo=True)
+
+        self.sapos = self.criar_registro('Sapos da caverna', data_publicacao=date(2020, 5, 1))
+        self.sapos.autores.add(silva)
+        self.sapos.tags.add(anfibios)
+        self.antigo = self.criar_registro('Sapos antigos', data_publicacao=date(2015, 1, 1))
+        self.antigo.autores.add(silva)
+        self.antigo.tags.add(anfibios)
+        self.relatorio = self.criar_registro(
+            'Sapos no relatório', tipo_documento=relatorio, data_publicacao=date(2021, 1, 1),
+        )
+        self.relatorio.autores.add(silva)
+        self.relatorio.tags.add(anfibios)
+        self.gruta = self.criar_registro('Morcegos da gruta', data_publicacao=date(2019, 1, 1))
+
+    def buscar(self, termo):
+        response = self.client.get(reverse('core:repositorio'), {'q': termo})
+        self.assertEqual(response.status_code, 200)
+        return response, {r.pk for r in response.context['registros']}
+
+    def test_campos_intervalo_de_anos_e_exclusao(self):
+        _, encontrados = self.buscar('autor:"silva" tag:anfibios ano:2019..2022 -tipo:relatorio')
+        self.assertEqual(encontrados, {self.sapos.pk})
+
+        _, encontrados = self.buscar('ano:..2019')
+        self.assertEqual(encontrados, {self.antigo.pk, self.gruta.pk})
+
+    def test_grupos_ou_e_frases(self):
+        _, encontrados = self.buscar('(caverna OR gruta) -"sapos da caverna"')
+        self.assertEqual(encontrados, {self.gruta.pk})
+
+        _, encontrados = self.buscar('titulo:sapos (antigos | relatório)')
+        self.assertEqual(encontrados, {self.antigo.pk, self.relatorio.pk})
+
+    @override_settings(REPOSITORIO_CACHE_BUSCA=True)
+    def test_ou_em_minusculas_equivale_ao_operador_com_cache(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        maiusculas, encontrados = self.buscar('ano:2019..2020 caverna OR gruta')
+        minusculas, encontrados_minusculas = self.buscar('ano:2019..2020 caverna or gruta')
+
+        # Mesma chave no cache (q normalizado em minúsculas) e mesma consulta compilada
+        self.assertEqual((maiusculas['X-Cache-Busca'], minusculas['X-Cache-Busca']), ('MISS', 'HIT'))
+        self.assertEqual(encontrados, {self.sapos.pk, self.gruta.pk})
+        self.assertEqual(encontrados_minusculas, encontrados)
+
+        cache.clear()
+        _, sem_cache = self.buscar('ano:2019..2020 caverna or gruta')
+        self.assertEqual(sem_cache, encontrados)
+
+    def test_consulta_invalida_exibe_mensagem(self):
+        response, encontrados = self.buscar('ano:2022..2019')
+        self.assertEqual(encontrados, set())
+        self.assertContains(response, 'Intervalo de anos invertido')
+
+        with self.assertRaises(ConsultaInvalida):
+            analisar(' '.join(f'termo{numero}' for numero in range(MAX_TERMOS + 1)))
+        with self.assertRaises(ConsultaInvalida):
+            analisar('(' * 10 + 'sapos')
+
+    def test_texto_sem_operadores_usa_a_busca_simples(self):
+        self.assertFalse(usa_sintaxe_avancada('fauna cavernícola http://exemplo.test'))
+        self.assertTrue(usa_sintaxe_avancada('fauna -morcegos'))
+        self.assertEqual(analisar('autor:silva (sapos OR "da gruta") -x').texto_livre, 'sapos or "da gruta"')
+
+
+@override_settings(REPOSITORIO_CACHE_BUSCA=True)
+class CacheResultadosTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        self.primeiro = self.criar_registro('Cavernas', data_publicacao=date(2020, 1, 1))
+        self.segundo = self.criar_registro('Grutas', data_publicacao=date(2021, 1, 1))
+
+    def test_acerto_busca_apenas_as_linhas_da_pagina(self):
+        params = {'ano': '2020 ', 'page': 1}
+        primeira = self.client.get(reverse('core:repositorio'), params)
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = self.client.get(reverse('core:repositorio'), {'ano': '2020'})
+
+        self.assertEqual(primeira['X-Cache-Busca'], 'MISS')
+        self.assertEqual(segunda['X-Cache-Busca'], 'HIT')
+        self.assertEqual([r.pk for r in segunda.context['registros']], [self.primeiro.pk])
+        self.assertEqual(segunda.context['facetas'], primeira.context['facetas'])
+        sql = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('GROUP BY', sql)
+
+    def test_parametros_que_a_busca_nao_le_nao_criam_entradas(self):
+        self.client.get(reverse('core:repositorio'), {'ano': '2020'})
+        respostas = [
+            self.client.get(reverse('core:repositorio'), params)
+            for params in (
+                {'ano': '2020', 'utm_source': 'boletim'},
+                {'ano': ['2020', 'abc'], 'xyz': '1'},
+                {'ano': '2020', 'ordenar_por': 'inexistente'},
+            )
+        ]
+
+        self.assertEqual([r['X-Cache-Busca'] for r in respostas], ['HIT', 'HIT', 'HIT'])
+        chaves = {chave_resultado(normalizar_parametros(r.wsgi_request.GET, RepositorioView.ORDENACOES)) for r in respostas}
+        self.assertEqual(len(chaves), 1)
+
+    def test_alteracao_do_catalogo_invalida(self):
+        self.client.get(reverse('core:repositorio'))
+        with self.captureOnCommitCallbacks(execute=True):
+            novo = self.criar_registro('Dolinas', data_publicacao=date(2022, 1, 1))
+
+        response = self.client.get(reverse('core:repositorio'))
+
+        self.assertEqual(response['X-Cache-Busca'], 'MISS')
+        self.assertEqual(response.context['registros'][0].pk, novo.pk)
+
+    def test_estatisticas(self):
+        self.client.get(reverse('core:repositorio'))
+        self.client.get(reverse('core:repositorio'))
+        self.client.force_login(self.user)
+
+        dados = self.client.get(reverse('repositorio:cache_busca_estatisticas')).json()
+
+        self.assertEqual((dados['acertos'], dados['falhas']), (1, 1))
+
+
+class AutocompleteTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        descartar_tabelas_auxiliares()
+        self.addCleanup(descartar_tabelas_auxiliares)
+        super().setUp()
+
+    def test_autores_por_prefixo_sem_acento(self):
+        joao = Autor.objects.create(nome='João Silva')
+        Autor.objects.create(nome='Maria João')
+        Autor.objects.create(nome='Joana Inativa', ativo=False)
+
+        response = self.client.get(reverse('core:autocomplete_autores'), {'q': 'joa'})
+
+        self.assertEqual(response.json(), {
+            'resultados': [{'id': joao.pk, 'nome': 'João Silva'}], 'pagina': 1, 'mais': False,
+        })
+        self.assertIn('max-age', response['Cache-Control'])
+
+    def test_paginacao(self):
+        Tag.objects.bulk_create([Tag(nome=f'Caverna {numero:02d}') for numero in range(25)])
+
+        primeira = self.client.get(reverse('core:autocomplete_tags'), {'q': 'cav'}).json()
+        segunda = self.client.get(reverse('core:autocomplete_tags'), {'q': 'cav', 'page': 2}).json()
+
+        self.assertTrue(primeira['mais'])
+        self.assertEqual(len(primeira['resultados']), 20)
+        self.assertFalse(segunda['mais'])
+        self.assertEqual([item['nome'] for item in segunda['resultados']], [f'Caverna {n}' for n in range(20, 25)])
+
+    def test_etag_e_cache(self):
+        Autor.objects.create(nome='Morcego Silva')
+        url = reverse('core:autocomplete_autores')
+
+        response = self.client.get(url, {'q': 'morc'})
+        with self.assertNumQueries(0):
+            nao_modificado = self.client.get(url, {'q': 'morc'}, HTTP_IF_NONE_MATCH=response['ETag'])
+            em_cache = self.client.get(url, {'q': 'morc'})
+
+        self.assertEqual(nao_modificado.status_code, 304)
+        self.assertEqual(em_cache.content, response.content)
+
+        registrar_alteracao()
+        self.assertNotEqual(self.client.get(url, {'q': 'morc'})['ETag'], response['ETag'])
+
+    def test_subprojetos_do_projeto(self):
+        outro = Subprojeto.objects.create(
+            projeto=Projeto.objects.create(nome='Outro Projeto'), nome='Subprojeto Outro',
+        )
+
+        response = self.client.get(reverse('core:autocomplete_subprojetos'), {'q': 'sub', 'projeto_id': self.projeto.pk})
+        todos = self.client.get(reverse('core:autocomplete_subprojetos'), {'q': 'sub'})
+
+        self.assertEqual([item['id'] for item in response.json()['resultados']], [self.subprojeto.pk])
+        self.assertEqual({item['id'] for item in todos.json()['resultados']}, {self.subprojeto.pk, outro.pk})
+
+    def test_filtro_lista_apenas_autores_selecionados(self):
+        selecionado = Autor.objects.create(nome='Autor Selecionado')
+        Autor.objects.create(nome='Autor Fora da Página')
+
+        response = self.client.get(reverse('core:repositorio'), {'autor': selecionado.pk})
+
+        self.assertContains(response, 'Autor Selecionado')
+        self.assertNotContains(response, 'Autor Fora da Página')
+        self.assertContains(response, reverse('core:autocomplete_autores'))
+
+
+class LookupsSemAcentoTest(TestCase):
+    def test_sem_acento_e_similar(self):
+        Autor.objects.create(nome='João Amazônia')
+        Autor.objects.create(nome='Maria Silva')
+
+        self.assertEqual(Autor.objects.filter(nome__sem_acento='AMAZONIA').count(), 1)
+        self.assertEqual(Autor.objects.filter(nome__similar='joao').count(), 1)
+        self.assertEqual(Autor.objects.filter(nome__sem_acento='100%').count(), 0)
+
+
+@override_settings(REPOSITORIO_PAGINACAO_CURSOR=True)
+class PaginacaoCursorTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        super().setUp()
+        datas = [date(2020, 1, 1), date(2021, 6, 1), None]
+        for indice in range(25):
+            self.criar_registro(f'Registro {indice % 4}', data_publicacao=datas[indice % 3])
+
+    def percorrer(self, params):
+        ids, paginas = [], []
+        response = self.client.get(reverse('core:repositorio'), params)
+        while True:
+            page = response.context['page_obj']
+            paginas.append(page)
+            ids.extend(r.pk for r in response.context['registros'])
+            if not page.has_next():
+                return ids, paginas, response
+            response = self.client.get(reverse('core:repositorio'), {**params, 'page': page.next_page_number()})
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        ids, paginas, response = self.percorrer({})
+
+        esperado = sorted(
+            Registro.objects.all(),
+            key=lambda r: (r.data_publicacao is None, -(r.data_publicacao or date.min).toordinal(), r.titulo, r.pk),
+        )
+        self.assertEqual(ids, [r.pk for r in esperado])
+        self.assertEqual([p.number for p in paginas], [1, 2, 3])
+
+        # Volta uma página pelo cursor anterior
+        anterior = self.client.get(reverse('core:repositorio'), {'page': paginas[-1].previous_page_number()})
+        self.assertEqual([r.pk for r in anterior.context['registros']], ids[10:20])
+
+    def test_ordenacao_por_titulo_e_pagina_numerada(self):
+        ids, _, _ = self.percorrer({'ordenar_por': 'titulo'})
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+
+        response = self.client.get(reverse('core:repositorio'), {'ordenar_por': 'titulo', 'page': 3})
+        self.assertEqual([r.pk for r in response.context['registros']], ids[20:])
+
+    def test_templates_nao_contam_os_registros(self):
+        self.client.force_login(self.user)
+        primeira = self.client.get(reverse('repositorio:lista'))
+        cursor = primeira.context['page_obj'].next_page_number()
+
+        for url, params in ((reverse('core:repositorio'), {}), (reverse('repositorio:lista'), {'page': cursor})):
+            with self.subTest(url=url, params=params):
+                with CaptureQueriesContext(connection) as consultas:
+                    response = self.client.get(url, params)
+
+                # Nem COUNT(*) do paginador, nem total, número de páginas ou link da última
+                self.assertTrue(response.context['paginacao_cursor'])
+                self.assertFalse(any('__count' in consulta['sql'] for consulta in consultas.captured_queries))
+                conteudo = response.content.decode()
+                self.assertNotIn('Última', conteudo)
+                self.assertNotIn(' de 3', conteudo)
+                self.assertIn(f"Página {response.context['page_obj'].number}\n", conteudo)
+
+    @override_settings(REPOSITORIO_PAGINACAO_CURSOR=False)
+    def test_sem_cursor_mantem_numeros_e_ultima_pagina(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('core:repositorio'))
+        conteudo = response.content.decode()
+        self.assertFalse(response.context['paginacao_cursor'])
+        self.assertIn('(25 registros)', conteudo)
+        self.assertIn('href="?page=2">2</a>', conteudo)
+        self.assertIn('href="?page=3">3</a>', conteudo)
+
+        response = self.client.get(reverse('repositorio:lista'))
+        conteudo = response.content.decode()
+        self.assertIn('Última', conteudo)
+        self.assertIn('Página 1 de 2', ' '.join(conteudo.split()))
+
+    def test_cursor_invalido_retorna_404(self):
+        response = self.client.get(reverse('core:repositorio'), {'page': 'cursor-adulterado'})
+        self.assertEqual(response.status_code, 404)
+
@@ -0,0 +1,84 @@
+import io
+from datetime import date
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.repositorio.models.repositorio import (
+    Autor,
+    Projeto,
+    RegistroDocumento,
+    Subprojeto,
+    Tag,
+)
+from apps.repositorio.tests.base import RegistroBuscaBaseTest
+
+
+class RegistroDocumentoTest(RegistroBuscaBaseTest):
+    def test_documento_acompanha_registro_e_relacoes(self):
+        registro = self.criar_registro('Morcegos', data_publicacao=date(2019, 3, 1))
+        autor = Autor.objects.create(nome='Ana')
+        registro.autores.add(autor)
+        registro.tags.add(Tag.objects.create(nome='quirópteros'))
+
+        documento = RegistroDocumento.objects.get(pk=registro.pk)
+        self.assertEqual(documento.autores_nomes, ['Ana'])
+        self.assertEqual(documento.tags_nomes, ['quirópteros'])
+        self.assertEqual(documento.projeto_nome, 'Projeto Busca')
+        self.assertEqual(documento.ano, 2019)
+        self.assertTrue(documento.publico)
+
+        autor.nome = 'Ana Souza'
+        autor.save()
+        self.status.is_public = False
+        self.status.save()
+        documento.refresh_from_db()
+        self.assertEqual(documento.autores_nomes, ['Ana Souza'])
+        self.assertFalse(documento.publico)
+
+        registro.delete()
+        self.assertFalse(RegistroDocumento.objects.exists())
+
+    def test_projeto_do_registro_acompanha_o_subprojeto(self):
+        registro = self.criar_registro('Morcegos')
+        self.assertEqual(registro.projeto_id, self.projeto.pk)
+
+        outro_projeto = Projeto.objects.create(nome='Outro Projeto', ativo=True)
+        outro_subprojeto = Subprojeto.objects.create(projeto=outro_projeto, nome='Outro Subprojeto', ativo=True)
+        registro.subprojeto = outro_subprojeto
+        registro.save(update_fields=['subprojeto'])
+        registro.refresh_from_db()
+        self.assertEqual(registro.projeto_id, outro_projeto.pk)
+
+        # Subprojeto movido de projeto: registros e documentos de leitura acompanham
+        outro_subprojeto.projeto = self.projeto
+        outro_subprojeto.save()
+        registro.refresh_from_db()
+        self.assertEqual(registro.projeto_id, self.projeto.pk)
+        self.assertEqual(RegistroDocumento.objects.get(pk=registro.pk).projeto_nome, 'Projeto Busca')
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('repositorio:lista'), {'projeto': self.projeto.pk})
+        self.assertEqual([r.pk for r in response.context['registros']], [registro.pk])
+
+    def test_reconstrucao_completa(self):
+        registro = self.criar_registro('Espeleotemas')
+        RegistroDocumento.objects.all().delete()
+
+        call_command('reconstruir_documentos', stdout=io.StringIO())
+
+        self.assertEqual(RegistroDocumento.objects.get().titulo, registro.titulo)
+
+    def test_listagem_publica_le_apenas_o_documento(self):
+        registro = self.criar_registro('Guano')
+        registro.autores.add(Autor.objects.create(nome='Bruno'))
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('core:repositorio'))
+
+        self.assertContains(response, 'Bruno')
+        sql = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+        # Autores vêm da lista achatada, sem prefetch com join na tabela M2M
+        self.assertNotIn('INNER JOIN "repositorio_registro_autores"', sql)
@@ -0,0 +1,118 @@
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+
+from apps.repositorio.models.repositorio import Registro
+from apps.repositorio.tests.base import RegistroBuscaBaseTest
+
+
+class StorageAssinado(FileSystemStorage):
+    """Storage local com `urls()` em lote, como o MediaStorage; `url()` avulsa não deve ser usada."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lotes = []
+
+    def urls(self, names):
+        self.lotes.append(list(names))
+        return {name: f'https://assinada.test/{name}' for name in names}
+
+    def url(self, name):
+        raise AssertionError('URL gerada objeto a objeto')
+
+
+class DownloadArquivoTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        configuracao = self.settings(MEDIA_ROOT=media_root.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.dados = bytes(range(256)) * 40
+        self.registro = self.criar_registro('Com arquivo', arquivo=SimpleUploadedFile('mapa.pdf', self.dados))
+        self.url = reverse('core:view_file', args=[self.registro.pk])
+
+    def test_validadores_e_resposta_condicional(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.dados)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        etag, ultima_modificacao = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=ultima_modificacao).status_code, 304)
+
+        # Alterar o registro muda o ETag
+        self.registro.titulo = 'Outro título'
+        self.registro.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_intervalo_unico(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.dados)}')
+        self.assertEqual(b''.join(response.streaming_content), self.dados[100:200])
+
+        sufixo = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(sufixo.streaming_content), self.dados[-10:])
+
+    def test_varios_intervalos(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9, 500-509')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        corpo = b''.join(response.streaming_content)
+        self.assertEqual(len(corpo), int(response['Content-Length']))
+        self.assertIn(self.dados[0:10], corpo)
+        self.assertIn(f'Content-Range: bytes 500-509/{len(self.dados)}'.encode() + b'\r\n\r\n' + self.dados[500:510], corpo)
+
+    def test_intervalo_invalido_ou_desatualizado(self):
+        fora = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.dados)}-')
+        self.assertEqual(fora.status_code, 416)
+        self.assertEqual(fora['Content-Range'], f'bytes */{len(self.dados)}')
+
+        desatualizado = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"antigo"')
+        self.assertEqual(desatualizado.status_code, 200)
+
+    def test_download_como_anexo(self):
+        response = self.client.get(reverse('core:registro_download', args=[self.registro.pk]), HTTP_RANGE='bytes=0-9')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="mapa.pdf"')
+
+    @override_settings(REPOSITORIO_ENTREGA_ARQUIVOS='x-accel-redirect', REPOSITORIO_ENTREGA_PREFIXO_INTERNO='/interno/')
+    def test_entrega_delegada_ao_nginx(self):
+        response = self.client.get(reverse('core:registro_download', args=[self.registro.pk]), HTTP_RANGE='bytes=0-9')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/interno/{self.registro.arquivo.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="mapa.pdf"')
+        # Validadores continuam a cargo do Django
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    @override_settings(REPOSITORIO_ENTREGA_ARQUIVOS='x-sendfile')
+    def test_entrega_delegada_ao_apache(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['X-Sendfile'], self.registro.arquivo.path)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_detalhe_e_edicao_usam_a_assinatura_em_lote(self):
+        storage = StorageAssinado(location=self.registro.arquivo.storage.location)
+        self.client.force_login(self.user)
+
+        with mock.patch.object(Registro._meta.get_field('arquivo'), 'storage', storage):
+            for nome in ('repositorio:detalhe', 'repositorio:editar'):
+                with self.subTest(nome=nome):
+                    response = self.client.get(reverse(nome, args=[self.registro.pk]))
+                    self.assertContains(response, f'href="https://assinada.test/{self.registro.arquivo.name}"')
+
+        self.assertEqual(storage.lotes, [[self.registro.arquivo.name]] * 2)
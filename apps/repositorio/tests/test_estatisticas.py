@@ -0,0 +1,92 @@
+import io
+from datetime import date
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from apps.repositorio.models.repositorio import (
+    AreaTematica,
+    Autor,
+    Projeto,
+    ProjetoEstatistica,
+    Status,
+    Subprojeto,
+    TipoDocumento,
+)
+from apps.repositorio.tests.base import RegistroBuscaBaseTest
+
+
+class EstatisticasProjetoTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        super().setUp()
+        self.publicado = Status.objects.create(nome='PUBLICADO', ativo=True, is_public=True)
+        self.artigo = TipoDocumento.objects.create(nome='ARTIGO CIENTÍFICO', ativo=True)
+
+    def estatistica(self, projeto=None):
+        return ProjetoEstatistica.objects.get(projeto=projeto or self.projeto)
+
+    def test_atualizada_apos_o_commit_das_alteracoes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            registro = self.criar_registro('Artigo', status=self.publicado, tipo_documento=self.artigo)
+            registro.autores.add(Autor.objects.create(nome='Ana'), Autor.objects.create(nome='Bia'))
+            self.criar_registro('Rascunho', tipo_documento=TipoDocumento.objects.create(nome='Mapa', ativo=True))
+
+        estatistica = self.estatistica()
+        self.assertEqual(estatistica.producoes_academicas, 2)
+        self.assertEqual(estatistica.producoes_publicadas, 1)
+        self.assertEqual(estatistica.artigos_cientificos, 1)
+        self.assertEqual(estatistica.autores_unicos, 2)
+        self.assertEqual(estatistica.subprojetos_ativos, 1)
+
+        # Troca de subprojeto: os dois projetos são recalculados
+        outro = Projeto.objects.create(nome='Outro', ativo=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            registro.subprojeto = Subprojeto.objects.create(projeto=outro, nome='Sub', ativo=True)
+            registro.save()
+        self.assertEqual(self.estatistica().producoes_academicas, 1)
+        self.assertEqual(self.estatistica().autores_unicos, 0)
+        self.assertEqual(self.estatistica(outro).producoes_publicadas, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registro.delete()
+        self.assertEqual(self.estatistica(outro).producoes_academicas, 0)
+
+    def test_pagina_tcce_le_a_tabela_agregada(self):
+        self.criar_registro('Artigo', status=self.publicado, tipo_documento=self.artigo)
+        call_command('recalcular_estatisticas', stdout=io.StringIO())
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('core:tcce'))
+
+        self.assertEqual(response.context['estatisticas_projetos'][self.projeto.pk]['producoes_publicadas'], 1)
+        self.assertEqual(set(response.context['tcce3']), set(response.context['tcce1']))
+
+    def test_api_de_estatisticas_com_etag(self):
+        area = AreaTematica.objects.create(nome='Biologia', ativo=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            registro = self.criar_registro('Artigo', data_publicacao=date(2020, 1, 1), area_tematica=area)
+            registro.autores.add(Autor.objects.create(nome='Ana'))
+            self.criar_registro('Antigo', data_publicacao=date(2010, 1, 1))
+
+        url = reverse('core:estatisticas')
+        response = self.client.get(url, {'ano_inicio': '2015'})
+        dados = response.json()
+        self.assertEqual(dados['series'], [{
+            'ano': 2020, 'projeto': self.projeto.pk, 'area_tematica': area.pk,
+            'tipo_documento': self.tipo_documento.pk, 'registros': 1, 'autores': 1,
+        }])
+        self.assertEqual(dados['totais'], {'registros': 1})
+        self.assertEqual(dados['projetos'][0]['producoes_academicas'], 2)
+        self.assertIn('max-age=', response['Cache-Control'])
+
+        # Revalidação sem mudanças não consulta o banco
+        with self.assertNumQueries(0):
+            revalidada = self.client.get(url, {'ano_inicio': '2015'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidada.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_registro('Novo', data_publicacao=date(2021, 1, 1))
+        atualizada = self.client.get(url, {'ano_inicio': '2015'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(atualizada.status_code, 200)
+        self.assertEqual(atualizada.json()['totais'], {'registros': 2})
+
@@ -0,0 +1,377 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from unittest import skipUnless
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.repositorio.export_jobs import (
+    limpar_exportacoes,
+    processar_exportacao,
+    processar_pendentes,
+    recuperar_abandonadas,
+)
+from apps.repositorio.exports import TAMANHO_BLOCO, NenhumArquivoLido, gerar_zip
+from apps.repositorio.models.repositorio import ExportacaoArquivos
+from apps.repositorio.search.bitmap import registrar_alteracao
+from apps.repositorio.tests.base import RegistroBuscaBaseTest
+
+try:
+    import boto3
+    from moto import mock_aws
+    from storages.backends.s3 import S3Storage
+except ImportError:  # moto/django-storages são opcionais no ambiente de testes
+    mock_aws = None
+
+
+class StorageLento(FileSystemStorage):
+    """Storage local com latência artificial por abertura (simula um storage remoto)."""
+
+    def __init__(self, *args, latencia=0.05, travados=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencia = latencia
+        self.travados = set(travados)
+        self.liberar = threading.Event()
+        self.abertos = 0
+        self._trava = threading.Lock()
+
+    def _open(self, name, mode='rb'):
+        if name in self.travados:
+            self.liberar.wait(5)
+        time.sleep(self.latencia)
+        with self._trava:
+            self.abertos += 1
+        return super()._open(name, mode)
+
+
+class _LeituraInterrompida:
+    """
+    Arquivo que entrega a primeira leitura e falha nas seguintes (conexão
+    perdida no meio) ou, com `travar`, fica parado até o evento ser liberado.
+    """
+
+    def __init__(self, arquivo, travar=None):
+        self.arquivo = arquivo
+        self.travar = travar
+        self.leituras = 0
+
+    def read(self, tamanho=-1):
+        self.leituras += 1
+        if self.leituras > 1:
+            if self.travar is None:
+                raise OSError('conexão interrompida')
+            self.travar.wait(5)
+        return self.arquivo.read(tamanho)
+
+    def close(self):
+        self.arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class StorageInterrompido(FileSystemStorage):
+    """
+    Storage local cujos arquivos em `interrompidos` falham, e os em `travados`
+    param, depois da leitura antecipada.
+    """
+
+    def __init__(self, *args, interrompidos=(), travados=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interrompidos = set(interrompidos)
+        self.travados = set(travados)
+        self.liberar = threading.Event()
+
+    def _open(self, name, mode='rb'):
+        arquivo = super()._open(name, mode)
+        if name in self.interrompidos:
+            return _LeituraInterrompida(arquivo)
+        if name in self.travados:
+            return _LeituraInterrompida(arquivo, travar=self.liberar)
+        return arquivo
+
+
+def ler_zip(blocos):
+    with zipfile.ZipFile(io.BytesIO(b''.join(blocos))) as zip_file:
+        return {nome: zip_file.read(nome) for nome in zip_file.namelist()}, zip_file.namelist()
+
+
+class GerarZipConcorrenteTest(SimpleTestCase):
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+
+    def criar_arquivos(self, storage, quantidade):
+        arquivos = []
+        for i in range(quantidade):
+            nome = storage.save(f'registros/arquivo-{i:02d}.pdf', ContentFile(f'%PDF-{i}'.encode() * 100))
+            arquivos.append((f'projeto/sub/arquivo-{i:02d}.pdf', nome))
+        return arquivos
+
+    def test_ordem_e_conteudo_preservados(self):
+        storage = StorageLento(location=self.diretorio, latencia=0.01)
+        arquivos = self.criar_arquivos(storage, 12)
+
+        conteudo, ordem = ler_zip(gerar_zip(arquivos, storage, concorrencia=4))
+
+        self.assertEqual(ordem, [caminho for caminho, _ in arquivos])
+        self.assertEqual(conteudo['projeto/sub/arquivo-07.pdf'], b'%PDF-7' * 100)
+
+    def test_leituras_em_paralelo_reduzem_o_tempo(self):
+        storage = StorageLento(location=self.diretorio, latencia=0.05)
+        arquivos = self.criar_arquivos(storage, 16)
+
+        inicio = time.monotonic()
+        sequencial = ler_zip(gerar_zip(arquivos, storage, concorrencia=1))[0]
+        tempo_sequencial = time.monotonic() - inicio
+
+        inicio = time.monotonic()
+        paralelo = ler_zip(gerar_zip(arquivos, storage, concorrencia=8))[0]
+        tempo_paralelo = time.monotonic() - inicio
+
+        self.assertEqual(sequencial, paralelo)
+        # 16 x 50 ms sequenciais contra ~2 rodadas de 50 ms com 8 leituras simultâneas
+        self.assertLess(tempo_paralelo, tempo_sequencial / 2)
+
+    def test_arquivo_lento_ou_ausente_e_ignorado(self):
+        storage = StorageLento(location=self.diretorio, latencia=0, travados={'registros/arquivo-01.pdf'})
+        self.addCleanup(storage.liberar.set)
+        arquivos = self.criar_arquivos(storage, 4)
+        arquivos.insert(2, ('projeto/sub/ausente.pdf', 'registros/ausente.pdf'))
+
+        with self.assertLogs('apps.repositorio.exports', 'ERROR') as logs:
+            _, ordem = ler_zip(gerar_zip(arquivos, storage, concorrencia=3, timeout=0.2))
+
+        self.assertEqual(ordem, ['projeto/sub/arquivo-00.pdf', 'projeto/sub/arquivo-02.pdf', 'projeto/sub/arquivo-03.pdf'])
+        self.assertEqual(len(logs.output), 2)
+
+    def test_falha_no_meio_do_arquivo_descarta_so_a_entrada(self):
+        storage = StorageInterrompido(location=self.diretorio, interrompidos={'registros/arquivo-01.pdf'})
+        arquivos = self.criar_arquivos(storage, 3)
+
+        with self.assertLogs('apps.repositorio.exports', 'ERROR') as logs:
+            conteudo, ordem = ler_zip(gerar_zip(arquivos, storage, concorrencia=2))
+
+        self.assertEqual(ordem, ['projeto/sub/arquivo-00.pdf', 'projeto/sub/arquivo-02.pdf'])
+        self.assertEqual(conteudo['projeto/sub/arquivo-02.pdf'], b'%PDF-2' * 100)
+        self.assertIn('conexão interrompida', logs.output[0])
+
+    def test_arquivo_que_trava_no_meio_respeita_o_timeout(self):
+        storage = StorageInterrompido(location=self.diretorio, travados={'registros/arquivo-01.pdf'})
+        self.addCleanup(storage.liberar.set)
+        arquivos = self.criar_arquivos(storage, 3)
+
+        for concorrencia in (1, 3):
+            with self.subTest(concorrencia=concorrencia):
+                inicio = time.monotonic()
+                with self.assertLogs('apps.repositorio.exports', 'ERROR') as logs:
+                    conteudo, ordem = ler_zip(gerar_zip(arquivos, storage, concorrencia=concorrencia, timeout=0.2))
+
+                self.assertLess(time.monotonic() - inicio, 2)
+                self.assertEqual(ordem, ['projeto/sub/arquivo-00.pdf', 'projeto/sub/arquivo-02.pdf'])
+                self.assertEqual(conteudo['projeto/sub/arquivo-02.pdf'], b'%PDF-2' * 100)
+                self.assertIn('tempo esgotado', logs.output[0])
+
+    def test_nenhum_arquivo_legivel_falha_antes_do_primeiro_bloco(self):
+        storage = StorageLento(location=self.diretorio, latencia=0)
+        arquivos = [('projeto/sub/ausente.pdf', 'registros/ausente.pdf')]
+
+        with self.assertLogs('apps.repositorio.exports', 'ERROR'):
+            with self.assertRaises(NenhumArquivoLido):
+                next(gerar_zip(arquivos, storage, concorrencia=2))
+
+    def test_janela_limitada_a_concorrencia(self):
+        storage = StorageLento(location=self.diretorio, latencia=0)
+        arquivos = self.criar_arquivos(storage, 20)
+
+        blocos = gerar_zip(arquivos, storage, concorrencia=3)
+        next(blocos)
+        time.sleep(0.05)
+
+        # Só os arquivos da janela de leitura antecipada foram abertos
+        self.assertLessEqual(storage.abertos, 4)
+        blocos.close()
+
+
+@skipUnless(mock_aws, 'moto e django-storages são necessários para o teste com S3')
+class GerarZipS3Test(SimpleTestCase):
+    def setUp(self):
+        simulacao = mock_aws()
+        simulacao.start()
+        self.addCleanup(simulacao.stop)
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='repositorio-teste')
+        self.storage = S3Storage(
+            bucket_name='repositorio-teste',
+            region_name='us-east-1',
+            access_key='teste',
+            secret_key='teste',
+        )
+
+    def test_exportacao_a_partir_do_s3(self):
+        arquivos = []
+        for i in range(10):
+            nome = self.storage.save(f'registros/s3-{i}.pdf', ContentFile(bytes([i]) * 2048))
+            arquivos.append((f'projeto/sub/s3-{i}.pdf', nome))
+        arquivos.append(('projeto/sub/removido.pdf', 'registros/removido.pdf'))
+
+        with self.assertLogs('apps.repositorio.exports', 'ERROR'):
+            conteudo, ordem = ler_zip(gerar_zip(arquivos, self.storage, concorrencia=4))
+
+        self.assertEqual(ordem, [f'projeto/sub/s3-{i}.pdf' for i in range(10)])
+        self.assertEqual(conteudo['projeto/sub/s3-3.pdf'], bytes([3]) * 2048)
+
+
+class ExportacaoFiltradaTest(RegistroBuscaBaseTest):
+    """Download filtrado da listagem de gestão, lido do modelo de leitura."""
+
+    def test_exportacao_le_o_documento(self):
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            self.criar_registro('Com arquivo', arquivo=SimpleUploadedFile('mapa.pdf', b'%PDF-1.4'))
+            self.client.force_login(self.user)
+
+            response = self.client.get(reverse('repositorio:download_filtrados'))
+
+            conteudo = b''.join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(conteudo)) as zip_file:
+            self.assertEqual(zip_file.namelist(), ['projeto-busca/subprojeto-busca/mapa.pdf'])
+
+    def test_exportacao_em_fluxo(self):
+        dados = os.urandom(5 * TAMANHO_BLOCO)
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            self.criar_registro('Grande', arquivo=SimpleUploadedFile('grande.pdf', dados))
+            perdido = self.criar_registro('Perdido', arquivo=SimpleUploadedFile('perdido.pdf', b'%PDF'))
+            os.remove(perdido.arquivo.path)
+            self.client.force_login(self.user)
+
+            response = self.client.get(reverse('repositorio:download_filtrados'))
+            blocos = list(response.streaming_content)
+
+        self.assertGreater(len(blocos), 5)
+        self.assertLess(max(len(bloco) for bloco in blocos), 2 * TAMANHO_BLOCO)
+        with zipfile.ZipFile(io.BytesIO(b''.join(blocos))) as zip_file:
+            self.assertEqual(zip_file.namelist(), ['projeto-busca/subprojeto-busca/grande.pdf'])
+            self.assertEqual(zip_file.read('projeto-busca/subprojeto-busca/grande.pdf'), dados)
+
+    def test_nenhum_arquivo_legivel_redireciona_com_erro(self):
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            perdido = self.criar_registro('Perdido', arquivo=SimpleUploadedFile('perdido.pdf', b'%PDF'))
+            os.remove(perdido.arquivo.path)
+            self.client.force_login(self.user)
+
+            with self.assertLogs('apps.repositorio.exports', 'ERROR'):
+                response = self.client.get(reverse('repositorio:download_filtrados'), follow=True)
+
+        self.assertRedirects(response, f"{reverse('repositorio:lista')}?")
+        self.assertEqual(
+            [str(mensagem) for mensagem in response.context['messages']],
+            ['Nenhum arquivo pôde ser lido com sucesso.'],
+        )
+
+
+@override_settings(REPOSITORIO_EXPORTACAO_WORKERS=0)
+class ExportacaoSegundoPlanoTest(RegistroBuscaBaseTest):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        configuracao = self.settings(MEDIA_ROOT=media_root.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.criar_registro('Com arquivo', arquivo=SimpleUploadedFile('mapa.pdf', b'%PDF-1.4'))
+        self.client.force_login(self.user)
+
+    def solicitar(self, **params):
+        url = f"{reverse('repositorio:exportacao_solicitar')}?{urlencode(params)}"
+        return self.client.post(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_pedido_processado_e_reaproveitado(self):
+        pedido = self.solicitar(q='  Arquivo ')
+        self.assertEqual(pedido.status_code, 202)
+        self.assertEqual(pedido.json()['status'], ExportacaoArquivos.PENDENTE)
+
+        processar_exportacao(ExportacaoArquivos.objects.get().pk)
+
+        status = self.client.get(pedido.json()['url_status']).json()
+        self.assertEqual((status['status'], status['progresso'], status['total']), ('concluida', 100, 1))
+
+        # Mesmos filtros normalizados: o ZIP já gerado é servido sem novo processamento
+        repetido = self.solicitar(q='arquivo')
+        self.assertEqual(repetido.status_code, 200)
+        self.assertEqual(repetido.json()['chave'], pedido.json()['chave'])
+        self.assertEqual(ExportacaoArquivos.objects.count(), 1)
+
+        download = self.client.get(repetido.json()['url_download'])
+        with zipfile.ZipFile(io.BytesIO(b''.join(download.streaming_content))) as zip_file:
+            self.assertEqual(zip_file.namelist(), ['projeto-busca/subprojeto-busca/mapa.pdf'])
+
+    def test_alteracao_do_catalogo_gera_nova_exportacao(self):
+        primeira = self.solicitar().json()['chave']
+        registrar_alteracao()
+        segunda = self.solicitar().json()['chave']
+
+        self.assertNotEqual(primeira, segunda)
+        self.assertEqual(ExportacaoArquivos.objects.count(), 2)
+
+    def test_comando_processa_pendentes(self):
+        self.solicitar()
+        saida = io.StringIO()
+
+        call_command('processar_exportacoes', stdout=saida)
+
+        exportacao = ExportacaoArquivos.objects.get()
+        self.assertEqual(exportacao.status, ExportacaoArquivos.CONCLUIDA)
+        self.assertGreater(exportacao.tamanho, 0)
+        self.assertIn('1 exportação(ões) processada(s).', saida.getvalue())
+
+    def test_exportacao_abandonada_volta_para_a_fila(self):
+        chave = self.solicitar().json()['chave']
+        # Worker assumiu a exportação e o processo foi reiniciado antes de terminar
+        ExportacaoArquivos.objects.filter(chave=chave).update(
+            status=ExportacaoArquivos.PROCESSANDO,
+            processados=3,
+            date_update=timezone.now() - timedelta(hours=1),
+        )
+
+        status = self.client.get(reverse('repositorio:exportacao_status', args=[chave])).json()
+        self.assertEqual((status['status'], status['processados']), (ExportacaoArquivos.PENDENTE, 0))
+
+        processar_pendentes()
+        self.assertEqual(ExportacaoArquivos.objects.get(chave=chave).status, ExportacaoArquivos.CONCLUIDA)
+
+    def test_abandonada_e_recuperada_pelo_comando_e_removida_pela_limpeza(self):
+        self.solicitar()
+        antiga = timezone.now() - timedelta(days=30)
+        ExportacaoArquivos.objects.update(status=ExportacaoArquivos.PROCESSANDO, date_update=antiga)
+
+        self.assertEqual(recuperar_abandonadas(), 1)
+        self.assertEqual(ExportacaoArquivos.objects.get().status, ExportacaoArquivos.PENDENTE)
+
+        ExportacaoArquivos.objects.update(status=ExportacaoArquivos.PROCESSANDO, date_create=antiga, date_update=antiga)
+        self.assertEqual(limpar_exportacoes(), 1)
+        self.assertFalse(ExportacaoArquivos.objects.exists())
+
+    def test_exportacao_em_andamento_nao_e_retomada(self):
+        chave = self.solicitar().json()['chave']
+        ExportacaoArquivos.objects.filter(chave=chave).update(status=ExportacaoArquivos.PROCESSANDO, processados=3)
+
+        status = self.client.get(reverse('repositorio:exportacao_status', args=[chave])).json()
+        self.assertEqual((status['status'], status['processados']), (ExportacaoArquivos.PROCESSANDO, 3))
@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from apps.accounts.models.user import User
 from apps.repositorio.forms.registro_form import RegistroForm
@@ -6,6 +8,7 @@ from apps.repositorio.models.repositorio import (
     AreaTematica,
     Autor,
     Projeto,
+    Registro,
     Status,
     Subprojeto,
     Tag,
@@ -14,7 +17,7 @@ from apps.repositorio.models.repositorio import (
 )
 
 
-class RegistroFormSpeciesFieldsTest(TestCase):
+class RegistroFormBaseTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
             email='formtester@example.com',
@@ -31,6 +34,8 @@ class RegistroFormSpeciesFieldsTest(TestCase):
         self.autor = Autor.objects.create(nome='Autor do Form', ativo=True)
         self.tag = Tag.objects.create(nome='Tag do Form', ativo=True)
 
+
+class RegistroFormSpeciesFieldsTest(RegistroFormBaseTest):
     def test_form_accepts_species_fields(self):
         form = RegistroForm(data={
             'titulo': 'Registro com espécie nova',
@@ -52,3 +57,72 @@ class RegistroFormSpeciesFieldsTest(TestCase):
         self.assertTrue(form.is_valid(), form.errors)
         self.assertTrue(form.cleaned_data['especie_nova'])
         self.assertEqual(form.cleaned_data['especie_informacoes'], 'Rana sp., 5 espécimes')
+
+
+class RegistroFormResolucaoNomesTest(RegistroFormBaseTest):
+    """Autores e tags novos resolvidos em lote e seletores com autocomplete."""
+
+    def dados_registro(self, **kwargs):
+        dados = {
+            'titulo': 'Registro com autores novos',
+            'subprojeto': self.subprojeto.pk,
+            'tipo_documento': self.tipo_documento.pk,
+            'area_tematica': self.area_tematica.pk,
+            'status': self.status.pk,
+            'tipo_publicacao': self.tipo_publicacao.pk,
+            'link_externo': 'https://exemplo.test/registro-form',
+            'ativo': 'on',
+        }
+        dados.update(kwargs)
+        return dados
+
+    def novo_formulario(self, **kwargs):
+        registro = Registro(usuario_criacao=self.user, usuario_ultima_atualizacao=self.user)
+        return RegistroForm(data=self.dados_registro(**kwargs), instance=registro)
+
+    def test_novos_nomes_resolvidos_em_lote(self):
+        form = self.novo_formulario(
+            autores=[self.autor.pk],
+            novos_autores='autor do form|Nova Autora|Outro Autor',
+            novas_tags='TAG DO FORM|Caverna',
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as contexto:
+            registro = form.save()
+
+        inserts = [query['sql'] for query in contexto.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(sum('"repositorio_autor"' in sql for sql in inserts), 1)
+        self.assertEqual(sum('"repositorio_registro_autores"' in sql for sql in inserts), 1)
+        self.assertEqual(sum('"repositorio_registro_tags"' in sql for sql in inserts), 1)
+        self.assertEqual(sum('"repositorio_registrodocumento"' in sql for sql in inserts), 1)
+
+        self.assertEqual(
+            sorted(registro.autores.values_list('nome', flat=True)),
+            ['Autor do Form', 'Nova Autora', 'Outro Autor'],
+        )
+        self.assertEqual(sorted(registro.tags.values_list('nome', flat=True)), ['Caverna', 'Tag do Form'])
+        self.assertEqual(Autor.objects.filter(nome__iexact='autor do form').count(), 1)
+        self.assertEqual(sorted(registro.documento.tags_nomes), ['Caverna', 'Tag do Form'])
+
+    def test_edicao_substitui_relacoes(self):
+        registro = self.novo_formulario(autores=[self.autor.pk], tags=[self.tag.pk]).save()
+        outro = Autor.objects.create(nome='Outro Autor', ativo=True)
+
+        form = RegistroForm(data=self.dados_registro(autores=[outro.pk], tags=[self.tag.pk]), instance=registro)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+        self.assertEqual(list(registro.autores.all()), [outro])
+        self.assertEqual(list(registro.tags.all()), [self.tag])
+        self.assertEqual(registro.documento.autores_nomes, ['Outro Autor'])
+
+    def test_seletores_listam_apenas_os_selecionados(self):
+        Autor.objects.create(nome='Autor Não Selecionado', ativo=True)
+        registro = self.novo_formulario(autores=[self.autor.pk], tags=[self.tag.pk]).save()
+
+        html = str(RegistroForm(instance=registro)['autores'])
+
+        self.assertIn('Autor do Form', html)
+        self.assertNotIn('Autor Não Selecionado', html)
+        self.assertIn('data-autocomplete-url', html)
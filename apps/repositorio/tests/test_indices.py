@@ -0,0 +1,73 @@
+from datetime import date
+from unittest import skipUnless
+
+from django.db import connection
+from django.http import QueryDict
+
+from apps.repositorio.exports import filtrar_documentos
+from apps.repositorio.models.repositorio import Registro, RegistroDocumento, Status
+from apps.repositorio.search.facets import FACETAS_DOCUMENTO, MotorFacetas
+from apps.repositorio.search.filters import filtrar_nome_tipo_documento
+from apps.repositorio.search.pagination import ordem_nulos_por_ultimo
+from apps.repositorio.tests.base import RegistroBuscaBaseTest
+from apps.repositorio.views.registro_views import _apply_filters_to_queryset
+
+
+class FacetaAnoTest(RegistroBuscaBaseTest):
+    def test_faceta_de_ano_do_registro_filtra_por_intervalo(self):
+        for i in range(4):
+            self.criar_registro(f'Registro {i}', data_publicacao=date(2018 + i, 6, 1))
+
+        registros = MotorFacetas({'ano': [2019, 2020]}).filtrar(Registro.objects.filter(ativo=True))
+
+        # Intervalos de datas (atendidos pelos índices), não EXTRACT por linha
+        self.assertNotIn('EXTRACT', str(registros.query).upper())
+        self.assertEqual(registros.count(), 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'planos de execução verificados apenas no PostgreSQL')
+class PlanoConsultasTest(RegistroBuscaBaseTest):
+    """As consultas mais frequentes usam os índices compostos/parciais (EXPLAIN)."""
+
+    ORDEM_PUBLICA = ('-data_publicacao', 'titulo', 'pk')
+
+    def setUp(self):
+        super().setUp()
+        rascunho = Status.objects.create(nome='Rascunho', ativo=True, is_public=False)
+        for i in range(6):
+            self.criar_registro(f'Registro {i}', data_publicacao=date(2018 + i % 3, 1 + i, 1))
+        self.criar_registro('Inativo', ativo=False)
+        self.criar_registro('Privado', status=rascunho)
+
+    def plano(self, queryset):
+        # Tabelas de teste são pequenas: sem isso o planejador prefere a varredura sequencial
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_busca_publica_usa_indices_parciais(self):
+        publicos = RegistroDocumento.objects.filter(publico=True)
+        ordem = ordem_nulos_por_ultimo(self.ORDEM_PUBLICA)
+
+        self.assertIn('regdoc_publico_data_idx', self.plano(publicos.order_by(*ordem)[:10]))
+        self.assertIn('regdoc_publico_titulo_idx', self.plano(publicos.order_by('titulo', 'pk')[:10]))
+
+        por_ano = MotorFacetas({'ano': [2019]}, FACETAS_DOCUMENTO).filtrar(publicos)
+        self.assertIn('regdoc_publico_ano_data_idx', self.plano(por_ano.order_by(*ordem)[:10]))
+
+    def test_listagem_de_gestao_usa_indices_de_criacao(self):
+        self.assertIn('registro_criacao_idx', self.plano(_apply_filters_to_queryset(QueryDict())[:10]))
+        self.assertIn(
+            'registro_projeto_criacao_idx',
+            self.plano(_apply_filters_to_queryset(QueryDict(f'projeto={self.projeto.pk}'))[:10]),
+        )
+        self.assertIn('regdoc_criacao_idx', self.plano(filtrar_documentos(QueryDict())[:10]))
+
+    def test_faceta_de_ano_do_registro_usa_indice_de_ativos(self):
+        registros = MotorFacetas({'ano': [2019]}).filtrar(Registro.objects.filter(ativo=True))
+        ordem = ordem_nulos_por_ultimo(('-data_publicacao', 'titulo', 'id'))
+        self.assertIn('registro_ativo_data_idx', self.plano(registros.order_by(*ordem)))
+
+    def test_filtro_por_nome_do_tipo_usa_indice_de_trigramas(self):
+        documentos = filtrar_nome_tipo_documento(RegistroDocumento.objects.filter(publico=True), 'artigo')
+        self.assertIn('repositorio_registrodocumento_tipo_documento_nome_trgm', self.plano(documentos))
@@ -0,0 +1,65 @@
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+try:
+    import boto3
+    from moto import mock_aws
+    from storages.backends.s3boto3 import S3Boto3Storage
+
+    from repositoriotcce.storage_backends import MediaStorage, janela_atual
+except ImportError:  # moto/django-storages são opcionais no ambiente de testes
+    mock_aws = None
+
+
+@skipUnless(mock_aws, 'moto e django-storages são necessários para o teste com S3')
+class UrlsAssinadasTest(SimpleTestCase):
+    def setUp(self):
+        simulacao = mock_aws()
+        simulacao.start()
+        self.addCleanup(simulacao.stop)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='repositorio-privado')
+        self.storage = MediaStorage(
+            bucket_name='repositorio-privado',
+            region_name='us-east-1',
+            access_key='teste',
+            secret_key='teste',
+            querystring_auth=True,
+            custom_domain=None,
+            default_acl='private',
+        )
+        self.nomes = [self.storage.save(f'registros/doc-{i}.pdf', ContentFile(b'%PDF')) for i in range(5)]
+
+    def test_url_reaproveitada_na_mesma_janela(self):
+        primeira = self.storage.url(self.nomes[0])
+
+        with mock.patch.object(S3Boto3Storage, 'url') as assinar:
+            segunda = self.storage.url(self.nomes[0])
+
+        self.assertEqual(primeira, segunda)
+        assinar.assert_not_called()
+        parametros = parse_qs(urlparse(primeira).query)
+        self.assertIn('Signature', parametros)
+        # Válida até o fim da janela seguinte
+        inicio, _ = janela_atual(self.storage.janela_assinatura)
+        self.assertAlmostEqual(int(parametros['Expires'][0]), inicio + 2 * self.storage.janela_assinatura, delta=2)
+
+    def test_pagina_assinada_em_lote(self):
+        self.storage.url(self.nomes[0])
+
+        with mock.patch.object(S3Boto3Storage, 'url', autospec=True, side_effect=S3Boto3Storage.url) as assinar:
+            urls = self.storage.urls(self.nomes)
+
+        self.assertEqual(set(urls), set(self.nomes))
+        # Só os quatro que não estavam no cache são assinados
+        self.assertEqual(assinar.call_count, 4)
+
+    def test_janelas_alinhadas(self):
+        self.assertEqual(janela_atual(3600, agora=7200 + 10), (7200, 3590))
+        self.assertEqual(janela_atual(3600, agora=7200 + 3599)[0], 7200)
+        self.assertEqual(janela_atual(3600, agora=10800)[0], 10800)
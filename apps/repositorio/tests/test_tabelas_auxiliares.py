@@ -0,0 +1,93 @@
+from django.contrib import admin
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.repositorio.forms.registro_form import RegistroForm
+from apps.repositorio.lookup_tables import descartar_tabelas_auxiliares, tabelas_auxiliares
+from apps.repositorio.models.repositorio import (
+    AreaTematica,
+    Projeto,
+    ProjetoEstatistica,
+    Status,
+    Subprojeto,
+    TipoDocumento,
+    TipoPublicacao,
+)
+from apps.repositorio.search.versioning import versao_catalogo
+from apps.repositorio.tests.base import RegistroBuscaBaseTest
+
+
+class TabelasAuxiliaresTest(RegistroBuscaBaseTest):
+    TABELAS = [
+        model._meta.db_table
+        for model in (Projeto, Subprojeto, TipoDocumento, AreaTematica, Status, TipoPublicacao)
+    ]
+
+    def setUp(self):
+        descartar_tabelas_auxiliares()
+        self.addCleanup(descartar_tabelas_auxiliares)
+        super().setUp()
+        self.criar_registro('Registro publicado')
+
+    def consultas_nas_tabelas(self, contexto):
+        return [
+            query['sql'] for query in contexto.captured_queries
+            if any(f'FROM "{tabela}"' in query['sql'] for tabela in self.TABELAS)
+        ]
+
+    def test_listagens_nao_consultam_tabelas_auxiliares(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('core:repositorio'))
+
+        with CaptureQueriesContext(connection) as contexto:
+            publica = self.client.get(reverse('core:repositorio'))
+            gestao = self.client.get(reverse('repositorio:lista'))
+            RegistroForm().as_p()
+
+        self.assertEqual(self.consultas_nas_tabelas(contexto), [])
+        self.assertEqual(publica.context['category_mapping'], {'Artigos': self.tipo_documento.pk})
+        self.assertEqual(list(gestao.context['projetos']), [self.projeto])
+        self.assertContains(publica, 'Espeleologia (1)')
+
+    def test_alteracao_recarrega_o_registro(self):
+        self.client.get(reverse('core:repositorio'))
+        livro = TipoDocumento.objects.create(nome='Livro', ativo=True)
+        self.tipo_documento.ativo = False
+        self.tipo_documento.save()
+
+        response = self.client.get(reverse('core:repositorio'))
+
+        self.assertEqual(response.context['category_mapping'], {'Livros': livro.pk})
+        self.assertEqual(list(response.context['tipos_documento']), [livro])
+
+
+    def test_copia_expira_sem_mudanca_de_versao(self):
+        # Alteração feita por outro worker com LocMemCache: a versão deste processo não muda
+        Projeto.objects.bulk_create([Projeto(nome='Outro projeto', ativo=True)])
+
+        with override_settings(REPOSITORIO_TABELAS_AUXILIARES_TTL=3600):
+            tabelas = tabelas_auxiliares()
+            self.assertIs(tabelas_auxiliares(), tabelas)
+
+        with override_settings(REPOSITORIO_TABELAS_AUXILIARES_TTL=0):
+            recarregadas = tabelas_auxiliares()
+        self.assertIsNot(recarregadas, tabelas)
+        self.assertEqual(recarregadas.versao, tabelas.versao)
+        self.assertIn('Outro projeto', [projeto.nome for projeto in recarregadas.projetos])
+
+    def test_acoes_em_lote_do_admin_atualizam_dados_derivados(self):
+        self.client.get(reverse('core:repositorio'))
+        versao = versao_catalogo()
+        tipo_admin = admin.site._registry[TipoDocumento]
+        subprojeto_admin = admin.site._registry[Subprojeto]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tipo_admin.marcar_como_inativo(None, TipoDocumento.objects.filter(pk=self.tipo_documento.pk))
+            subprojeto_admin.marcar_como_inativo(None, Subprojeto.objects.filter(pk=self.subprojeto.pk))
+
+        response = self.client.get(reverse('core:repositorio'))
+        self.assertEqual(response.context['category_mapping'], {})
+        self.assertNotEqual(versao_catalogo(), versao)
+        self.assertEqual(ProjetoEstatistica.objects.get(projeto=self.projeto).subprojetos_ativos, 0)
@@ -0,0 +1,188 @@
+"""
+Extração do texto dos PDFs dos registros para a busca full-text.
+
+Depois de um upload de PDF, o registro é enfileirado (após o commit) num pool
+de threads do próprio processo (REPOSITORIO_EXTRACAO_TEXTO_WORKERS); com 0
+workers, fica para o comando `extrair_textos_arquivos`, que processa os
+pendentes em paralelo num pool de processos (a extração é só CPU).
+
+A extração é incremental pelo SHA-256 do arquivo: registros cujo
+`TextoArquivo.sha256` já é o do arquivo atual são ignorados, e um conteúdo já
+extraído para outro registro é copiado sem ler o PDF de novo. O texto entra no
+`search_vector` com peso D (abaixo de título, autores/tags e resumo).
+"""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+
+from apps.repositorio.models.repositorio import Registro, TextoArquivo
+from apps.repositorio.pdf_text import extracao_disponivel, extrair_texto_pdf
+from apps.repositorio.search.bitmap import registrar_alteracao
+from apps.repositorio.search.fulltext import atualizar_search_vector
+
+logger = logging.getLogger(__name__)
+
+MIME_PDF = 'application/pdf'
+
+_executor = None
+_trava = threading.Lock()
+
+
+def limite_caracteres():
+    return getattr(settings, 'REPOSITORIO_TEXTO_LIMITE_CARACTERES', 300000)
+
+
+def pendentes():
+    """PDFs sem texto extraído do arquivo atual."""
+    return (
+        Registro.objects.filter(arquivo_mime=MIME_PDF)
+        .exclude(arquivo_sha256='')
+        .exclude(texto_arquivo__sha256=F('arquivo_sha256'))
+    )
+
+
+def _texto_ja_extraido(sha256):
+    """Texto de outro registro com o mesmo arquivo (mesmo SHA-256), se houver."""
+    return (
+        TextoArquivo.objects.filter(sha256=sha256)
+        .exclude(status=TextoArquivo.ERRO)
+        .values_list('texto', 'status')
+        .first()
+    )
+
+
+def _gravar(registro_id, sha256, texto='', erro=''):
+    if erro:
+        status = TextoArquivo.ERRO
+    else:
+        status = TextoArquivo.EXTRAIDO if texto else TextoArquivo.SEM_TEXTO
+    with transaction.atomic():
+        # O arquivo pode ter mudado durante a extração: só grava se o hash ainda confere
+        if not Registro.objects.filter(pk=registro_id, arquivo_sha256=sha256).exists():
+            return False
+        TextoArquivo.objects.update_or_create(
+            registro_id=registro_id,
+            defaults={'sha256': sha256, 'texto': texto, 'status': status, 'mensagem_erro': erro},
+        )
+        atualizar_search_vector([registro_id])
+    return True
+
+
+def _ler_arquivo(registro):
+    with registro.arquivo.open('rb') as arquivo:
+        return arquivo.read()
+
+
+def extrair_registro(registro_id):
+    """Extrai (ou copia pelo hash) o texto do PDF de um registro. Retorna True se gravou."""
+    registro = Registro.objects.filter(pk=registro_id, arquivo_mime=MIME_PDF).exclude(arquivo_sha256='').first()
+    if registro is None or not extracao_disponivel():
+        return False
+    sha256 = registro.arquivo_sha256
+    if TextoArquivo.objects.filter(registro_id=registro_id, sha256=sha256).exists():
+        return False
+
+    existente = _texto_ja_extraido(sha256)
+    if existente is not None:
+        gravado = _gravar(registro_id, sha256, texto=existente[0])
+    else:
+        try:
+            texto, _ = extrair_texto_pdf(_ler_arquivo(registro), limite_caracteres())
+        except Exception as e:
+            logger.exception(f"Erro ao extrair o texto do registro {registro_id}")
+            return _gravar(registro_id, sha256, erro=str(e))
+        gravado = _gravar(registro_id, sha256, texto=texto)
+
+    if gravado:
+        transaction.on_commit(lambda: registrar_alteracao(registro_ids=[registro_id]))
+    return gravado
+
+
+def _obter_executor():
+    global _executor
+    workers = getattr(settings, 'REPOSITORIO_EXTRACAO_TEXTO_WORKERS', 1)
+    if workers <= 0:
+        return None
+    with _trava:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='extracao-texto')
+        return _executor
+
+
+def _extrair_em_thread(registro_id):
+    try:
+        extrair_registro(registro_id)
+    except Exception:
+        logger.exception(f"Erro inesperado na extração de texto do registro {registro_id}")
+    finally:
+        # Conexões abertas pela thread não são fechadas pelo ciclo de requisição
+        connections.close_all()
+
+
+def enfileirar(registro_id):
+    """Agenda a extração após o commit (sem workers, fica para o comando)."""
+    executor = _obter_executor()
+    if executor is None or not extracao_disponivel():
+        return
+    transaction.on_commit(lambda: executor.submit(_extrair_em_thread, registro_id))
+
+
+def processar_pendentes(processos=None, limite=None):
+    """
+    Extrai o texto dos PDFs pendentes com `processos` processos (padrão: número
+    de CPUs). Os arquivos são lidos do storage nesta thread e enviados aos
+    processos; no máximo 2 x processos arquivos ficam em memória ao mesmo tempo.
+    Retorna (gravados, erros).
+    """
+    if not extracao_disponivel():
+        return 0, 0
+
+    ids = list(pendentes().order_by('pk').values_list('pk', flat=True))
+    if limite:
+        ids = ids[:limite]
+
+    gravados = erros = 0
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        janela = executor._max_workers * 2
+        em_andamento = deque()
+
+        def concluir():
+            nonlocal gravados, erros
+            registro_id, sha256, futuro = em_andamento.popleft()
+            try:
+                texto, _ = futuro.result()
+            except Exception as e:
+                logger.error(f"Erro ao extrair o texto do registro {registro_id}: {e}")
+                erros += 1
+                _gravar(registro_id, sha256, erro=str(e))
+                return
+            if _gravar(registro_id, sha256, texto=texto):
+                gravados += 1
+
+        for registro in Registro.objects.filter(pk__in=ids).order_by('pk').iterator():
+            existente = _texto_ja_extraido(registro.arquivo_sha256)
+            if existente is not None:
+                gravados += _gravar(registro.pk, registro.arquivo_sha256, texto=existente[0])
+                continue
+            try:
+                dados = _ler_arquivo(registro)
+            except Exception as e:
+                logger.error(f"Erro ao ler o arquivo do registro {registro.pk}: {e}")
+                erros += 1
+                continue
+            futuro = executor.submit(extrair_texto_pdf, dados, limite_caracteres())
+            em_andamento.append((registro.pk, registro.arquivo_sha256, futuro))
+            if len(em_andamento) >= janela:
+                concluir()
+
+        while em_andamento:
+            concluir()
+
+    if gravados:
+        registrar_alteracao()
+    return gravados, erros
@@ -2,7 +2,8 @@ from django.urls import path
 from apps.repositorio.views.registro_views import (
 	RegistroListView, RegistroDetailView, RegistroCreateView,
 	RegistroUpdateView, RegistroDeleteView, subprojetos_por_projeto_admin,
-	download_filtered_registros
+	download_filtered_registros, estatisticas_cache_busca,
+	solicitar_exportacao_view, status_exportacao, download_exportacao
 )
 from apps.repositorio.views.galeria_views import (
 	FotoGaleriaListView, FotoGaleriaCreateView,
@@ -39,9 +40,17 @@ urlpatterns = [
 	# Download de arquivos filtrados
 	path('download-filtrados/', download_filtered_registros, name='download_filtrados'),
 
+	# Exportações ZIP em segundo plano (pedido, progresso e download do arquivo gerado)
+	path('exportacoes/', solicitar_exportacao_view, name='exportacao_solicitar'),
+	path('exportacoes/<str:chave>/', status_exportacao, name='exportacao_status'),
+	path('exportacoes/<str:chave>/download/', download_exportacao, name='exportacao_download'),
+
 	# Endpoint JSON para carregar subprojetos por projeto (gestão)
 	path('api/subprojetos/', subprojetos_por_projeto_admin, name='subprojetos_por_projeto'),
 
+	# Estatísticas do cache de resultados da busca pública
+	path('api/cache-busca/', estatisticas_cache_busca, name='cache_busca_estatisticas'),
+
 	# Gestão de metadados
 	path('projetos/', ProjetoListView.as_view(), name='projeto_lista'),
 	path('projetos/novo/', ProjetoCreateView.as_view(), name='projeto_criar'),
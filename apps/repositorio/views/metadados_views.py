@@ -15,6 +15,7 @@ from apps.repositorio.forms.metadados_forms import (
     TipoDocumentoForm,
     TipoPublicacaoForm,
 )
+from apps.repositorio.lookup_tables import tabelas_auxiliares
 from apps.repositorio.models.repositorio import (
     AreaTematica,
     Autor,
@@ -24,12 +25,15 @@ from apps.repositorio.models.repositorio import (
     TipoDocumento,
     TipoPublicacao,
 )
+from apps.repositorio.search.pagination import KeysetPaginationMixin
 
 
-class BaseMetadataListView(LoginRequiredMixin, ListView):
+class BaseMetadataListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     login_url = '/admin/login/'
     paginate_by = 20
     search_fields = ['nome']
+    # Lookup de busca: 'similar' ignora acentos e tolera erros de digitação
+    search_lookup = 'similar'
     context_object_name = 'itens'
 
     def get_queryset(self):
@@ -39,7 +43,7 @@ class BaseMetadataListView(LoginRequiredMixin, ListView):
         if search:
             query = Q()
             for field in self.search_fields:
-                query |= Q(**{f'{field}__icontains': search})
+                query |= Q(**{f'{field}__{self.search_lookup}': search})
             queryset = queryset.filter(query)
 
         ativo = self.request.GET.get('ativo')
@@ -110,7 +114,7 @@ class BaseMetadataDeleteView(LoginRequiredMixin, DeleteView):
             'TipoDocumento': 'tipo_documento',
             'AreaTematica': 'area_tematica',
             'TipoPublicacao': 'tipo_publicacao',
-            'Projeto': 'subprojeto__projeto',  # Projeto não tem FK direta, usa subprojeto
+            'Projeto': 'projeto',
             'Autor': 'autores',                # ManyToMany
             'Tag': 'tags',                     # ManyToMany
         }
@@ -187,7 +191,7 @@ class SubprojetoListView(BaseMetadataListView):
         search = self.request.GET.get('q')
         if search:
             queryset = queryset.filter(
-                Q(nome__icontains=search) | Q(projeto__nome__icontains=search)
+                Q(nome__similar=search) | Q(projeto__nome__similar=search)
             )
 
         projeto_id = self.request.GET.get('projeto')
@@ -204,7 +208,7 @@ class SubprojetoListView(BaseMetadataListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['projetos'] = Projeto.objects.filter(ativo=True).order_by('nome')
+        context['projetos'] = tabelas_auxiliares().projetos_ativos
         return context
 
 
@@ -1,23 +1,27 @@
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.shortcuts import redirect, get_object_or_404
-from django.db.models import Q
-from django.http import JsonResponse, FileResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
-import zipfile
-import io
-import os
-from django.utils.text import slugify
+import itertools
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-from apps.repositorio.models.repositorio import Registro, Subprojeto
+from apps.repositorio.models.repositorio import ExportacaoArquivos, Registro, Subprojeto
+from apps.repositorio.downloads import assinar_urls, url_arquivo
+from apps.repositorio.export_jobs import arquivo_disponivel, retomar_abandonada, solicitar_exportacao
+from apps.repositorio.exports import NenhumArquivoLido, arquivos_dos_documentos, filtrar_documentos, gerar_zip
 from apps.repositorio.forms.registro_form import RegistroForm
-
+from apps.repositorio.lookup_tables import tabelas_auxiliares
+from apps.repositorio.search.bitmap import ResultadoIds, obter_indice
+from apps.repositorio.search.filters import FiltrosGestao
+from apps.repositorio.search.pagination import KeysetPaginationMixin
+from apps.repositorio.search.result_cache import cache_habilitado, estatisticas
 
 def _mensagem_campos_invalidos(form, acao):
     campos_com_erro = []
@@ -45,47 +49,33 @@ def _mensagem_campos_invalidos(form, acao):
 def _apply_filters_to_queryset(query_params):
     """
     Aplica filtros ao queryset baseado nos parâmetros GET.
-    Utilizado tanto pela lista quanto pelo download para garantir consistência.
+    Os mesmos filtros (search.filters) valem para o download e as exportações.
     """
     queryset = Registro.objects.select_related(
-        'subprojeto__projeto', 'tipo_documento', 'area_tematica', 'status'
+        'subprojeto', 'projeto', 'tipo_documento', 'area_tematica', 'status'
     ).prefetch_related('autores', 'tags')
+    return FiltrosGestao(query_params).aplicar(queryset).order_by('-date_create', '-id')
 
-    # Busca por título ou resumo
-    search = query_params.get('q')
-    if search:
-        queryset = queryset.filter(
-            Q(titulo__icontains=search) | Q(resumo__icontains=search)
-        )
-
-    # Filtro por status
-    status_id = query_params.get('status')
-    if status_id:
-        queryset = queryset.filter(status_id=status_id)
-
-    # Filtro por tipo de documento
-    tipo_doc_id = query_params.get('tipo_documento')
-    if tipo_doc_id:
-        queryset = queryset.filter(tipo_documento_id=tipo_doc_id)
 
-    # Filtro por projeto
-    projeto_id = query_params.get('projeto')
-    if projeto_id:
-        queryset = queryset.filter(subprojeto__projeto_id=projeto_id)
-
-    # Filtro por subprojeto
-    subprojeto_id = query_params.get('subprojeto')
-    if subprojeto_id:
-        queryset = queryset.filter(subprojeto_id=subprojeto_id)
-
-    # Filtro por situação ativa/inativa
-    ativo = query_params.get('ativo')
-    if ativo == '1':
-        queryset = queryset.filter(ativo=True)
-    elif ativo == '0':
-        queryset = queryset.filter(ativo=False)
+def _consultar_indice_facetas(query_params):
+    """
+    Resolve os mesmos filtros de `_apply_filters_to_queryset` pelo índice de
+    facetas em memória (search.bitmap). Retorna None quando o índice está
+    desabilitado ou há busca textual, que continua no banco.
+    """
+    filtros = FiltrosGestao(query_params)
+    if filtros.busca:
+        return None
+    indice = obter_indice()
+    if indice is None:
+        return None
 
-    return queryset.order_by('-date_create')
+    return ResultadoIds(
+        filtros.consultar_indice(indice, ('-date_create', '-id')),
+        Registro.objects.select_related(
+            'subprojeto', 'projeto', 'tipo_documento', 'area_tematica', 'status'
+        ).prefetch_related('autores', 'tags'),
+    )
 
 
 from django.contrib import messages
@@ -98,55 +88,33 @@ def download_filtered_registros(request):
     Organiza os arquivos em estrutura: projeto_slug/subprojeto_slug/arquivo
     """
     try:
-        # Aplica os mesmos filtros da listagem
-        queryset = _apply_filters_to_queryset(request.GET)
+        # Aplica os mesmos filtros da listagem (sobre o modelo de leitura, sem joins)
+        queryset = filtrar_documentos(request.GET)
         
         # Filtra apenas registros que possuem arquivo
-        queryset = queryset.filter(arquivo__isnull=False).exclude(arquivo='')
+        queryset = queryset.exclude(arquivo='')
+        storage = Registro._meta.get_field('arquivo').storage
         
         if not queryset.exists():
             messages.warning(request, 'Nenhum arquivo encontrado com os filtros aplicados.')
             return redirect(f"{reverse_lazy('repositorio:lista')}?{request.GET.urlencode()}")
         
-        # Cria arquivo ZIP em memória
-        zip_buffer = io.BytesIO()
-        arquivos_adicionados = 0
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for registro in queryset:
-                if not registro.arquivo:
-                    continue
-                
-                try:
-                    arquivo = registro.arquivo
-                    projeto_slug = slugify(registro.subprojeto.projeto.nome or 'sem-projeto')
-                    subprojeto_slug = slugify(registro.subprojeto.nome or 'sem-subprojeto')
-                    arquivo_nome = os.path.basename(arquivo.name)
-                    zip_path = f"{projeto_slug}/{subprojeto_slug}/{arquivo_nome}"
-                    
-                    with arquivo.open('rb') as f:
-                        arquivo_conteudo = f.read()
-                        zip_file.writestr(zip_path, arquivo_conteudo)
-                        arquivos_adicionados += 1
-                    
-                except Exception as e:
-                    logger.error(f"Erro ao adicionar arquivo {getattr(registro.arquivo, 'name', 'unknown')}: {str(e)}")
-                    continue
-        
-        # Se nenhum arquivo foi adicionado com sucesso
-        if arquivos_adicionados == 0:
-            messages.error(request, 'Nenhum arquivo pôde ser lido com sucesso.')
+        # ZIP gerado em fluxo (memória constante): os registros são percorridos com
+        # iterator() e cada arquivo é copiado em blocos enquanto é enviado
+        blocos = gerar_zip(arquivos_dos_documentos(queryset), storage)
+        try:
+            # O primeiro bloco só sai depois que algum arquivo foi aberto: sem
+            # nenhum legível, ainda dá para responder com a mensagem de erro
+            primeiro = next(blocos)
+        except NenhumArquivoLido as e:
+            messages.error(request, str(e))
             return redirect(f"{reverse_lazy('repositorio:lista')}?{request.GET.urlencode()}")
-        
-        zip_buffer.seek(0)
-        
-        # Retorna o ZIP como download (usuário permanece na página)
-        response = FileResponse(
-            zip_buffer,
-            as_attachment=True,
-            filename='registros_filtrados.zip',
+
+        response = StreamingHttpResponse(
+            itertools.chain([primeiro], blocos),
             content_type='application/zip'
         )
+        response['Content-Disposition'] = 'attachment; filename="registros_filtrados.zip"'
         
         return response
     
@@ -155,7 +123,65 @@ def download_filtered_registros(request):
         messages.error(request, f'Erro ao gerar download: {str(e)}')
         return redirect(f"{reverse_lazy('repositorio:lista')}?{request.GET.urlencode()}")
 
-class RegistroListView(LoginRequiredMixin, ListView):
+def _dados_exportacao(exportacao):
+    dados = {
+        'chave': exportacao.chave,
+        'status': exportacao.status,
+        'status_display': exportacao.get_status_display(),
+        'progresso': exportacao.progresso,
+        'processados': exportacao.processados,
+        'total': exportacao.total,
+        'url_status': reverse('repositorio:exportacao_status', args=[exportacao.chave]),
+        'url_download': None,
+        'erro': exportacao.mensagem_erro or None,
+    }
+    if exportacao.status == ExportacaoArquivos.CONCLUIDA:
+        dados['url_download'] = reverse('repositorio:exportacao_download', args=[exportacao.chave])
+    return dados
+
+
+@login_required(login_url='/admin/login/')
+@require_POST
+def solicitar_exportacao_view(request):
+    """
+    Enfileira a exportação ZIP dos registros filtrados (apps.repositorio.export_jobs).
+    Se já existir um ZIP atualizado para os mesmos filtros, ele é retornado de imediato.
+    """
+    exportacao = solicitar_exportacao(request.GET, usuario=request.user)
+    dados = _dados_exportacao(exportacao)
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse(dados, status=200 if dados['url_download'] else 202)
+
+    if dados['url_download']:
+        return redirect(dados['url_download'])
+    messages.info(request, 'A exportação está sendo gerada. Solicite novamente em alguns instantes para baixar.')
+    return redirect(f"{reverse_lazy('repositorio:lista')}?{request.GET.urlencode()}")
+
+
+@login_required(login_url='/admin/login/')
+def status_exportacao(request, chave):
+    """Progresso de uma exportação (consultado periodicamente pela listagem)."""
+    exportacao = get_object_or_404(ExportacaoArquivos, chave=chave)
+    # Worker reiniciado no meio da exportação: volta para a fila em vez de ficar parada
+    return JsonResponse(_dados_exportacao(retomar_abandonada(exportacao)))
+
+
+@login_required(login_url='/admin/login/')
+def download_exportacao(request, chave):
+    """Envia o ZIP de uma exportação concluída."""
+    exportacao = get_object_or_404(ExportacaoArquivos, chave=chave, status=ExportacaoArquivos.CONCLUIDA)
+    if not arquivo_disponivel(exportacao):
+        raise Http404('Arquivo da exportação não encontrado.')
+    return FileResponse(
+        exportacao.arquivo.open('rb'),
+        as_attachment=True,
+        filename='registros_filtrados.zip',
+        content_type='application/zip'
+    )
+
+
+class RegistroListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """Lista todos os registros com busca e filtros."""
     model = Registro
     template_name = 'repositorio/registro_list.html'
@@ -172,6 +198,9 @@ class RegistroListView(LoginRequiredMixin, ListView):
         if query_params:
             self.request.session['registro_filter_params'] = query_params.urlencode()
         
+        resultado = _consultar_indice_facetas(self.request.GET)
+        if resultado is not None:
+            return resultado
         return _apply_filters_to_queryset(self.request.GET)
 
     def get_context_data(self, **kwargs):
@@ -180,16 +209,12 @@ class RegistroListView(LoginRequiredMixin, ListView):
         context['search_query'] = self.request.GET.get('q', '')
         
         # Para os filtros nos dropdowns
-        from apps.repositorio.models.repositorio import Status, TipoDocumento, Projeto, Subprojeto
-        context['status_list'] = Status.objects.filter(ativo=True)
-        context['tipos_documento'] = TipoDocumento.objects.filter(ativo=True)
-        context['projetos'] = Projeto.objects.filter(ativo=True)
-
-        projeto_id = self.request.GET.get('projeto')
-        subprojetos = Subprojeto.objects.filter(ativo=True)
-        if projeto_id:
-            subprojetos = subprojetos.filter(projeto_id=projeto_id)
-        context['subprojetos'] = subprojetos
+        # (registro em memória das tabelas auxiliares, sem consultas)
+        tabelas = tabelas_auxiliares()
+        context['status_list'] = tabelas.status_ativos
+        context['tipos_documento'] = tabelas.tipos_documento_ativos
+        context['projetos'] = tabelas.projetos_ativos
+        context['subprojetos'] = tabelas.subprojetos_do_projeto(self.request.GET.get('projeto'))
 
         query_params = self.request.GET.copy()
         query_params.pop('page', None)
@@ -207,10 +232,17 @@ class RegistroDetailView(LoginRequiredMixin, DetailView):
 
     def get_queryset(self):
         return Registro.objects.select_related(
-            'subprojeto__projeto', 'tipo_documento', 'area_tematica',
+            'subprojeto', 'projeto', 'tipo_documento', 'area_tematica',
             'status', 'tipo_publicacao', 'usuario_criacao', 'usuario_ultima_atualizacao'
         ).prefetch_related('autores', 'tags')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # URL do arquivo pela assinatura em lote do storage (cache por janela no S3)
+        assinar_urls([self.object])
+        context['arquivo_url'] = url_arquivo(self.object)
+        return context
+
 
 class RegistroCreateView(LoginRequiredMixin, CreateView):
     """Cria um novo registro."""
@@ -261,6 +293,13 @@ class RegistroUpdateView(LoginRequiredMixin, UpdateView):
         
         return reverse_lazy('repositorio:lista')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Link do arquivo atual, como no detalhe
+        assinar_urls([self.object])
+        context['arquivo_url'] = url_arquivo(self.object)
+        return context
+
     def form_valid(self, form):
         """Atualiza o usuário da última atualização."""
         form.instance.usuario_ultima_atualizacao = self.request.user
@@ -302,12 +341,16 @@ class RegistroDeleteView(LoginRequiredMixin, DeleteView):
 def subprojetos_por_projeto_admin(request):
     projeto_id = request.GET.get('projeto_id')
 
-    subprojetos = Subprojeto.objects.filter(ativo=True)
-    if projeto_id:
-        subprojetos = subprojetos.filter(projeto_id=projeto_id)
+    subprojetos = tabelas_auxiliares().subprojetos_do_projeto(projeto_id)
 
     data = [
         {'id': subprojeto.id, 'nome': subprojeto.nome}
-        for subprojeto in subprojetos.order_by('nome')
+        for subprojeto in sorted(subprojetos, key=lambda subprojeto: subprojeto.nome)
     ]
     return JsonResponse({'subprojetos': data})
+
+
+@login_required(login_url='/admin/login/')
+def estatisticas_cache_busca(request):
+    """Acertos/falhas do cache de resultados da busca pública (search.result_cache)."""
+    return JsonResponse({'habilitado': cache_habilitado(), **estatisticas()})
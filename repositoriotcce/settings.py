@@ -52,6 +52,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',  # ← Já está aqui, essencial para as mensagens
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Busca full-text (SearchVector/SearchRank)
 ]
 
 THIRD_PARTY_APPS = [
@@ -130,17 +131,97 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'static'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'www/static')]
 
-# Gerenciamento de Mídia Local vs Cloud (S3)
-if env('AWS_ACCESS_KEY_ID', default=''):
-    DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+# Gerenciamento de Mídia Local vs Cloud (S3): a mídia só vai para o bucket com
+# REPOSITORIO_STORAGE_S3=True; as chaves da AWS sozinhas não trocam o storage (ver deploy.md)
+REPOSITORIO_STORAGE_S3 = env.bool('REPOSITORIO_STORAGE_S3', default=False)
+
+if REPOSITORIO_STORAGE_S3 or env('AWS_ACCESS_KEY_ID', default=''):
     AWS_ACCESS_KEY_ID = env('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = env('AWS_SECRET_ACCESS_KEY')
     AWS_STORAGE_BUCKET_NAME = env('AWS_STORAGE_BUCKET_NAME')
+    AWS_LOCATION = env('AWS_LOCATION', default='')
+    AWS_S3_CUSTOM_DOMAIN = env('AWS_S3_CUSTOM_DOMAIN', default=None)
+    AWS_S3_FILE_OVERWRITE = env.bool('AWS_S3_FILE_OVERWRITE', default=False)
+    # Bucket privado: URLs assinadas, em cache por janelas de AWS_URL_ASSINADA_JANELA segundos
+    AWS_MEDIA_PRIVADA = env.bool('AWS_MEDIA_PRIVADA', default=False)
+    AWS_URL_ASSINADA_JANELA = env.int('AWS_URL_ASSINADA_JANELA', default=3600)
+
+if REPOSITORIO_STORAGE_S3:
+    # DEFAULT_FILE_STORAGE não é mais lido pelo Django 5.x: o backend vai em STORAGES
+    STORAGES = {
+        'default': {'BACKEND': 'repositoriotcce.storage_backends.MediaStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
 else:
-    DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
     MEDIA_URL = '/media/'
     MEDIA_ROOT = os.path.join(BASE_DIR, 'www/media')
 
+# --------------------------------------------------------------------------
+# CACHE
+# --------------------------------------------------------------------------
+# Ex.: CACHE_URL=redis://127.0.0.1:6379/1 (requer o pacote redis). Com vários
+# workers use um cache compartilhado: a versão do catálogo e os contadores
+# do cache de busca ficam nele.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# --------------------------------------------------------------------------
+# REPOSITÓRIO (BUSCA E LISTAGENS)
+# --------------------------------------------------------------------------
+# Paginação por cursor (keyset) nas listagens públicas e de gestão
+REPOSITORIO_PAGINACAO_CURSOR = env.bool('REPOSITORIO_PAGINACAO_CURSOR', default=False)
+
+# Índice de facetas em memória (requer numpy); filtros sem busca textual não vão ao banco
+REPOSITORIO_INDICE_FACETAS = env.bool('REPOSITORIO_INDICE_FACETAS', default=False)
+
+# Cache de resultados da busca pública (ids + facetas), invalidado pela versão do catálogo
+REPOSITORIO_CACHE_BUSCA = env.bool('REPOSITORIO_CACHE_BUSCA', default=False)
+REPOSITORIO_CACHE_BUSCA_TIMEOUT = env.int('REPOSITORIO_CACHE_BUSCA_TIMEOUT', default=600)
+REPOSITORIO_CACHE_BUSCA_LIMITE = env.int('REPOSITORIO_CACHE_BUSCA_LIMITE', default=10000)
+# Segundos em que cada processo reaproveita sua cópia das tabelas auxiliares (projetos,
+# tipos de documento, status...). Limita o atraso entre workers quando o cache não é
+# compartilhado; com Redis/Memcached a versão já recarrega a cópia na hora.
+REPOSITORIO_TABELAS_AUXILIARES_TTL = env.int('REPOSITORIO_TABELAS_AUXILIARES_TTL', default=60)
+
+# Exportações ZIP em segundo plano: threads do próprio processo que geram os arquivos
+# (0 = nenhuma; os pedidos ficam pendentes para o comando `processar_exportacoes`)
+REPOSITORIO_EXPORTACAO_WORKERS = env.int('REPOSITORIO_EXPORTACAO_WORKERS', default=1)
+# Dias em que um ZIP gerado é mantido no storage (comando `processar_exportacoes --limpar`)
+REPOSITORIO_EXPORTACAO_VALIDADE_DIAS = env.int('REPOSITORIO_EXPORTACAO_VALIDADE_DIAS', default=7)
+# Minutos sem sinal de vida do worker após os quais uma exportação pendente/em processamento
+# é considerada abandonada (processo reiniciado) e volta para a fila
+REPOSITORIO_EXPORTACAO_ABANDONO_MINUTOS = env.int('REPOSITORIO_EXPORTACAO_ABANDONO_MINUTOS', default=15)
+# Arquivos lidos do storage em paralelo ao montar um ZIP (1 = leitura sequencial)
+# e tempo máximo de espera, em segundos, pela abertura de cada arquivo e por cada bloco lido
+REPOSITORIO_EXPORTACAO_CONCORRENCIA = env.int('REPOSITORIO_EXPORTACAO_CONCORRENCIA', default=8)
+REPOSITORIO_EXPORTACAO_TIMEOUT_ARQUIVO = env.int('REPOSITORIO_EXPORTACAO_TIMEOUT_ARQUIVO', default=60)
+
+# Arquivos dos registros endereçados pelo SHA-256 (um objeto por conteúdo, com contagem de
+# referências); objetos sem uso são removidos por `coletar_arquivos_orfaos` após a carência.
+# Lido na inicialização para desligar o django_cleanup no modelo Registro
+REPOSITORIO_ARMAZENAMENTO_POR_CONTEUDO = env.bool('REPOSITORIO_ARMAZENAMENTO_POR_CONTEUDO', default=False)
+REPOSITORIO_ARQUIVOS_ORFAOS_CARENCIA_HORAS = env.int('REPOSITORIO_ARQUIVOS_ORFAOS_CARENCIA_HORAS', default=24)
+
+# Extração do texto dos PDFs para a busca (pypdf): threads do próprio processo que extraem
+# após o upload (0 = nenhuma; os pendentes ficam para o comando `extrair_textos_arquivos`)
+REPOSITORIO_EXTRACAO_TEXTO_WORKERS = env.int('REPOSITORIO_EXTRACAO_TEXTO_WORKERS', default=1)
+# Caracteres de texto guardados por arquivo (o tsvector do PostgreSQL tem limite de 1 MB)
+REPOSITORIO_TEXTO_LIMITE_CARACTERES = env.int('REPOSITORIO_TEXTO_LIMITE_CARACTERES', default=300000)
+
+# Tempo (s) em que navegadores e proxies podem reutilizar as respostas da API de estatísticas
+REPOSITORIO_ESTATISTICAS_MAX_AGE = env.int('REPOSITORIO_ESTATISTICAS_MAX_AGE', default=300)
+
+# Entrega dos arquivos locais em download/visualização: 'django' (enviado pelo worker),
+# 'x-accel-redirect' (nginx) ou 'x-sendfile' (Apache/mod_xsendfile). No nginx, o prefixo
+# abaixo deve ser uma location `internal` com `alias` para o MEDIA_ROOT (ver deploy.md)
+REPOSITORIO_ENTREGA_ARQUIVOS = env('REPOSITORIO_ENTREGA_ARQUIVOS', default='django')
+REPOSITORIO_ENTREGA_PREFIXO_INTERNO = env('REPOSITORIO_ENTREGA_PREFIXO_INTERNO', default='/media-interna/')
+
 # Outras configurações padrão mantidas...
 ROOT_URLCONF = 'repositoriotcce.urls'
 WSGI_APPLICATION = 'repositoriotcce.wsgi.application'
@@ -1,5 +1,19 @@
+import hashlib
+import time
+
 from storages.backends.s3boto3 import S3Boto3Storage
 from django.conf import settings
+from django.core.cache import cache
+
+# Bucket privado: objetos sem ACL pública e URLs assinadas (presigned) com validade
+MEDIA_PRIVADA = getattr(settings, 'AWS_MEDIA_PRIVADA', False)
+
+
+def janela_atual(duracao, agora=None):
+    """(início, segundos restantes) da janela de tempo de `duracao` segundos que contém `agora`."""
+    agora = time.time() if agora is None else agora
+    inicio = int(agora // duracao) * duracao
+    return inicio, inicio + duracao - agora
 
 
 # Este backend será usado para arquivos de MÍDIA (uploads de usuários)
@@ -7,15 +21,58 @@ class MediaStorage(S3Boto3Storage):
     """
     Backend customizado para arquivos de Mídia (uploads).
     Define o prefixo (location) e a URL base.
+
+    As URLs são guardadas no cache por janela de tempo (AWS_URL_ASSINADA_JANELA
+    segundos). Dentro de uma janela a mesma URL é devolvida para o mesmo objeto,
+    assim navegadores e CDNs podem reaproveitar os redirecionamentos; a
+    assinatura vale até o fim da janela seguinte.
     """
     # Define o prefixo dentro do bucket S3 (Ex: 'media/documentos/repositorio/')
-    location = settings.AWS_LOCATION
+    location = getattr(settings, 'AWS_LOCATION', '')
 
     # Define a URL base que será usada no campo FileField.url
-    custom_domain = settings.AWS_S3_CUSTOM_DOMAIN
+    # (sem domínio próprio no modo privado: a URL precisa ser assinada pelo S3)
+    custom_domain = None if MEDIA_PRIVADA else getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
 
     # Garante que os arquivos sejam tratados como MÍDIA (uploads)
-    file_overwrite = settings.AWS_S3_FILE_OVERWRITE
+    file_overwrite = getattr(settings, 'AWS_S3_FILE_OVERWRITE', False)
 
     # Garante que os arquivos sejam lidos via HTTP/HTTPS (se público)
-    default_acl = 'public-read'
+    default_acl = 'private' if MEDIA_PRIVADA else 'public-read'
+    querystring_auth = MEDIA_PRIVADA
+
+    # Duração, em segundos, das janelas de validade das URLs assinadas
+    janela_assinatura = getattr(settings, 'AWS_URL_ASSINADA_JANELA', 3600)
+
+    def _chave_url(self, name, inicio):
+        identificador = f'{self.bucket_name}:{self.location}:{self.querystring_auth}:{name}'
+        return f'repositorio:url-arquivo:{hashlib.sha1(identificador.encode()).hexdigest()}:{inicio}'
+
+    def validade_url(self):
+        """Segundos até a troca da janela atual (máximo que um redirecionamento pode ficar em cache)."""
+        return int(janela_atual(self.janela_assinatura)[1])
+
+    def urls(self, names):
+        """
+        URLs de vários objetos de uma vez ({nome: url}): uma leitura no cache
+        para a página inteira e assinatura apenas dos que faltam.
+        """
+        inicio, restante = janela_atual(self.janela_assinatura)
+        chaves = {name: self._chave_url(name, inicio) for name in set(names) if name}
+        em_cache = cache.get_many(list(chaves.values()))
+
+        novas = {}
+        for name, chave in chaves.items():
+            if chave not in em_cache:
+                # Válida até o fim da janela seguinte: quem recebeu a URL no fim desta ainda pode usá-la
+                novas[chave] = super().url(name, expire=int(restante) + self.janela_assinatura)
+        if novas:
+            cache.set_many(novas, timeout=max(int(restante), 1))
+
+        em_cache.update(novas)
+        return {name: em_cache[chave] for name, chave in chaves.items()}
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if parameters or expire or http_method:
+            return super().url(name, parameters=parameters, expire=expire, http_method=http_method)
+        return self.urls([name])[name]
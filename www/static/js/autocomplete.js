@@ -0,0 +1,131 @@
+/**
+ * Selects com opções carregadas sob demanda (widgets AutocompleteSelect e
+ * AutocompleteSelectMultiple).
+ *
+ * O HTML traz apenas as opções já selecionadas. Ao focar o select, a primeira
+ * página do endpoint (data-autocomplete-url) é carregada; o campo de busca
+ * inserido acima do select filtra por prefixo do nome e a opção
+ * "Carregar mais..." busca a página seguinte. As respostas têm ETag e
+ * Cache-Control, então o navegador reaproveita páginas já consultadas.
+ */
+(() => {
+    const OPCAO_MAIS = '__mais__';
+    const ATRASO_BUSCA = 250;
+
+    const iniciarAutocomplete = (select) => {
+        if (select.dataset.autocompleteIniciado) return;
+        select.dataset.autocompleteIniciado = '1';
+
+        const form = select.form;
+        const dependencia = select.dataset.autocompleteDepende && form
+            ? form.querySelector(`[name="${select.dataset.autocompleteDepende}"]`)
+            : null;
+
+        const busca = document.createElement('input');
+        busca.type = 'search';
+        busca.className = 'form-control form-control-sm mb-1';
+        busca.placeholder = select.dataset.autocompletePlaceholder || 'Digite para buscar...';
+        busca.setAttribute('aria-label', busca.placeholder);
+        select.parentNode.insertBefore(busca, select);
+
+        const estado = { termo: '', pagina: 0, mais: true, carregado: false, carregando: false };
+        let valorAnterior = Array.from(select.selectedOptions).map((opcao) => opcao.value);
+
+        const removerOpcaoMais = () => {
+            const opcao = select.querySelector(`option[value="${OPCAO_MAIS}"]`);
+            if (opcao) opcao.remove();
+        };
+
+        const limparNaoSelecionadas = () => {
+            Array.from(select.options).forEach((opcao) => {
+                if (opcao.value && !opcao.selected) opcao.remove();
+            });
+        };
+
+        const carregar = async (reiniciar) => {
+            if (estado.carregando) return;
+            estado.carregando = true;
+
+            const pagina = reiniciar ? 1 : estado.pagina + 1;
+            const params = new URLSearchParams({ q: estado.termo, page: String(pagina) });
+            if (dependencia && dependencia.value) {
+                params.set(select.dataset.autocompleteParametro, dependencia.value);
+            }
+
+            try {
+                const response = await fetch(`${select.dataset.autocompleteUrl}?${params}`, {
+                    headers: { 'X-Requested-With': 'XMLHttpRequest' }
+                });
+                if (!response.ok) return;
+                const data = await response.json();
+
+                if (reiniciar) limparNaoSelecionadas();
+                removerOpcaoMais();
+
+                const existentes = new Set(Array.from(select.options).map((opcao) => opcao.value));
+                (data.resultados || []).forEach((item) => {
+                    if (existentes.has(String(item.id))) return;
+                    const opcao = document.createElement('option');
+                    opcao.value = String(item.id);
+                    opcao.textContent = item.nome;
+                    select.appendChild(opcao);
+                });
+
+                if (data.mais) {
+                    const opcao = document.createElement('option');
+                    opcao.value = OPCAO_MAIS;
+                    opcao.textContent = 'Carregar mais...';
+                    select.appendChild(opcao);
+                }
+
+                estado.pagina = pagina;
+                estado.mais = Boolean(data.mais);
+                estado.carregado = true;
+            } catch (error) {
+                // Mantém as opções atuais; uma nova tentativa ocorre na próxima busca
+            } finally {
+                estado.carregando = false;
+            }
+        };
+
+        select.addEventListener('focus', () => {
+            if (!estado.carregado) carregar(true);
+        });
+
+        select.addEventListener('change', () => {
+            const opcaoMais = select.querySelector(`option[value="${OPCAO_MAIS}"]`);
+            if (opcaoMais && opcaoMais.selected) {
+                opcaoMais.selected = false;
+                Array.from(select.options).forEach((opcao) => {
+                    opcao.selected = valorAnterior.includes(opcao.value);
+                });
+                carregar(false);
+                return;
+            }
+            valorAnterior = Array.from(select.selectedOptions).map((opcao) => opcao.value);
+        });
+
+        let temporizador = null;
+        busca.addEventListener('input', () => {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(() => {
+                estado.termo = busca.value.trim();
+                carregar(true);
+            }, ATRASO_BUSCA);
+        });
+
+        if (dependencia) {
+            dependencia.addEventListener('change', () => {
+                Array.from(select.options).forEach((opcao) => { opcao.selected = false; });
+                limparNaoSelecionadas();
+                removerOpcaoMais();
+                valorAnterior = [];
+                estado.carregado = false;
+            });
+        }
+    };
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('select[data-autocomplete-url]').forEach(iniciarAutocomplete);
+    });
+})();